@@ -0,0 +1,9 @@
+"""Performance benchmarks for Spekulatio.
+
+Run them from the root of the repository, eg.:
+
+    python -m benchmarks.bench_markdown
+
+`bench_build` times each phase of a build of a site made by
+`site_generator` and reports the results as JSON.
+"""
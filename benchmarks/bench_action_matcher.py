@@ -0,0 +1,71 @@
+"""Compare matching actions one by one with the combined per-layer matcher."""
+
+import time
+import random
+
+import click
+
+from spekulatio.models import Action
+from spekulatio.models.action_matcher import ActionMatcher
+
+
+def generate_actions(count: int) -> list[Action]:
+    """Return actions with extension patterns and a few complex ones."""
+    actions = []
+    for index in range(count):
+        if index % 10 == 9:
+            patterns = [f"section{index}/**/*.html"]
+        else:
+            patterns = [f"*.ext{index}", f"*.alt{index}"]
+        actions.append(Action(patterns=tuple(patterns)))
+    return actions
+
+
+def generate_paths(rng: random.Random, count: int, actions: int) -> list[str]:
+    """Return relative paths with random depth and extension."""
+    paths = []
+    for index in range(count):
+        depth = rng.randint(0, 4)
+        dirs = [f"dir{rng.randint(0, 20)}" for _ in range(depth)]
+        extension = f"ext{rng.randint(0, actions + actions // 2)}"
+        paths.append("/".join(dirs + [f"file{index}.{extension}"]))
+    return paths
+
+
+def match_sequentially(actions, paths):
+    for path in paths:
+        for action in actions:
+            if action.match(path):
+                break
+
+
+def match_combined(actions, paths):
+    matcher = ActionMatcher(actions)
+    for path in paths:
+        matcher.match(path)
+
+
+@click.command()
+@click.option("--actions", "num_actions", default=50, help="Number of actions.")
+@click.option("--files", "num_files", default=20000, help="Number of paths to classify.")
+@click.option("--seed", default=0, help="Seed used to generate the paths.")
+def main(num_actions, num_files, seed):
+    rng = random.Random(seed)
+    actions = generate_actions(num_actions)
+    paths = generate_paths(rng, num_files, num_actions)
+
+    timings = {}
+    for name, function in [
+        ("sequential", match_sequentially),
+        ("combined", match_combined),
+    ]:
+        start = time.perf_counter()
+        function(actions, paths)
+        timings[name] = time.perf_counter() - start
+        print(f"{name}: {timings[name]:.3f}s ({num_files / timings[name]:.0f} paths/s)")
+
+    print(f"speedup: {timings['sequential'] / timings['combined']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Time each phase of a build of a synthetic site.
+
+The results (wall time, memory and operations per second of each phase)
+are printed as JSON, eg.:
+
+    python -m benchmarks.bench_build --files 10000 --output results.json
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import platform
+import tempfile
+from pathlib import Path
+
+import click
+
+from spekulatio.models import Node
+from spekulatio.version import __version__
+from spekulatio.operations import get_layers
+from spekulatio.operations.write_tree import write_tree
+from .site_generator import SiteParameters
+from .site_generator import generate_site
+
+
+def get_peak_rss() -> float:
+    """Return the peak resident set size of the process (in MiB)."""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes in macOS, kilobytes elsewhere
+    return peak_rss / 2**20 if sys.platform == "darwin" else peak_rss / 2**10
+
+
+class Timer:
+    """Collect the measurements of each phase.
+
+    All the phases run in the same process and the operating system only
+    reports the peak RSS of the whole process. For each phase,
+    `peak_rss_growth_mib` is how much that peak grew during the phase (0 if
+    the phase used less memory than a previous one) and `max_rss_so_far_mib`
+    is the peak of the process at the end of the phase.
+    """
+
+    def __init__(self):
+        self.phases: dict[str, dict[str, float]] = {}
+
+    def measure(self, name: str, operations: int, function, *args, **kwargs):
+        previous_peak_rss = get_peak_rss()
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        wall_time = time.perf_counter() - start
+        peak_rss = get_peak_rss()
+        self.phases[name] = {
+            "wall_time": wall_time,
+            "peak_rss_growth_mib": peak_rss - previous_peak_rss,
+            "max_rss_so_far_mib": peak_rss,
+            "operations": operations,
+            "ops_per_second": operations / wall_time if wall_time else 0.0,
+        }
+        return result
+
+
+def apply_layers(layers) -> Node:
+    root = Node(name=".")
+    for layer in layers:
+        layer.apply_to(root, snapshot=None)
+    return root
+
+
+def compute_values(nodes: list[Node]) -> None:
+    for node in nodes:
+        node.values
+
+
+def run(parameters: SiteParameters, base_path: Path, jobs: int) -> dict:
+    """Generate a site and time each phase of its build."""
+    site_path = base_path / "site"
+    site_path.mkdir()
+    spekulatio_file_path = generate_site(site_path, parameters)
+    output_path = base_path / "output"
+    output_path.mkdir()
+
+    timer = Timer()
+    layers = timer.measure("get_layers", parameters.layers, get_layers, spekulatio_file_path)
+    root = timer.measure("create_tree", parameters.files, apply_layers, layers)
+    timer.measure("prune", parameters.files, root.prune)
+    timer.measure("sort", parameters.files, root.sort_tree)
+    nodes = list(root.traverse())
+    num_nodes = len(nodes) + 1
+    timer.measure("values", num_nodes, compute_values, nodes)
+    timer.measure("write_tree", num_nodes, write_tree, output_path, root, jobs=jobs)
+
+    return {
+        "parameters": parameters.to_dict(),
+        "jobs": jobs,
+        "nodes": num_nodes,
+        "phases": timer.phases,
+        "spekulatio": __version__,
+        "python": platform.python_version(),
+    }
+
+
+@click.command()
+@click.option("--files", default=1000, help="Number of Markdown files.")
+@click.option("--depth", default=3, help="Levels of directories.")
+@click.option("--fan-out", default=4, help="Subdirectories per directory.")
+@click.option("--layers", default=2, help="Number of layers.")
+@click.option("--frontmatter-keys", default=4, help="Keys in the frontmatter of each file.")
+@click.option("--paragraphs", default=5, help="Paragraphs of each document.")
+@click.option("--seed", default=0, help="Seed used to generate the site.")
+@click.option("--jobs", default=1, help="Number of processes used to write the tree.")
+@click.option("--cache/--no-cache", default=False, help="Use the persistent caches.")
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path), help="JSON file to write.")
+def main(files, depth, fan_out, layers, frontmatter_keys, paragraphs, seed, jobs, cache, output):
+    if not cache:
+        os.environ["SPEKULATIO_NO_CACHE"] = "1"
+
+    parameters = SiteParameters(
+        files=files,
+        depth=depth,
+        fan_out=fan_out,
+        layers=layers,
+        frontmatter_keys=frontmatter_keys,
+        paragraphs=paragraphs,
+        seed=seed,
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = run(parameters, Path(tmp_dir), jobs)
+
+    text = json.dumps(results, indent=2)
+    if output:
+        output.write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compare creating a Markdown converter per document with reusing them."""
+
+import time
+import random
+
+import click
+import markdown
+
+from spekulatio.models.actions.md2html import get_markdown_converter
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod".split()
+
+
+def generate_document(rng: random.Random, sections: int) -> str:
+    """Return a Markdown document with headings, lists, code and footnotes."""
+    lines = []
+    for index in range(sections):
+        lines.append(f"## Section {index}\n")
+        lines.append(" ".join(rng.choices(WORDS, k=60)) + "[^%d].\n" % index)
+        lines.extend(f"* {' '.join(rng.choices(WORDS, k=5))}" for _ in range(4))
+        lines.append("\n```\ncode block\n```\n")
+        lines.append(f"[^{index}]: {' '.join(rng.choices(WORDS, k=8))}\n")
+    return "\n".join(lines)
+
+
+def convert_with_new_converters(documents, parameters):
+    for document in documents:
+        md = markdown.Markdown(**parameters)
+        md.convert(document)
+
+
+def convert_with_reused_converters(documents, parameters):
+    for document in documents:
+        md = get_markdown_converter(parameters)
+        md.convert(document)
+
+
+@click.command()
+@click.option("--files", default=3000, help="Number of documents to convert.")
+@click.option("--sections", default=3, help="Number of sections per document.")
+@click.option("--seed", default=0, help="Seed used to generate the documents.")
+def main(files, sections, seed):
+    rng = random.Random(seed)
+    documents = [generate_document(rng, sections) for _ in range(files)]
+    parameters = {"extensions": ["toc", "footnotes", "fenced_code", "tables"]}
+
+    timings = {}
+    for name, function in [
+        ("new converter per document", convert_with_new_converters),
+        ("reused converter", convert_with_reused_converters),
+    ]:
+        start = time.perf_counter()
+        function(documents, parameters)
+        timings[name] = time.perf_counter() - start
+        print(f"{name}: {timings[name]:.2f}s ({files / timings[name]:.0f} files/s)")
+
+    speedup = timings["new converter per document"] / timings["reused converter"]
+    print(f"speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
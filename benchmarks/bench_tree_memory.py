@@ -0,0 +1,59 @@
+"""Measure the memory used by the nodes of a large tree."""
+
+import gc
+import tracemalloc
+from pathlib import Path
+
+import click
+
+from spekulatio.models import Node
+from spekulatio.models import Layer
+from spekulatio.models import Action
+from spekulatio.models.actions import create_dir_action
+
+
+def build_tree(num_files: int, files_per_dir: int, num_layers: int) -> Node:
+    """Create a tree with the given shape (without touching the filesystem)."""
+    layers = [
+        Layer(spekulatio_file_path=Path(f"layer{index}/spekulatio.yaml"), path=Path(f"layer{index}"))
+        for index in range(num_layers)
+    ]
+    action = Action(patterns=("*.md",))
+
+    root = Node(name=".")
+    for layer in layers:
+        root.push(layer, create_dir_action)
+
+    for layer in layers:
+        for start in range(0, num_files, files_per_dir):
+            directory = root.upsert_child(f"dir{start}", create_dir_action, layer)
+            for index in range(start, min(start + files_per_dir, num_files)):
+                directory.upsert_child(f"file{index}.md", action, layer)
+    return root
+
+
+@click.command()
+@click.option("--files", "num_files", default=100000, help="Number of files.")
+@click.option("--files-per-dir", default=100, help="Number of files per directory.")
+@click.option("--layers", "num_layers", default=2, help="Number of layers that contain each file.")
+def main(num_files, files_per_dir, num_layers):
+    gc.collect()
+    tracemalloc.start()
+    root = build_tree(num_files, files_per_dir, num_layers)
+    built, _ = tracemalloc.get_traced_memory()
+
+    # properties computed by any traversal
+    for node in root.traverse():
+        node.input_path
+        node.level
+    traversed, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    num_nodes = sum(1 for _ in root.traverse()) + 1
+    print(f"nodes: {num_nodes}")
+    print(f"tree: {built / 2**20:.1f} MiB ({built / num_nodes:.0f} bytes/node)")
+    print(f"traversed: {traversed / 2**20:.1f} MiB ({traversed / num_nodes:.0f} bytes/node)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compare copying the values of the parent with overlaying them."""
+
+import time
+import tracemalloc
+
+import click
+from cels import patch_dictionary
+
+from spekulatio.models.values import ValuesOverlay
+from spekulatio.models.values import patch_values
+
+
+def generate_site_values(num_keys: int) -> dict:
+    """Return values like the ones of a site with a menu and translations."""
+    return {
+        "_template": "spekulatio/default.html",
+        "_url_prefix": "",
+        "menu": [{"title": f"Section {index}", "url": f"/section{index}/"} for index in range(50)],
+        "translations": {f"key{index}": f"Translation {index}" for index in range(num_keys)},
+    }
+
+
+def inherit_by_copy(parent, patch):
+    values = {}
+    values.update(parent)
+    values["_sort"] = ["*"]
+    return patch_dictionary(values, patch)
+
+
+def inherit_by_overlay(parent, patch):
+    values = ValuesOverlay(parent)
+    values["_sort"] = ["*"]
+    return patch_values(values, patch)
+
+
+def build(function, root_values, num_dirs, files_per_dir):
+    nodes = []
+    for dir_index in range(num_dirs):
+        directory = function(root_values, {"section": f"Section {dir_index}"})
+        for file_index in range(files_per_dir):
+            nodes.append(function(directory, {"title": f"Page {file_index}", "order": file_index}))
+    return nodes
+
+
+@click.command()
+@click.option("--keys", "num_keys", default=1000, help="Number of keys in the translations table.")
+@click.option("--dirs", "num_dirs", default=100, help="Number of directories.")
+@click.option("--files-per-dir", default=100, help="Number of files per directory.")
+def main(num_keys, num_dirs, files_per_dir):
+    root_values = generate_site_values(num_keys)
+    num_nodes = num_dirs * (files_per_dir + 1)
+
+    timings = {}
+    for name, function in [("copy", inherit_by_copy), ("overlay", inherit_by_overlay)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        nodes = build(function, root_values, num_dirs, files_per_dir)
+        timings[name] = time.perf_counter() - start
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert nodes[-1]["translations"]["key0"] == "Translation 0"
+        del nodes
+        print(
+            f"{name}: {timings[name]:.3f}s, {size / 2**20:.1f} MiB "
+            f"({size / num_nodes:.0f} bytes/node)"
+        )
+    print(f"speedup: {timings['copy'] / timings['overlay']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
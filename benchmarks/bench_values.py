@@ -0,0 +1,95 @@
+"""Compare the previous and the current way of finding and parsing values."""
+
+import time
+import random
+import tempfile
+from pathlib import Path
+
+import click
+import yaml
+
+from spekulatio.lib.decoders import load_yaml
+from spekulatio.lib.parse_values import get_values_file_name
+from spekulatio.lib.parse_values import get_values_file_variants
+from spekulatio.lib.parse_values import register_values_file
+from spekulatio.lib.parse_values import find_values_file
+
+
+def generate_documents(rng: random.Random, count: int) -> list[str]:
+    """Return frontmatter-like documents (most of them trivial)."""
+    documents = []
+    for index in range(count):
+        lines = [f"title: Page number {index}", f"order: {rng.randint(0, 1000)}"]
+        if rng.random() < 0.2:
+            lines.append(f"tags: [tag{rng.randint(0, 9)}, tag{rng.randint(0, 9)}]")
+            lines.append(f"date: 2020-01-{rng.randint(10, 28)}")
+        documents.append("\n".join(lines) + "\n")
+    return documents
+
+
+def generate_directories(rng: random.Random, base_path: Path, count: int) -> list[Path]:
+    """Create directories, some of them with a values file."""
+    directories = []
+    for index in range(count):
+        path = base_path / f"dir{index}"
+        path.mkdir()
+        (path / "page.md").write_text("Text.\n")
+        if rng.random() < 0.3:
+            (path / "_values.yaml").write_text("title: Section\n")
+        directories.append(path)
+    return directories
+
+
+def find_with_exists(directories):
+    for path in directories:
+        for variant, _ in get_values_file_variants():
+            if (path / variant).exists():
+                break
+
+
+def find_with_listing(directories):
+    # the listing is done anyway by the scanner when the tree is created
+    for path in directories:
+        names = [entry.name for entry in path.iterdir()]
+        register_values_file(str(path), get_values_file_name(names))
+    start = time.perf_counter()
+    for path in directories:
+        find_values_file(path)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--documents", "num_documents", default=20000, help="Number of documents to parse.")
+@click.option("--directories", "num_directories", default=5000, help="Number of directories.")
+@click.option("--seed", default=0, help="Seed used to generate the data.")
+def main(num_documents, num_directories, seed):
+    rng = random.Random(seed)
+    documents = generate_documents(rng, num_documents)
+
+    timings = {}
+    for name, function in [
+        ("safe_load", yaml.safe_load),
+        ("load_yaml", load_yaml),
+    ]:
+        start = time.perf_counter()
+        for document in documents:
+            function(document)
+        timings[name] = time.perf_counter() - start
+        print(f"{name}: {timings[name]:.3f}s ({num_documents / timings[name]:.0f} documents/s)")
+    print(f"parse speedup: {timings['safe_load'] / timings['load_yaml']:.1f}x")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        directories = generate_directories(rng, Path(tmp_dir), num_directories)
+
+        start = time.perf_counter()
+        find_with_exists(directories)
+        timings["exists"] = time.perf_counter() - start
+        timings["listing"] = find_with_listing(directories)
+        for name in ["exists", "listing"]:
+            rate = num_directories / timings[name]
+            print(f"{name}: {timings[name]:.3f}s ({rate:.0f} directories/s)")
+    print(f"discovery speedup: {timings['exists'] / timings['listing']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
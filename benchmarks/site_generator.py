@@ -0,0 +1,118 @@
+"""Generate synthetic Spekulatio sites for benchmarks.
+
+The same parameters (and seed) always produce the same site.
+"""
+
+import random
+from pathlib import Path
+from dataclasses import asdict
+from dataclasses import dataclass
+
+# template of every page (with a menu of the pages of its directory)
+LAYOUT = """<html>
+<head><title>{{ title }}</title></head>
+<body>
+<nav>{% for page in _this.parent.children %}<a href="{{ page.url }}">{{ page.values.title }}</a>{% endfor %}</nav>
+<main>{{ _content }}</main>
+</body>
+</html>
+"""
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod".split()
+
+
+@dataclass
+class SiteParameters:
+    """Shape of a generated site.
+
+    * `files`: number of Markdown files in the first layer.
+    * `depth`: number of levels of directories below the root.
+    * `fan_out`: number of subdirectories of each directory.
+    * `layers`: number of layers. Layers after the first one override one
+      of every `layers` files (and their values files).
+    * `frontmatter_keys`: number of keys in the frontmatter of each file.
+    * `paragraphs`: number of paragraphs of each Markdown document.
+    """
+
+    files: int = 1000
+    depth: int = 3
+    fan_out: int = 4
+    layers: int = 2
+    frontmatter_keys: int = 4
+    paragraphs: int = 5
+    seed: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+def get_directories(depth: int, fan_out: int) -> list[str]:
+    """Return the relative paths of the directories of a site (root included)."""
+    directories = [""]
+    level = [""]
+    for _ in range(depth):
+        level = [
+            f"{parent}/dir{index}" if parent else f"dir{index}"
+            for parent in level
+            for index in range(fan_out)
+        ]
+        directories.extend(level)
+    return directories
+
+
+def generate_document(rng: random.Random, parameters: SiteParameters, title: str) -> str:
+    """Return a Markdown document with a frontmatter."""
+    lines = ["---", f"title: {title}"]
+    for index in range(1, parameters.frontmatter_keys):
+        lines.append(f"key{index}: {' '.join(rng.choices(WORDS, k=3))}")
+    lines.append("---")
+    lines.append("")
+    lines.append(f"# {title}")
+    for index in range(parameters.paragraphs):
+        lines.append("")
+        if index % 3 == 2:
+            lines.extend(f"* {' '.join(rng.choices(WORDS, k=5))}" for _ in range(3))
+        else:
+            lines.append(" ".join(rng.choices(WORDS, k=40)))
+    return "\n".join(lines) + "\n"
+
+
+def generate_site(path: Path, parameters: SiteParameters) -> Path:
+    """Write a site in an (empty) directory.
+
+    :return: the path to the spekulatio.yaml file of the site.
+    """
+    rng = random.Random(parameters.seed)
+    directories = get_directories(parameters.depth, parameters.fan_out)
+
+    layer_paths = [f"layer{index}" for index in range(parameters.layers)]
+    spekulatio_file_path = path / "spekulatio.yaml"
+    spekulatio_file_path.write_text(
+        "layers:\n"
+        + "".join(f"  - path: {name}/\n" for name in layer_paths)
+        + "values:\n  _template: layout.html\n"
+    )
+    (path / layer_paths[0]).mkdir()
+    (path / layer_paths[0] / "layout.html").write_text(LAYOUT)
+
+    for layer_index, layer_path in enumerate(layer_paths):
+        layer_dir = path / layer_path
+        layer_dir.mkdir(exist_ok=True)
+        (layer_dir / "spekulatio.yaml").write_text("actions:\n  - name: Md2Html\n")
+
+        for directory_index, directory in enumerate(directories):
+            (layer_dir / directory).mkdir(parents=True, exist_ok=True)
+            if directory_index % parameters.layers == layer_index:
+                (layer_dir / directory / "_values.yaml").write_text(
+                    f"section: Section {directory_index}\nlayer: {layer_index}\n"
+                )
+
+        for file_index in range(parameters.files):
+            if layer_index and file_index % parameters.layers != layer_index:
+                continue
+            directory = directories[file_index % len(directories)]
+            title = f"Page {file_index} ({layer_path})"
+            document = generate_document(rng, parameters, title)
+            (layer_dir / directory / f"page{file_index}.md").write_text(document)
+
+    return spekulatio_file_path
@@ -3,6 +3,7 @@ import click
 
 from .show import show
 from .build import build
+from .watch import watch
 from .version import version
 
 
@@ -13,4 +14,5 @@ def spekulatio():
 
 spekulatio.add_command(show)  # type: ignore
 spekulatio.add_command(build)  # type: ignore
+spekulatio.add_command(watch)  # type: ignore
 spekulatio.add_command(version)  # type: ignore
@@ -1,11 +1,13 @@
-
+import os
 import sys
+import logging
 from pathlib import Path
 
 import click
 
 from spekulatio.logs import log
-from spekulatio.operations import get_layers
+from spekulatio.operations import build as build_project
+from spekulatio.exceptions import SpekulatioBuildError
 
 
 @click.command()
@@ -16,6 +18,64 @@ from spekulatio.operations import get_layers
     default="./spekulatio.yaml",
     help="Configuration file to use.",
 )
+@click.option(
+    "-o",
+    "--output",
+    "output_location",
+    default="./build",
+    help="Output directory.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of processes used to write files.",
+)
+@click.option(
+    "--incremental",
+    default=False,
+    is_flag=True,
+    help="Only write the files whose inputs changed since the previous build.",
+)
+@click.option(
+    "--sync",
+    default=False,
+    is_flag=True,
+    help="Remove the output files of previous builds that no input file produces anymore.",
+)
+@click.option(
+    "--fsync",
+    default=False,
+    is_flag=True,
+    help="Flush the written files to disk (in batches) before finishing.",
+)
+@click.option(
+    "--profile",
+    "profile_location",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Write a trace of the build (Chrome trace format) to this file.",
+)
+@click.option(
+    "--stats",
+    default=False,
+    is_flag=True,
+    help="Show nodes per action, bytes written and time per phase.",
+)
+@click.option(
+    "--changed-list",
+    "changed_list_location",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Write the paths of the output files that changed or were removed to this file (one per line).",
+)
+@click.option(
+    "--no-cache",
+    default=False,
+    is_flag=True,
+    help="Don't use or update the persistent caches.",
+)
 @click.option(
     "-v", "--verbose", default=False, is_flag=True, help="Show processing messages."
 )
@@ -24,27 +84,66 @@ from spekulatio.operations import get_layers
 )
 def build(
     config_location,
+    output_location,
+    jobs,
+    incremental,
+    sync,
+    fsync,
+    profile_location,
+    stats,
+    changed_list_location,
+    no_cache,
     verbose,
     very_verbose,
 ):
     """Build output directory."""
+    if no_cache:
+        os.environ["SPEKULATIO_NO_CACHE"] = "1"
 
     # configure logging
-    # if very_verbose:
-    #     log_level = log.DEBUG
-    # elif verbose:
-    #     log_level = log.INFO
-    # else:
-    #     log_level = log.WARN
+    if very_verbose or verbose:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.DEBUG if very_verbose else logging.INFO)
 
-    # get layers
+    spekulatio_file_path = Path(config_location)
+    output_path = Path(output_location)
+    profile_path = Path(profile_location) if profile_location else None
     try:
-        spekulatio_file_path = Path(config_location)
-        layers = get_layers(spekulatio_file_path)
+        output_path.mkdir(parents=True, exist_ok=True)
+        build_stats = build_project(
+            spekulatio_file_path,
+            output_path,
+            incremental=incremental,
+            jobs=jobs,
+            profile_path=profile_path,
+            sync=sync,
+            fsync=fsync,
+        )
+    except SpekulatioBuildError as err:
+        for path, message in err.errors:
+            log.error(f"{path}: {message}")
+        log.error(f"Error building project: {len(err.errors)} node(s) couldn't be written.")
+        sys.exit(1)
     except Exception as err:
-        log.error(f"Error reading configuration. {err}")
+        log.error(f"Error building project. {err}")
         sys.exit(1)
 
-    for layer in layers:
-        log.info(f"{layer.path.absolute()}")
-    log.info("Done.")
+    click.echo(
+        f"Built {build_stats.nodes} nodes ({build_stats.written} files written, "
+        f"{len(build_stats.changed_paths)} changed) in {build_stats.total_time:.2f}s."
+    )
+    if build_stats.removed_paths:
+        click.echo(f"Removed {len(build_stats.removed_paths)} stale files and directories.")
+    if changed_list_location:
+        changed_paths = sorted(
+            path.relative_to(output_path.absolute()).as_posix()
+            for path in build_stats.changed_paths + build_stats.removed_paths
+        )
+        Path(changed_list_location).write_text("".join(f"{path}\n" for path in changed_paths))
+    if stats:
+        click.echo(build_stats.format_summary())
+    if profile_path is not None:
+        click.echo(f"Profile written to {profile_path}.")
+        click.echo(build_stats.profile_report)
@@ -0,0 +1,64 @@
+import os
+import sys
+from pathlib import Path
+
+import click
+
+from spekulatio.logs import log
+from spekulatio.operations import watch as watch_project
+
+
+@click.command()
+@click.option(
+    "-c",
+    "--config",
+    "config_location",
+    default="./spekulatio.yaml",
+    help="Configuration file to use.",
+)
+@click.option(
+    "-o",
+    "--output",
+    "output_location",
+    default="./build",
+    help="Output directory.",
+)
+@click.option(
+    "--no-cache",
+    default=False,
+    is_flag=True,
+    help="Don't use or update the persistent caches.",
+)
+@click.option(
+    "--polling",
+    default=False,
+    is_flag=True,
+    help="Poll the filesystem instead of using inotify.",
+)
+@click.option(
+    "--interval",
+    default=1.0,
+    type=float,
+    help="Seconds between checks when polling.",
+)
+def watch(config_location, output_location, no_cache, polling, interval):
+    """Build output directory and rebuild it when files change."""
+    if no_cache:
+        os.environ["SPEKULATIO_NO_CACHE"] = "1"
+    spekulatio_file_path = Path(config_location)
+    output_path = Path(output_location)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    try:
+        for changes, nodes in watch_project(
+            spekulatio_file_path, output_path, polling=polling, interval=interval
+        ):
+            if not changes:
+                click.echo(f"Built {len(nodes)} nodes. Watching for changes...")
+            else:
+                click.echo(f"{len(changes)} changes: rebuilt {len(nodes)} nodes.")
+    except KeyboardInterrupt:
+        pass
+    except Exception as err:
+        log.error(f"Error building project. {err}")
+        sys.exit(1)
@@ -10,3 +10,11 @@ class SpekulatioInputError(SpekulatioError):
 
 class SpekulatioValidationError(SpekulatioInputError):
     """User configuration error."""
+
+class SpekulatioBuildError(SpekulatioError):
+    """Errors produced while writing the output tree."""
+
+    def __init__(self, errors: list[tuple[str, str]]):
+        self.errors = errors
+        details = "\n".join(f"{path}: {message}" for path, message in errors)
+        super().__init__(f"{len(errors)} node(s) couldn't be written:\n{details}")
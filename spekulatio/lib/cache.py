@@ -0,0 +1,40 @@
+
+import os
+from typing import Optional
+from pathlib import Path
+
+from spekulatio.logs import log
+
+
+def is_cache_enabled() -> bool:
+    """Return if persistent caches can be used.
+
+    They can be disabled by setting SPEKULATIO_NO_CACHE to a non-empty value
+    (`--no-cache` in the command line).
+    """
+    return not os.environ.get("SPEKULATIO_NO_CACHE")
+
+
+def get_cache_dir(name: str) -> Optional[Path]:
+    """Return (creating it if necessary) a directory for persistent caches.
+
+    The base location is taken from SPEKULATIO_CACHE_DIR and defaults to
+    `$XDG_CACHE_HOME/spekulatio` (or `~/.cache/spekulatio`).
+
+    :return: the path of the directory or None if it can't be used.
+    """
+    if not is_cache_enabled():
+        return None
+
+    base_dir = os.environ.get("SPEKULATIO_CACHE_DIR")
+    if not base_dir:
+        xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        base_dir = str(Path(xdg_cache_home) / "spekulatio")
+
+    cache_dir = Path(base_dir) / name
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as err:
+        log.warning(f"Can't use cache directory {cache_dir}: {err}")
+        return None
+    return cache_dir
@@ -0,0 +1,171 @@
+
+import os
+import sys
+import errno
+import shutil
+from pathlib import Path
+from typing import Callable
+
+from spekulatio.exceptions import SpekulatioInternalError
+from spekulatio.exceptions import SpekulatioValidationError
+
+# ioctl request to share the data blocks of two files (Linux)
+FICLONE = 0x40049409
+
+COPY_STRATEGIES = ["auto", "copy", "reflink", "kernel", "hardlink", "symlink"]
+
+# errors that mean that a copy method is not available for a pair of files
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EPERM,
+    errno.EACCES,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EBADF,
+    errno.EMLINK,
+}
+
+
+class CopyMethodUnavailable(Exception):
+    """The copy method can't be used for this pair of files."""
+
+
+def copy_file(src: Path, dst: Path, strategy: str = "auto") -> str:
+    """Materialize the file `src` at `dst` using the given strategy.
+
+    Strategies:
+
+    * `copy`: regular copy of contents and permission bits (`shutil.copy`).
+    * `auto`: share data blocks with the source if the filesystem supports it
+      (reflink), otherwise copy inside the kernel (`copy_file_range`/`sendfile`).
+    * `reflink`: same as `auto`.
+    * `kernel`: copy inside the kernel without trying to share data blocks.
+    * `hardlink`: create a hard link to the source. Falls back to `auto` if the
+      source and destination are in different filesystems.
+    * `symlink`: create a symbolic link to the source (intended for development
+      builds). Falls back to `auto` if symlinks can't be created.
+
+    Any existing file at `dst` is replaced (never written through, as it could
+    be a link to the source file itself).
+
+    :return: the name of the method that was finally used.
+    """
+    methods: dict[str, list[tuple[str, Callable[[Path, Path], None]]]] = {
+        "copy": [("copy", _copy)],
+        "auto": [("reflink", _reflink), ("kernel", _kernel_copy), ("copy", _copy)],
+        "reflink": [("reflink", _reflink), ("kernel", _kernel_copy), ("copy", _copy)],
+        "kernel": [("kernel", _kernel_copy), ("copy", _copy)],
+        "hardlink": [
+            ("hardlink", _hardlink),
+            ("reflink", _reflink),
+            ("kernel", _kernel_copy),
+            ("copy", _copy),
+        ],
+        "symlink": [
+            ("symlink", _symlink),
+            ("reflink", _reflink),
+            ("kernel", _kernel_copy),
+            ("copy", _copy),
+        ],
+    }
+    if strategy not in methods:
+        raise SpekulatioValidationError(f"Unknown copy strategy '{strategy}'.")
+
+    for name, method in methods[strategy]:
+        _remove(dst)
+        try:
+            method(src, dst)
+        except CopyMethodUnavailable:
+            continue
+        return name
+
+    raise SpekulatioInternalError(f"Can't copy {src} to {dst}.")
+
+
+def _remove(path: Path) -> None:
+    """Remove a file or link if it exists."""
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _is_unsupported(err: OSError) -> bool:
+    return err.errno in UNSUPPORTED_ERRNOS
+
+
+def _copy(src: Path, dst: Path) -> None:
+    shutil.copy(src, dst)
+
+
+def _hardlink(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError as err:
+        if _is_unsupported(err):
+            raise CopyMethodUnavailable
+        raise
+
+
+def _symlink(src: Path, dst: Path) -> None:
+    try:
+        os.symlink(src.absolute(), dst)
+    except (OSError, NotImplementedError) as err:
+        if isinstance(err, NotImplementedError) or _is_unsupported(err):
+            raise CopyMethodUnavailable
+        raise
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    if not sys.platform.startswith("linux"):
+        raise CopyMethodUnavailable
+
+    import fcntl
+
+    with src.open("rb") as fsrc, dst.open("wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError as err:
+            if _is_unsupported(err):
+                raise CopyMethodUnavailable
+            raise
+    shutil.copymode(src, dst)
+
+
+def _kernel_copy(src: Path, dst: Path) -> None:
+    """Copy file contents without moving them through user space."""
+    copy_functions = []
+    if hasattr(os, "copy_file_range"):
+        copy_functions.append(_copy_file_range_chunk)
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        copy_functions.append(_sendfile_chunk)
+
+    for copy_function in copy_functions:
+        with src.open("rb") as fsrc, dst.open("wb") as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            offset = 0
+            try:
+                while offset < size:
+                    copied = copy_function(fsrc.fileno(), fdst.fileno(), size - offset)
+                    if copied == 0:
+                        break
+                    offset += copied
+            except OSError as err:
+                if _is_unsupported(err):
+                    continue
+                raise
+        shutil.copymode(src, dst)
+        return
+
+    raise CopyMethodUnavailable
+
+
+def _copy_file_range_chunk(src_fd: int, dst_fd: int, count: int) -> int:
+    return os.copy_file_range(src_fd, dst_fd, min(count, 2**30))
+
+
+def _sendfile_chunk(src_fd: int, dst_fd: int, count: int) -> int:
+    return os.sendfile(dst_fd, src_fd, None, min(count, 2**30))
@@ -0,0 +1,118 @@
+
+import re
+import json
+from typing import Any
+from typing import Optional
+
+import yaml
+
+from .profiling import profiled
+
+# use libyaml if PyYAML has been built with it
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# words that YAML resolves to booleans or null
+RESERVED_WORDS = {
+    "yes", "Yes", "YES", "no", "No", "NO",
+    "true", "True", "TRUE", "false", "False", "FALSE",
+    "on", "On", "ON", "off", "Off", "OFF",
+    "null", "Null", "NULL",
+}
+
+# 'key: value' where the value is a plain string or a decimal integer
+PLAIN_ENTRY_PATTERN = re.compile(
+    r"([A-Za-z_][A-Za-z0-9_-]*):[ ]+(?:([A-Za-z][A-Za-z0-9 ._/()+=?;$-]*?)|(0|[1-9][0-9]*))[ ]*"
+)
+
+
+@profiled("load_yaml", "parse")
+def load_yaml(text: str) -> Any:
+    """Parse a YAML document.
+
+    Documents that are just a list of `key: value` lines (as most
+    frontmatters are) or JSON objects are decoded without the YAML parser.
+    Otherwise, libyaml is used if available. The result is always the same
+    as with `yaml.safe_load`, which is used directly for documents with
+    `\\u` escapes or tabs (libyaml decodes escaped surrogate pairs and tabs
+    used as indentation differently).
+    """
+    if "\\u" in text or "\t" in text:
+        return yaml.safe_load(text)
+
+    data = parse_plain_mapping(text)
+    if data is not None:
+        return data
+
+    if text.lstrip().startswith("{"):
+        data = parse_json_mapping(text)
+        if data is not None:
+            return data
+
+    return yaml.load(text, Loader=SafeLoader)
+
+
+@profiled("load_json", "parse")
+def load_json(text: str) -> Any:
+    """Parse a JSON document."""
+    return json.loads(text)
+
+
+def parse_plain_mapping(text: str) -> Optional[dict[str, Any]]:
+    """Decode documents made only of `key: value` lines.
+
+    Keys must be identifiers and values plain strings or decimal integers
+    (words that YAML reads as booleans or null are excluded). Empty lines
+    and comment lines are allowed.
+
+    :return: the mapping or None if the document has any other construct.
+    """
+    data: dict[str, Any] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = PLAIN_ENTRY_PATTERN.fullmatch(line)
+        if not match:
+            return None
+        key, string, integer = match.groups()
+        if key in RESERVED_WORDS:
+            return None
+        if integer is not None:
+            data[key] = int(integer)
+        elif string in RESERVED_WORDS:
+            return None
+        else:
+            data[key] = string
+    return data or None
+
+
+def parse_json_mapping(text: str) -> Optional[dict[str, Any]]:
+    """Decode a JSON object that YAML would read in the same way.
+
+    JSON is mostly a subset of YAML, but YAML 1.1 reads some numbers (eg.
+    `1e3`) as strings and merges the values of `<<` keys. It also decodes
+    surrogate pairs in `\\u` escapes differently and rejects tabs used as
+    indentation. Documents with floats, merge keys, `\\u` escapes or tabs are
+    left to the YAML parser.
+
+    :return: the mapping or None if the document can't be decoded this way.
+    """
+    if "\\u" in text or "\t" in text:
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or _needs_yaml(data):
+        return None
+    return data
+
+
+def _needs_yaml(data: Any) -> bool:
+    """Check if YAML would read a JSON value differently."""
+    if isinstance(data, float):
+        return True
+    if isinstance(data, dict):
+        return "<<" in data or any(_needs_yaml(value) for value in data.values())
+    if isinstance(data, list):
+        return any(_needs_yaml(value) for value in data)
+    return False
@@ -0,0 +1,23 @@
+
+import hashlib
+from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_text_digest(text: str) -> str:
+    """Return the hex digest of a string."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def get_file_digest(path: Path) -> str:
+    """Return the hex digest of the contents of a file.
+
+    The file is read in chunks so that large assets don't have to be
+    loaded in memory at once.
+    """
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
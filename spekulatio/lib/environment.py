@@ -0,0 +1,229 @@
+
+import os
+import weakref
+import posixpath
+from typing import Any
+from typing import Mapping
+from typing import Callable
+from typing import Optional
+from typing import TYPE_CHECKING
+from collections import ChainMap
+from functools import lru_cache
+
+from jinja2 import BaseLoader
+from jinja2 import Template
+from jinja2 import Environment
+from jinja2 import TemplateNotFound
+from jinja2 import pass_context
+from jinja2 import FileSystemBytecodeCache
+from jinja2.loaders import split_template_path
+
+from .cache import get_cache_dir
+from .profiling import span
+
+if TYPE_CHECKING:
+    from spekulatio.models.node import Node
+
+# maximum number of layer stacks with a live environment
+ENVIRONMENT_CACHE_SIZE = 16
+
+# environments returned by `get_environment`
+_environments: "weakref.WeakSet[SpekulatioEnvironment]" = weakref.WeakSet()
+
+
+class SpekulatioEnvironment(Environment):
+    """Jinja environment that keeps track of the templates it loads.
+
+    `loaded_templates` accumulates the names of all the templates requested
+    to the environment, including the ones pulled with `extends`, `include`
+    or `import` while rendering. It can be reset between renders to know
+    which templates were used to produce a given output.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loaded_templates: set[str] = set()
+
+    def forget_templates(self) -> None:
+        """Forget how template names were resolved and the compiled templates.
+
+        Needed when templates may have been added or removed since they were
+        loaded (eg. a new template that shadows one of a later layer).
+        """
+        if isinstance(self.loader, LayerLoader):
+            self.loader.clear_index()
+        if self.cache is not None:
+            self.cache.clear()
+
+    def get_template(self, name, *args, **kwargs):
+        template = super().get_template(name, *args, **kwargs)
+        if template.name:
+            self.loaded_templates.add(template.name)
+        return template
+
+    def select_template(self, names, *args, **kwargs):
+        template = super().select_template(names, *args, **kwargs)
+        if template.name:
+            self.loaded_templates.add(template.name)
+        return template
+
+
+class LayerLoader(BaseLoader):
+    """Load templates from a list of layer directories.
+
+    Templates are searched in the directories in order (as Jinja's
+    `FileSystemLoader` does), but each directory is only listed once. The
+    resolution of every template name to its file is kept in an index, so
+    repeated lookups don't touch the filesystem.
+    """
+
+    def __init__(self, searchpath: list[str], encoding: str = "utf-8"):
+        self.searchpath = list(searchpath)
+        self.encoding = encoding
+        self._listings: dict[str, frozenset[str]] = {}
+        self._index: dict[str, Optional[str]] = {}
+
+    def clear_index(self) -> None:
+        """Forget directory listings and resolved names."""
+        self._listings.clear()
+        self._index.clear()
+
+    def _forget(self, template: str) -> None:
+        """Forget the resolution of a name and the listings used for it."""
+        self._index.pop(template, None)
+        pieces = split_template_path(template)
+        for searchpath in self.searchpath:
+            directory = posixpath.join(searchpath, *pieces[:-1])
+            self._listings.pop(directory, None)
+
+    def _list_files(self, directory: str) -> frozenset[str]:
+        """Return the names of the files of a directory."""
+        try:
+            return self._listings[directory]
+        except KeyError:
+            pass
+
+        try:
+            with os.scandir(directory) as entries:
+                names = frozenset(entry.name for entry in entries if entry.is_file())
+        except OSError:
+            names = frozenset()
+        self._listings[directory] = names
+        return names
+
+    def resolve(self, template: str) -> Optional[str]:
+        """Return the file associated to a template name (or None if it can't be found)."""
+        try:
+            return self._index[template]
+        except KeyError:
+            pass
+
+        pieces = split_template_path(template)
+        filename = None
+        if pieces:
+            for searchpath in self.searchpath:
+                directory = posixpath.join(searchpath, *pieces[:-1])
+                if pieces[-1] in self._list_files(directory):
+                    filename = posixpath.join(directory, pieces[-1])
+                    break
+
+        self._index[template] = filename
+        return filename
+
+    def get_source(
+        self, environment: Environment, template: str
+    ) -> tuple[str, str, Callable[[], bool]]:
+        filename = self.resolve(template)
+        try:
+            if filename is None:
+                raise FileNotFoundError
+            with open(filename, encoding=self.encoding) as f:
+                contents = f.read()
+        except FileNotFoundError:
+            # the index may be stale: resolve the name again from scratch
+            self._forget(template)
+            filename = self.resolve(template)
+            if filename is None:
+                paths = ", ".join(repr(path) for path in self.searchpath)
+                raise TemplateNotFound(template, f"{template!r} not found in: {paths}")
+            with open(filename, encoding=self.encoding) as f:
+                contents = f.read()
+
+        mtime = os.path.getmtime(filename)
+
+        def uptodate() -> bool:
+            try:
+                return os.path.getmtime(filename) == mtime
+            except OSError:
+                return False
+
+        return contents, os.path.normpath(filename), uptodate
+
+
+@pass_context
+def lookup(context, path: str, output: bool = False) -> "Node":
+    """Return the node of a path (template global).
+
+    Input paths can be absolute (eg. `/blog/post.md`) or relative to the
+    directory being rendered or to the directory that contains the file being
+    rendered. With `output=True`, the node is searched by its absolute output
+    path instead (eg. `/blog/post.html`).
+    """
+    node = context["_this"]
+    if output:
+        return node.get_by_output_path(path)
+    if not node.is_dir:
+        node = node.parent
+    return node.get(path)
+
+
+@pass_context
+def url_for(context, path: str) -> str:
+    """Return the URL of the node of an input path (template global)."""
+    return lookup(context, path).url
+
+
+@lru_cache(maxsize=ENVIRONMENT_CACHE_SIZE)
+def get_environment(template_dirs: tuple[str, ...]) -> SpekulatioEnvironment:
+    """Return the environment shared by all nodes with the same layer stack.
+
+    Compiled templates are also stored on disk so that later builds don't
+    need to parse them again.
+    """
+    bytecode_cache = None
+    cache_dir = get_cache_dir("jinja")
+    if cache_dir:
+        bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+
+    environment = SpekulatioEnvironment(
+        loader=LayerLoader(list(template_dirs)),
+        bytecode_cache=bytecode_cache,
+    )
+    environment.globals.update(lookup=lookup, url_for=url_for)
+    _environments.add(environment)
+    return environment
+
+
+def forget_templates() -> None:
+    """Forget the templates loaded by all the shared environments.
+
+    Environments live for the whole process, so this has to be called before
+    each build to see the templates added or removed since the previous one.
+    """
+    for environment in list(_environments):
+        environment.forget_templates()
+
+
+def render_template(template: Template, values: Mapping[Any, Any]) -> str:
+    """Render a template with the given values.
+
+    Unlike `Template.render`, the values are not copied into a new dictionary
+    before rendering. They're looked up only when the template uses them, so
+    lazy values that the template doesn't need are never computed.
+    """
+    context = template.new_context(ChainMap(values, template.globals), shared=True)  # type: ignore
+    with span("render_template", "jinja"):
+        try:
+            return template.environment.concat(template.root_render_func(context))  # type: ignore
+        except Exception:
+            return template.environment.handle_exception()
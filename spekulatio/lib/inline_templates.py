@@ -0,0 +1,109 @@
+
+import re
+from typing import Any
+from typing import Callable
+from typing import Mapping
+from typing import Optional
+from pathlib import PurePath
+from functools import lru_cache
+
+from jinja2 import Template
+from jinja2 import Environment
+
+from .environment import render_template
+
+# maximum number of compiled templates kept in memory
+CACHE_SIZE = 1024
+
+# longer templates (eg. the content of a page) are compiled every time they're
+# rendered, so that the cache only holds short ones (like output names)
+MAX_CACHED_SOURCE_LENGTH = 256
+
+# {{ _input_name }}
+IDENTITY_PATTERN = re.compile(r"\{\{\s*(_input_name|_i)\s*\}\}")
+
+# {{ _input_name.with_suffix('.html') }}
+SUFFIX_PATTERN = re.compile(
+    r"""\{\{\s*(_input_name|_i)\.with_suffix\(\s*(['"])(\.[^'"\\]*)\2\s*\)\s*\}\}"""
+)
+
+Renderer = Callable[[Mapping[Any, Any]], str]
+
+
+def render_inline_template(src: str, values: Mapping[Any, Any]) -> str:
+    """Render a template passed as a string.
+
+    The template is compiled with the Jinja environment of the node (`_env`),
+    so it has the same globals and can include the templates of its layers.
+    """
+    env = values.get("_env")
+    if len(src) > MAX_CACHED_SOURCE_LENGTH:
+        render = create_renderer(src, env)
+    else:
+        render = compile_inline_template(src, env)
+    return render(values)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_inline_template(src: str, env: Optional[Environment] = None) -> Renderer:
+    """Return a function that renders the template contained in a string.
+
+    Same as `create_renderer`, but the results are cached by the source text
+    and the environment.
+    """
+    return create_renderer(src, env)
+
+
+def create_renderer(src: str, env: Optional[Environment] = None) -> Renderer:
+    """Return a function that renders the template contained in a string.
+
+    The template is compiled with `env` (or with Jinja's default environment if
+    not provided) the first time it's rendered. Some common cases are resolved
+    without using Jinja at all:
+
+    * text without Jinja constructs,
+    * `{{ _input_name }}`,
+    * `{{ _input_name.with_suffix('<suffix>') }}`.
+
+    In all cases, the result is the same as rendering the template with Jinja.
+    """
+    template: Template = None  # type: ignore
+
+    def render_with_jinja(values: Mapping[Any, Any]) -> str:
+        nonlocal template
+        if template is None:
+            template = Template(src) if env is None else env.from_string(src)
+        return render_template(template, values)
+
+    # plain text (Jinja removes a single trailing newline by default)
+    if "{" not in src and "\r" not in src:
+        text = src[:-1] if src.endswith("\n") else src
+        return lambda values: text
+
+    # input name
+    match = IDENTITY_PATTERN.fullmatch(src)
+    if match:
+        key = match.group(1)
+
+        def render_identity(values: Mapping[Any, Any]) -> str:
+            name = values.get(key)
+            if not isinstance(name, PurePath):
+                return render_with_jinja(values)
+            return str(name)
+
+        return render_identity
+
+    # input name with different suffix
+    match = SUFFIX_PATTERN.fullmatch(src)
+    if match:
+        key, suffix = match.group(1), match.group(3)
+
+        def render_suffix(values: Mapping[Any, Any]) -> str:
+            name = values.get(key)
+            if not isinstance(name, PurePath):
+                return render_with_jinja(values)
+            return str(name.with_suffix(suffix))
+
+        return render_suffix
+
+    return render_with_jinja
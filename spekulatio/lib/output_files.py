@@ -0,0 +1,263 @@
+
+import os
+import stat
+import queue
+import filecmp
+import threading
+from typing import Union
+from typing import Callable
+from typing import Optional
+from pathlib import Path
+
+from spekulatio.logs import log
+from .profiling import span
+from .copy_file import copy_file
+
+CHUNK_SIZE = 1024 * 1024
+
+# maximum number of files waiting to be written by a background writer
+MAX_PENDING_WRITES = 64
+
+# number of written files that are flushed to disk together (if requested)
+FSYNC_BATCH_SIZE = 256
+
+
+class OutputChanges(list):
+    """Output files changed by a group of writes.
+
+    `error` is the exception raised by a write that was made in the
+    background (if any).
+    """
+
+    error: Optional[BaseException] = None
+
+
+# lists where the changed output files are being collected (innermost last)
+_collectors: list[OutputChanges] = []
+
+# writer that is currently writing the output files in the background
+_writer: Optional["OutputWriter"] = None
+
+
+class collect_changes:
+    """Context manager that collects the output files changed while active.
+
+        with collect_changes() as changed_paths:
+            node.write(output_path)
+
+    If the files are being written in the background (see `pipelined_writes`),
+    the list is complete once the writer has finished.
+    """
+
+    def __enter__(self) -> OutputChanges:
+        self.paths = OutputChanges()
+        _collectors.append(self.paths)
+        return self.paths
+
+    def __exit__(self, *args) -> None:
+        _collectors.pop()
+
+
+class OutputWriter:
+    """Thread that writes the output files while the next ones are produced.
+
+    Writes are queued in a bounded queue (so producers wait instead of
+    holding an unlimited amount of content in memory) and executed in order
+    by a single thread. File I/O releases the GIL, so the disk works while
+    the main thread renders the next nodes.
+
+    If `fsync` is True, written files (and their directories) are flushed
+    to disk in batches of `FSYNC_BATCH_SIZE` files.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_WRITES, fsync: bool = False):
+        self.fsync = fsync
+        self.jobs: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.unsynced: list[Path] = []
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self.run, name="output-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, write: Callable[[], Optional[Path]]) -> None:
+        """Queue a write (a function that returns the changed path, if any)."""
+        self.jobs.put((write, tuple(_collectors)))
+
+    def run(self) -> None:
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            write, collectors = job
+            try:
+                changed_path = write()
+            except BaseException as err:
+                if collectors:
+                    collectors[-1].error = err
+                elif self.error is None:
+                    self.error = err
+                continue
+            if changed_path is not None:
+                for paths in collectors:
+                    paths.append(changed_path)
+                if self.fsync:
+                    self.unsynced.append(changed_path)
+                    if len(self.unsynced) >= FSYNC_BATCH_SIZE:
+                        self.sync()
+        if self.fsync:
+            self.sync()
+
+    def sync(self) -> None:
+        """Flush the files written since the last call (and their directories)."""
+        directories = {path.parent for path in self.unsynced}
+        for path in [*self.unsynced, *directories]:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.unsynced = []
+
+    def close(self) -> None:
+        """Wait until all the queued files are written."""
+        self.jobs.put(None)
+        self.thread.join()
+
+
+class pipelined_writes:
+    """Context manager that moves the writes of output files to a background thread.
+
+        with pipelined_writes():
+            for node in nodes:
+                node.write(output_path)
+
+    All the files have been written when the block exits. Errors of writes
+    made inside a `collect_changes` block are stored in its `error`
+    attribute; the rest are raised on exit (or logged, if the block is
+    already exiting because of an exception).
+    """
+
+    def __init__(self, fsync: bool = False):
+        self.fsync = fsync
+
+    def __enter__(self) -> OutputWriter:
+        global _writer
+        if _writer is not None:
+            raise RuntimeError("Output files are already being written in the background.")
+        self.writer = _writer = OutputWriter(fsync=self.fsync)
+        return self.writer
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        global _writer
+        _writer = None
+        self.writer.close()
+        if self.writer.error is None:
+            return
+        if exc_type is None:
+            raise self.writer.error
+        # don't hide the error that interrupted the block
+        log.error(f"Error writing output files: {self.writer.error}")
+
+
+def _record_change(path: Path) -> None:
+    for paths in _collectors:
+        paths.append(path)
+
+
+def _run(write: Callable[[], Optional[Path]]) -> None:
+    """Run a write now or queue it in the background writer."""
+    if _writer is not None:
+        _writer.submit(write)
+        return
+    changed_path = write()
+    if changed_path is not None:
+        _record_change(changed_path)
+
+
+def write_output(path: Path, content: Union[str, bytes]) -> None:
+    """Write an output file unless it already has the same content.
+
+    Identical files are left untouched (so their mtime is preserved). Other
+    files are replaced atomically: readers see either the previous file or
+    the new one, never a partially written file. Use `collect_changes` to
+    know which files have been written.
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+
+    def write() -> Optional[Path]:
+        with span("write_file", "io"):
+            if has_content(path, data):
+                return None
+            _replace(path, lambda tmp_path: tmp_path.write_bytes(data))
+        return path
+
+    _run(write)
+
+
+def copy_output(src: Path, dst: Path, strategy: str = "auto") -> None:
+    """Copy a file to the output directory unless the copy is already there.
+
+    See `copy_file` for the available strategies. The copy is made next to
+    the destination and then moved into place atomically.
+    """
+
+    def copy() -> Optional[Path]:
+        with span("copy_file", "io"):
+            if is_copy_of(dst, src, strategy):
+                return None
+            _replace(dst, lambda tmp_path: copy_file(src, tmp_path, strategy))
+        return dst
+
+    _run(copy)
+
+
+def has_content(path: Path, data: bytes) -> bool:
+    """Check if a regular file has exactly the given content.
+
+    Sizes are compared first, so files that changed size are not read.
+    """
+    try:
+        file_stat = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size != len(data):
+        return False
+
+    view = memoryview(data)
+    offset = 0
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            if view[offset:offset + len(chunk)] != chunk:
+                return False
+            offset += len(chunk)
+    return offset == len(data)
+
+
+def is_copy_of(dst: Path, src: Path, strategy: str) -> bool:
+    """Check if `dst` already is what copying `src` with a strategy would produce."""
+    try:
+        dst_stat = os.lstat(dst)
+    except FileNotFoundError:
+        return False
+
+    if stat.S_ISLNK(dst_stat.st_mode):
+        return strategy == "symlink" and os.readlink(dst) == str(src.absolute())
+    if strategy == "symlink" or not stat.S_ISREG(dst_stat.st_mode):
+        return False
+    if os.path.samefile(src, dst):
+        # a link to the source is only kept if links are requested
+        return strategy == "hardlink"
+    # copies also have the permissions of the source
+    if stat.S_IMODE(os.stat(src).st_mode) != stat.S_IMODE(dst_stat.st_mode):
+        return False
+    return filecmp.cmp(src, dst, shallow=False)
+
+
+def _replace(path: Path, write: Callable[[Path], object]) -> None:
+    """Create a file with a temporary name and then move it to `path`."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
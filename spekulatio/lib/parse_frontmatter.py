@@ -1,13 +1,21 @@
 
 import re
-import yaml
+from typing import Optional
 
 from spekulatio.exceptions import SpekulatioValidationError
+from .decoders import load_yaml
 
 FRONTMATTER_PATTERN = re.compile(
     r"^---\s*?^(.*?)^---\s*?^(.*)", re.MULTILINE | re.DOTALL
 )
 
+def split_frontmatter(text: str) -> tuple[Optional[str], str]:
+    """Return the frontmatter of a text (or None if it has none) and its content."""
+    match = FRONTMATTER_PATTERN.fullmatch(text)
+    if not match:
+        return None, text
+    return match.group(1), match.group(2)
+
 def parse_frontmatter(text: str):
     """Extract YAML frontmatter data from text.
 
@@ -31,17 +39,13 @@ def parse_frontmatter(text: str):
     """
 
     # check if the document has a frontmatter section
-    match = FRONTMATTER_PATTERN.fullmatch(text)
-    if not match:
+    frontmatter, content = split_frontmatter(text)
+    if frontmatter is None:
         return text, {}
 
-    # get parts
-    frontmatter = match.group(1)
-    content = match.group(2)
-
     # parse frontmatter
     try:
-        metadata = yaml.safe_load(frontmatter) or {}
+        metadata = load_yaml(frontmatter) or {}
     except Exception as err:
         raise SpekulatioValidationError(f"Can't parse YAML in frontmatter: {err}")
 
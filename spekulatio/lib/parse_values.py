@@ -1,25 +1,67 @@
 
-import yaml
-import json
+import os
 from pathlib import Path
-from typing import Dict, Callable
+from typing import Dict, Callable, Iterable, Optional
 
 from spekulatio.logs import log
 from spekulatio.exceptions import SpekulatioValidationError
 from .parse_frontmatter import parse_frontmatter
+from .parse_frontmatter import split_frontmatter
+from .values_cache import get_values_cache
+from .decoders import load_yaml
+from .decoders import load_json
+
+# values files found while listing directories (None if there's none)
+_listed_values_files: dict[str, Optional[str]] = {}
+
+def read_text(path: Path) -> tuple[str, os.stat_result]:
+    """Return the text of a file and its stat (taken before reading it)."""
+    with open(path, encoding="utf-8") as f:
+        stat = os.fstat(f.fileno())
+        return f.read(), stat
 
 def parse_values_from_frontmatter(path: Path):
-    """Extract frontmatter values from the given path."""
-    text = path.read_text(encoding="utf-8")
+    """Extract frontmatter values from the given path.
+
+    Parsed frontmatters are kept in the values cache.
+
+    :return: (content, values) as `parse_frontmatter`.
+    """
+    text, stat = read_text(path)
+    cache = get_values_cache()
+    if cache is not None:
+        entry = cache.get("frontmatter", path, stat) or cache.find(
+            "frontmatter", path, text, stat
+        )
+        if entry is not None:
+            offset, values = entry
+            return text[offset:], values
+
     src, values = parse_frontmatter(text)
+    if cache is not None:
+        cache.set("frontmatter", path, text, stat, len(text) - len(src), values)
     return src, values
 
-def parse_values_from_directory(path: Path, name: str = '_values'):
-    """Extract values from a values file."""
-    if path.exists() and not path.is_dir():
-        raise SpekulatioValidationError(f"{path} is not a directory.")
+def get_frontmatter_values(path: Path) -> dict:
+    """Return the frontmatter values of a file.
+
+    The file is only read if its values aren't in the values cache.
+    """
+    cache = get_values_cache()
+    if cache is not None:
+        entry = cache.get("frontmatter", path, os.stat(path))
+        if entry is not None:
+            return entry[1]
+    return parse_values_from_frontmatter(path)[1]
 
-    variants = [
+def read_frontmatter_content(path: Path) -> str:
+    """Return the text of a file without its frontmatter (the values aren't parsed)."""
+    text, _ = read_text(path)
+    return split_frontmatter(text)[1]
+
+def get_values_file_variants(name: str = '_values') -> list[tuple[str, str]]:
+    """Return the accepted filenames for a values file and their types."""
+    return [
         (f"{name}.yaml", "yaml"),
         (f"{name}.yml", "yaml"),
         (f"{name}.YAML", "yaml"),
@@ -27,15 +69,73 @@ def parse_values_from_directory(path: Path, name: str = '_values'):
         (f"{name}.json", "json"),
         (f"{name}.JSON", "json"),
     ]
-    load_functions: Dict[str, Callable] = {
-        "yaml": yaml.safe_load,
-        "json": json.loads,
-    }
 
-    for variant, filetype in variants:
+VALUES_FILE_TYPES = dict(get_values_file_variants())
+
+def get_values_file_name(names: Iterable[str]) -> Optional[str]:
+    """Return which of the names of the entries of a directory is its values file."""
+    found = set(names)
+    for variant, _ in get_values_file_variants():
+        if variant in found:
+            return variant
+    return None
+
+def register_values_file(path: str, variant: Optional[str]) -> None:
+    """Record the values file of a directory (or None if it doesn't have one).
+
+    Directories are listed when the tree is created, so this avoids checking
+    again if each variant of the values file exists.
+    """
+    _listed_values_files[path] = variant
+
+def forget_values_file(path: str) -> None:
+    """Forget the values file recorded for a directory."""
+    _listed_values_files.pop(path, None)
+
+def find_values_file(path: Path, name: str = '_values') -> Optional[tuple[Path, str]]:
+    """Return the values file of a directory and its type (or None if there's none)."""
+    variant = _listed_values_files.get(str(path), "") if name == '_values' else ""
+    if variant is None:
+        return None
+    if variant:
+        return path / variant, VALUES_FILE_TYPES[variant]
+
+    if path.exists() and not path.is_dir():
+        raise SpekulatioValidationError(f"{path} is not a directory.")
+
+    for variant, filetype in get_values_file_variants(name):
         values_path = path / variant
         if values_path.exists():
-            load_function = load_functions[filetype]
-            text = values_path.read_text(encoding="utf-8")
-            return load_function(text) or {}
-    return {}
+            return values_path, filetype
+    return None
+
+def parse_values_from_directory(path: Path, name: str = '_values'):
+    """Extract values from a values file."""
+    load_functions: Dict[str, Callable] = {
+        "yaml": load_yaml,
+        "json": load_json,
+    }
+
+    values_file = find_values_file(path, name)
+    if not values_file:
+        return {}
+
+    values_path, filetype = values_file
+    cache = get_values_cache()
+    if cache is not None:
+        # the file is only read if it changed
+        entry = cache.get(filetype, values_path, os.stat(values_path))
+        if entry is not None:
+            return entry[1]
+
+    text, stat = read_text(values_path)
+    if cache is not None:
+        entry = cache.find(filetype, values_path, text, stat)
+        if entry is not None:
+            return entry[1]
+
+    load_function = load_functions[filetype]
+    values = load_function(text) or {}
+    if cache is not None:
+        cache.set(filetype, values_path, text, stat, 0, values)
+    return values
@@ -0,0 +1,167 @@
+
+import os
+import json
+import time
+import threading
+from typing import Any
+from typing import Optional
+from pathlib import Path
+from functools import wraps
+
+# profiler of the current build (None when profiling is disabled)
+_profiler: Optional["Profiler"] = None
+
+
+class Profiler:
+    """Collect the time spent in each phase of a build and in each node.
+
+    Spans are stored as complete events of the Chrome trace format, so the
+    trace can be loaded in `chrome://tracing` or https://ui.perfetto.dev.
+    Spans that belong to a node record its input path in their arguments.
+    """
+
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self.events: list[dict[str, Any]] = []
+
+    def add(
+        self,
+        name: str,
+        category: str,
+        start_ns: int,
+        end_ns: int,
+        node: Optional[str] = None,
+    ) -> None:
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_ns - self.start_ns) / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": self.pid,
+            "tid": threading.get_native_id(),
+        }
+        if node is not None:
+            event["args"] = {"node": node}
+        self.events.append(event)
+
+    def take_events(self) -> list[dict[str, Any]]:
+        """Return the events collected so far and forget them."""
+        events, self.events = self.events, []
+        return events
+
+    def get_trace(self) -> dict[str, Any]:
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def save_trace(self, path: Path) -> None:
+        path.write_text(json.dumps(self.get_trace()), encoding="utf-8")
+
+    def get_phase_times(self) -> dict[str, float]:
+        """Return the time spent in each phase (in ms)."""
+        phases: dict[str, float] = {}
+        for event in self.events:
+            if event["cat"] == "phase":
+                phases[event["name"]] = phases.get(event["name"], 0.0) + event["dur"] / 1000
+        return phases
+
+    def get_slowest_nodes(self, count: int = 10) -> list[tuple[str, float]]:
+        """Return the nodes that took longest to write (and the time, in ms)."""
+        times: dict[str, float] = {}
+        for event in self.events:
+            if event["name"] == "write_node":
+                node = event["args"]["node"]
+                times[node] = times.get(node, 0.0) + event["dur"] / 1000
+        return sorted(times.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    def format_report(self, count: int = 10) -> str:
+        lines = ["Phases:"]
+        for name, duration in self.get_phase_times().items():
+            lines.append(f"  {duration:10.1f} ms  {name}")
+        lines.append(f"Slowest nodes (top {count}):")
+        for node, duration in self.get_slowest_nodes(count):
+            lines.append(f"  {duration:10.1f} ms  {node}")
+        return "\n".join(lines)
+
+
+class Span:
+    """Context manager that records a span in the profiler."""
+
+    __slots__ = ("profiler", "name", "category", "node", "start_ns")
+
+    def __init__(self, profiler: Profiler, name: str, category: str, node: Optional[str]):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.node = node
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args) -> None:
+        end_ns = time.perf_counter_ns()
+        self.profiler.add(self.name, self.category, self.start_ns, end_ns, self.node)
+
+
+class NoSpan:
+    """Context manager that does nothing (used when profiling is disabled)."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *args) -> None:
+        return None
+
+
+NO_SPAN = NoSpan()
+
+
+def span(name: str, category: str, node: Optional[str] = None):
+    """Return a context manager that records a span if profiling is enabled.
+
+    :param node: input path of the node the span belongs to (if any).
+    """
+    if _profiler is None:
+        return NO_SPAN
+    return Span(_profiler, name, category, node)
+
+
+def profiled(name: str, category: str):
+    """Decorator that records a span for each call to a function."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return function(*args, **kwargs)
+            with Span(_profiler, name, category, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_profiling() -> Profiler:
+    """Enable profiling in this process."""
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def stop_profiling() -> Optional[Profiler]:
+    """Disable profiling and return the profiler used until now."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def get_profiler() -> Optional[Profiler]:
+    return _profiler
+
+
+def reset_profiler() -> None:
+    """Forget the events inherited from the parent process (in a forked worker)."""
+    if _profiler is not None:
+        _profiler.pid = os.getpid()
+        _profiler.events = []
@@ -0,0 +1,78 @@
+from typing import Any
+from typing import TypeVar
+from dataclasses import fields
+
+T = TypeVar("T")
+
+
+def get_cache_slot(name: str) -> str:
+    """Return the name of the slot where a cached property is stored."""
+    return f"_cached_{name}"
+
+
+class cached_slot_property:
+    """Equivalent of `functools.cached_property` for classes with `__slots__`.
+
+    The value is stored in a slot named after the property (see
+    `get_cache_slot`) that the class must declare. Deleting the property
+    forgets the value, so it's computed again the next time it's accessed.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.attrname = func.__name__
+        self.slotname = get_cache_slot(func.__name__)
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner: Any, name: str) -> None:
+        self.attrname = name
+        self.slotname = get_cache_slot(name)
+
+    def __get__(self, instance: Any, owner: Any = None) -> Any:
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slotname)
+        except AttributeError:
+            pass
+        value = self.func(instance)
+        setattr(instance, self.slotname, value)
+        return value
+
+    def __set__(self, instance: Any, value: Any) -> None:
+        setattr(instance, self.slotname, value)
+
+    def __delete__(self, instance: Any) -> None:
+        try:
+            delattr(instance, self.slotname)
+        except AttributeError:
+            pass
+
+
+def add_slots(cls: type[T]) -> type[T]:
+    """Class decorator that gives a slot to each field of a dataclass.
+
+    Same as `@dataclass(slots=True)`, which requires Python 3.10. The class
+    is created again with a `__slots__` entry for each field (defaults are
+    kept by the generated `__init__`). Slots declared by the base classes
+    are not repeated.
+
+        @add_slots
+        @dataclass
+        class Point:
+            x: int = 0
+    """
+    inherited_slots = {
+        slot for base in cls.__mro__[1:] for slot in getattr(base, "__slots__", ())
+    }
+    field_names = tuple(field.name for field in fields(cls))  # type: ignore[arg-type]
+    cls_dict = dict(cls.__dict__)
+    cls_dict["__slots__"] = tuple(name for name in field_names if name not in inherited_slots)
+    for name in field_names:
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    metaclass: type = type(cls)
+    new_cls = metaclass(cls.__name__, cls.__bases__, cls_dict)
+    new_cls.__qualname__ = cls.__qualname__
+    return new_cls
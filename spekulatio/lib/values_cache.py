@@ -0,0 +1,233 @@
+
+import os
+import time
+import atexit
+import pickle
+import sqlite3
+import multiprocessing
+from typing import Any
+from typing import Optional
+from pathlib import Path
+
+from spekulatio.logs import log
+from .cache import get_cache_dir
+from .cache import is_cache_enabled
+from .digests import get_text_digest
+
+CACHE_VERSION = 1
+
+# maximum size of the stored values (in bytes)
+MAX_CACHE_SIZE = 256 * 1024 * 1024
+
+# number of new entries written in a single transaction
+BATCH_SIZE = 1000
+
+# files modified this close to the moment they're stored may change again
+# without changing their mtime, so they're only found by content
+RACY_INTERVAL_NS = 2_000_000_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (kind, path)
+);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (kind, digest);
+"""
+
+_cache: Optional["ValuesCache"] = None
+
+
+class ValuesCache:
+    """Persistent cache of parsed values (frontmatters and values files).
+
+    Entries are keyed by the kind of file and its path, and are valid while
+    the size, mtime and inode of the file don't change, so they can be found
+    without reading the file (`get`). If they do (eg. the file has been
+    touched or checked out again), an entry with the same content digest is
+    reused (`find`). The stat of a file must be taken before reading its
+    text, so that a later change can't be stored under an earlier text.
+
+    Each entry stores the parsed values and the offset where the rest of the
+    text (eg. the content after a frontmatter) starts.
+
+    The cache is stored in a SQLite database. When it grows beyond
+    `max_size`, the entries used least recently are evicted.
+
+    A read-only cache doesn't store new entries. It is used by worker
+    processes so that they never wait for each other to write.
+    """
+
+    def __init__(self, path: Path, max_size: int = MAX_CACHE_SIZE, read_only: bool = False):
+        self.path = path
+        self.max_size = max_size
+        self.read_only = read_only
+        self.closed = False
+        self.pending = 0
+        self.hits: list[tuple[int, str, str]] = []
+        self.pid = os.getpid()
+        self.connection = sqlite3.connect(str(path), timeout=5)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != CACHE_VERSION:
+            self.connection.execute("DELETE FROM entries")
+            self.connection.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            self.connection.commit()
+
+    def get(self, kind: str, path: Path, stat: os.stat_result) -> Optional[tuple[int, Any]]:
+        """Return the offset and values stored for a file with the same stat (or None).
+
+        The file doesn't need to be read for this lookup.
+        """
+        key = str(path.absolute())
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, inode, offset, data FROM entries WHERE kind = ? AND path = ?",
+            (kind, key),
+        ).fetchone()
+        if row and row[:3] == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            self.hits.append((time.time_ns(), kind, key))
+            return row[3], pickle.loads(row[4])
+        return None
+
+    def find(
+        self, kind: str, path: Path, text: str, stat: os.stat_result
+    ) -> Optional[tuple[int, Any]]:
+        """Return the offset and values stored for a file with the same content (or None).
+
+        Used when `get` fails: the file may have been touched without
+        changing its content. The entry found is stored again for the file.
+        """
+        digest = get_text_digest(text)
+        row = self.connection.execute(
+            "SELECT offset, data FROM entries WHERE kind = ? AND digest = ? LIMIT 1",
+            (kind, digest),
+        ).fetchone()
+        if not row:
+            return None
+        offset, data = row
+        self._write(kind, str(path.absolute()), stat, digest, offset, data)
+        return offset, pickle.loads(data)
+
+    def set(
+        self, kind: str, path: Path, text: str, stat: os.stat_result, offset: int, values: Any
+    ) -> None:
+        """Store the values parsed from a file."""
+        try:
+            data = pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # values that can't be stored are just not cached
+            return
+        self._write(kind, str(path.absolute()), stat, get_text_digest(text), offset, data)
+
+    def _write(self, kind, key, stat, digest, offset, data) -> None:
+        if self.read_only:
+            return
+        now = time.time_ns()
+        if stat.st_mtime_ns < now - RACY_INTERVAL_NS:
+            size, mtime_ns, inode = stat.st_size, stat.st_mtime_ns, stat.st_ino
+        else:
+            size, mtime_ns, inode = -1, -1, -1
+        try:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    key,
+                    size,
+                    mtime_ns,
+                    inode,
+                    digest,
+                    offset,
+                    data,
+                    now,
+                ),
+            )
+        except sqlite3.Error as err:
+            log.debug(f"Can't write to values cache: {err}")
+            return
+        self.pending += 1
+        if self.pending >= BATCH_SIZE:
+            self.commit()
+
+    def commit(self) -> None:
+        try:
+            self.connection.commit()
+        except sqlite3.Error as err:
+            log.debug(f"Can't write to values cache: {err}")
+            self.connection.rollback()
+        self.pending = 0
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in `max_size`."""
+        self.connection.executemany(
+            "UPDATE entries SET used = ? WHERE kind = ? AND path = ?", self.hits
+        )
+        self.hits = []
+
+        total = 0
+        evicted = []
+        rows = self.connection.execute(
+            "SELECT rowid, length(data) FROM entries ORDER BY used DESC"
+        )
+        for rowid, size in rows:
+            total += size
+            if total > self.max_size:
+                evicted.append((rowid,))
+        if evicted:
+            self.connection.executemany("DELETE FROM entries WHERE rowid = ?", evicted)
+
+    def close(self) -> None:
+        """Write pending entries, apply the size limit and close the database."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.read_only:
+            self.connection.close()
+            return
+        try:
+            self.evict()
+        except sqlite3.Error as err:
+            log.debug(f"Can't evict entries from values cache: {err}")
+        self.commit()
+        self.connection.close()
+
+
+def get_values_cache() -> Optional[ValuesCache]:
+    """Return the values cache of this process (or None if caches are disabled)."""
+    global _cache
+    if not is_cache_enabled():
+        return None
+
+    # connections can't be shared with forked processes
+    if _cache is not None and _cache.pid == os.getpid():
+        return _cache
+
+    cache_dir = get_cache_dir("values")
+    if cache_dir is None:
+        return None
+    try:
+        is_worker = multiprocessing.parent_process() is not None
+        _cache = ValuesCache(cache_dir / "values.sqlite3", read_only=is_worker)
+    except sqlite3.Error as err:
+        log.warning(f"Can't use values cache: {err}")
+        return None
+    atexit.register(_cache.close)
+    return _cache
+
+
+def _commit_before_fork() -> None:
+    """Release the write lock so that forked processes can read the cache."""
+    if _cache is not None and _cache.pid == os.getpid():
+        _cache.commit()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_commit_before_fork)
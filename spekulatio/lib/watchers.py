@@ -0,0 +1,240 @@
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Optional
+from pathlib import Path
+from dataclasses import dataclass
+
+from spekulatio.logs import log
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# time to wait for more events once a change has been detected
+DEBOUNCE_SECONDS = 0.1
+
+
+@dataclass(frozen=True)
+class Change:
+    """Change detected in a watched directory.
+
+    `kind` is one of 'modified', 'created' or 'deleted'.
+    """
+
+    path: Path
+    kind: str
+
+
+class Watcher:
+    """Base class for directory watchers."""
+
+    def __init__(self, paths: list[Path]):
+        self.paths = [path.resolve() for path in paths]
+
+    def wait(self, timeout: Optional[float] = None) -> list[Change]:
+        """Block until there are changes (or the timeout expires) and return them."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class PollingWatcher(Watcher):
+    """Detect changes by comparing periodic snapshots of the watched directories."""
+
+    def __init__(self, paths: list[Path], interval: float = 1.0):
+        super().__init__(paths)
+        self.interval = interval
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self) -> dict[Path, tuple[bool, int, int]]:
+        """Return (is_dir, mtime_ns, size) for every entry of the watched directories."""
+        snapshot: dict[Path, tuple[bool, int, int]] = {}
+        pending = [str(path) for path in self.paths]
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = list(iterator)
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                snapshot[Path(entry.path)] = (is_dir, stat.st_mtime_ns, stat.st_size)
+                if is_dir:
+                    pending.append(entry.path)
+        return snapshot
+
+    def get_changes(self) -> list[Change]:
+        """Compare the current state of the directories with the last snapshot."""
+        snapshot = self.take_snapshot()
+        changes = []
+        for path, (is_dir, mtime_ns, size) in snapshot.items():
+            previous = self.snapshot.get(path)
+            if previous is None or previous[0] != is_dir:
+                changes.append(Change(path, "created"))
+            elif not is_dir and previous != (is_dir, mtime_ns, size):
+                changes.append(Change(path, "modified"))
+        for path in self.snapshot.keys() - snapshot.keys():
+            changes.append(Change(path, "deleted"))
+        self.snapshot = snapshot
+        return changes
+
+    def wait(self, timeout: Optional[float] = None) -> list[Change]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changes = self.get_changes()
+            if changes:
+                return changes
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            time.sleep(self.interval)
+
+
+class InotifyWatcher(Watcher):
+    """Detect changes with Linux's inotify.
+
+    inotify watches are not recursive, so every subdirectory is watched
+    individually (including the ones created after the watcher starts).
+    """
+
+    def __init__(self, paths: list[Path]):
+        super().__init__(paths)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.directories: dict[int, Path] = {}
+        for path in self.paths:
+            self.add_watch_rec(path)
+
+    def add_watch(self, path: Path) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(error, f"Can't watch {path}: {os.strerror(error)}")
+        self.directories[wd] = path
+
+    def add_watch_rec(self, path: Path) -> None:
+        self.add_watch(path)
+        for root, dirs, _ in os.walk(path):
+            for name in dirs:
+                self.add_watch(Path(root) / name)
+
+    def read_changes(self) -> list[Change]:
+        """Read all the events available without blocking."""
+        changes: list[Change] = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changes
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    # events were lost: report the watched directories as changed so
+                    # that the whole project is rebuilt
+                    log.warning("Too many filesystem events: some were lost.")
+                    changes.extend(Change(path, "created") for path in self.paths)
+                    continue
+                if mask & IN_IGNORED:
+                    self.directories.pop(wd, None)
+                    continue
+
+                directory = self.directories.get(wd)
+                if directory is None:
+                    continue
+                path = directory / name if name else directory
+
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    if mask & IN_ISDIR:
+                        self.add_watch_rec(path)
+                    changes.append(Change(path, "created"))
+                elif mask & (IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF | IN_MOVE_SELF):
+                    changes.append(Change(path, "deleted"))
+                elif not mask & IN_ISDIR:
+                    changes.append(Change(path, "modified"))
+
+    def wait(self, timeout: Optional[float] = None) -> list[Change]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        # collect the events that come in bursts (eg. editors saving files)
+        changes = self.read_changes()
+        while select.select([self.fd], [], [], DEBOUNCE_SECONDS)[0]:
+            changes.extend(self.read_changes())
+
+        # remove duplicates keeping order
+        return list(dict.fromkeys(changes))
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def get_watcher(paths: list[Path], polling: bool = False, interval: float = 1.0) -> Watcher:
+    """Return the best watcher available for this platform.
+
+    inotify is used on Linux. Otherwise (or if it can't be initialized),
+    directories are polled every `interval` seconds.
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError) as err:
+            log.warning(f"Can't use inotify ({err}). Falling back to polling.")
+    return PollingWatcher(paths, interval=interval)
@@ -2,4 +2,8 @@
 from .node import Node
 from .layer import Layer
 from .action import Action
+from .manifest import Manifest
+from .build_stats import BuildStats
 
+from .dependencies import Dependencies
+from .tree_snapshot import TreeSnapshot
@@ -1,5 +1,8 @@
 import importlib
 from typing import Any
+from typing import ClassVar
+from typing import Mapping
+from typing import Union
 from pathlib import Path
 from dataclasses import field
 from dataclasses import dataclass
@@ -7,19 +10,23 @@ from dataclasses import dataclass
 from schema import And
 from schema import Schema
 from schema import Optional
-from jinja2 import Template
 from py_walk import get_parser_from_list
 from py_walk.models.parser import Parser
 
 from spekulatio.logs import log
 from spekulatio.exceptions import SpekulatioInternalError
 from spekulatio.exceptions import SpekulatioValidationError
-from spekulatio.lib.parse_values import parse_values_from_frontmatter
+from spekulatio.lib.parse_values import get_frontmatter_values
+from spekulatio.lib.parse_values import read_frontmatter_content
+from spekulatio.lib.inline_templates import render_inline_template
 
 
 @dataclass
 class Action:
-    patterns: tuple[str] = field(default_factory=tuple)
+    # values computed by `process_content` only when they're accessed
+    lazy_keys: ClassVar[tuple[str, ...]] = ()
+
+    patterns: tuple[str, ...] = field(default_factory=tuple)
     output_name: str = "{{ _input_name }}"
     parameters: dict[str, Any] = field(default_factory=dict)
     parser: Parser = field(init=False)
@@ -81,7 +88,7 @@ class Action:
 
         return action
 
-    def match(self, path: Path) -> bool:
+    def match(self, path: Union[str, Path]) -> bool:
         """Return if the provided path matches the patterns of the action."""
         is_a_match = self.parser.match(path)
         return is_a_match
@@ -93,8 +100,7 @@ class Action:
         output_name = values.get("_output_name", self.output_name)
 
         # render template
-        template = Template(output_name)
-        name = template.render(values)
+        name = render_inline_template(output_name, values)
         if not name:
             raise SpekulatioValidationError(
                 "Wrong output name for node. The output name for a node can't be an empty string. "
@@ -110,6 +116,13 @@ class Action:
         schema = Schema({})
         schema.validate(self.parameters)
 
+    def get_input_files(self, input_path: Path) -> list[Path]:
+        """Return the files the action reads from for a given input path.
+
+        Used to detect changes between builds.
+        """
+        return [input_path]
+
     def get_values(self, input_path: Path) -> dict[Any, Any]:
         """Don't return anything by default."""
         return {}
@@ -118,6 +131,17 @@ class Action:
         """Don't modify anything by default."""
         return values
 
+    def process_content(self, values: Mapping[Any, Any]) -> dict[Any, Any]:
+        """Compute the values listed in `lazy_keys`.
+
+        It is called the first time one of them is accessed, so expensive
+        operations (eg. rendering the content of the file) are only performed
+        if needed.
+
+        To be overloaded by the specific Action sub-classes.
+        """
+        return {}
+
     def execute(self, input_path: Path, output_path: Path, values: dict[Any, Any]) -> None:
         """Execute the action.
 
@@ -133,46 +157,56 @@ class Action:
 
 @dataclass
 class TextAction(Action):
+    lazy_keys: ClassVar[tuple[str, ...]] = ("_src", "_content")
+
     frontmatter: bool = False
     render_content: bool = False
 
     def get_values(self, input_path: Path) -> dict[Any, Any]:
         """Get values from frontmatter.
 
+        The text of the file (`_src`) is only read with the content (see
+        `process_content`), so values found in the values cache don't need
+        to read the file.
+
         To be overloaded by the specific Action sub-classes when they don't
         provide their values using a frontmatter.
         """
         if not self.frontmatter:
-            return {"_src": input_path.read_text()}
-
-        src, frontmatter_values = parse_values_from_frontmatter(input_path)
+            return {}
+        return get_frontmatter_values(input_path)
 
-        values = {}
-        values["_src"] = src
-        values.update(frontmatter_values)
-        return values
-
-    def process_values(self, values: dict[Any, Any]) -> dict[Any, Any]:
-        """Render content of the file if 'render_content' is active."""
+    def get_src(self, values: Mapping[Any, Any]) -> str:
+        """Return the text of the file (without its frontmatter).
 
-        # skip rendering if necessary
-        if not self.render_content:
-            values["_content"] = values["_src"]
-            return values
+        A `_src` set in the values takes precedence over the file.
+        """
+        try:
+            return values["_src"]
+        except KeyError:
+            pass
 
-        # get source
         try:
-            src = values["_src"]
+            input_path = values["_this"].absolute_input_file_path
         except KeyError:
             raise SpekulatioInternalError(
-                f"Malformed action '{self.name}': it tries to make use of a '_src' value "
-                "that has not been defined before."
+                f"Malformed action '{self.name}': it tries to read the source of a file "
+                "without a '_src' or '_this' value."
             )
+        if not self.frontmatter:
+            return input_path.read_text()
+        return read_frontmatter_content(input_path)
 
-        # render template
-        template = Template(src)
-        content = template.render(values)
+    def process_content(self, values: Mapping[Any, Any]) -> dict[Any, Any]:
+        """Render content of the file if 'render_content' is active."""
 
-        # override src
-        values["_content"] = content
-        return values
+        # get source
+        src = self.get_src(values)
+
+        # skip rendering if necessary
+        if not self.render_content:
+            return {"_src": src, "_content": src}
+
+        # render template
+        content = render_inline_template(src, values)
+        return {"_src": src, "_content": content}
@@ -0,0 +1,92 @@
+import re
+from typing import Optional
+
+from py_walk import get_parser_from_list
+from py_walk.models.parser import Parser
+
+from .action import Action
+
+# text without wildcards, escapes, slashes or whitespace
+TEXT = r"[^\[*?\\/\s]"
+
+# 'README', 'Makefile'...
+NAME_PATTERN = re.compile(rf"[^\[*?\\/\s!]{TEXT}*")
+
+# '*.md', '*.tar.gz', '*'...
+SUFFIX_PATTERN = re.compile(rf"\*({TEXT}*)")
+
+
+class ActionMatcher:
+    """Find the first action of a list whose patterns match a path.
+
+    Patterns are compiled into a single dispatch structure:
+
+    * Patterns that are just a name (eg. `README`) or a star followed by a
+      suffix (eg. `*.md`) are stored in hash indexes. As in wildmatch, they
+      match a path if any of its components matches.
+    * Any other pattern is matched with a regular wildmatch parser, but only
+      for actions that come before the best match found with the indexes.
+      Actions with negated patterns are always matched this way.
+
+    The result is the same as trying `action.match(path)` for each action in
+    order.
+    """
+
+    def __init__(self, actions: list[Action]):
+        self.actions = actions
+        self._names: dict[str, int] = {}
+        self._suffixes: dict[str, int] = {}
+        self._complex: list[tuple[int, Parser]] = []
+
+        for index, action in enumerate(actions):
+            patterns = list(action.patterns)
+            if any(pattern.startswith("!") for pattern in patterns):
+                self._complex.append((index, action.parser))
+                continue
+
+            complex_patterns = []
+            for pattern in patterns:
+                suffix_match = SUFFIX_PATTERN.fullmatch(pattern)
+                if suffix_match:
+                    self._suffixes.setdefault(suffix_match.group(1), index)
+                elif NAME_PATTERN.fullmatch(pattern):
+                    self._names.setdefault(pattern, index)
+                else:
+                    complex_patterns.append(pattern)
+
+            if complex_patterns:
+                self._complex.append((index, get_parser_from_list(complex_patterns)))
+
+        self._suffix_lengths = sorted(set(len(suffix) for suffix in self._suffixes))
+
+    def match(self, relative_path: str) -> Optional[Action]:
+        """Return the first action that matches a path (or None).
+
+        :param relative_path: path relative to the layer, using '/' as separator.
+        """
+        best = len(self.actions)
+
+        # indexed patterns
+        names = self._names
+        suffixes = self._suffixes
+        for component in relative_path.split("/"):
+            index = names.get(component)
+            if index is not None and index < best:
+                best = index
+            length = len(component)
+            for suffix_length in self._suffix_lengths:
+                if suffix_length > length:
+                    break
+                index = suffixes.get(component[length - suffix_length :])
+                if index is not None and index < best:
+                    best = index
+
+        # complex patterns (only the ones that could improve the result)
+        for index, parser in self._complex:
+            if index >= best:
+                break
+            if parser.match(relative_path):
+                best = index
+                break
+
+        return self.actions[best] if best < len(self.actions) else None
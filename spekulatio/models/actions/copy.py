@@ -1,14 +1,29 @@
 
-import shutil
 from typing import Any
 from pathlib import Path
 from dataclasses import dataclass
 
+from schema import Or
+from schema import Schema
+from schema import Optional
+
+from spekulatio.lib.copy_file import COPY_STRATEGIES
+from spekulatio.lib.output_files import copy_output
 from ..action import Action
 
 @dataclass
 class Copy(Action):
 
+    def validate_parameters(self):
+        """Check that the provided parameters match what the action expects."""
+        schema = Schema(
+            {
+                Optional("strategy", default="auto"): Or(*COPY_STRATEGIES),
+            }
+        )
+        schema.validate(self.parameters)
+
     def execute(self, input_path: Path, output_path: Path, values: dict[Any, Any]) -> None:
-        """Copy file to the output directory."""
-        shutil.copy(input_path, output_path)
+        """Copy file to the output directory (unless it's already there)."""
+        strategy = self.parameters.get("strategy", "auto")
+        copy_output(input_path, output_path, strategy)
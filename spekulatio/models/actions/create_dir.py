@@ -4,12 +4,18 @@ from pathlib import Path
 from dataclasses import dataclass
 
 from spekulatio.logs import log
+from spekulatio.lib.parse_values import find_values_file
 from spekulatio.lib.parse_values import parse_values_from_directory
 from ..action import Action
 
 @dataclass
 class CreateDir(Action):
 
+    def get_input_files(self, input_path: Path) -> list[Path]:
+        """Return the values file of the directory, if any."""
+        values_file = find_values_file(input_path)
+        return [values_file[0]] if values_file else []
+
     def get_values(self, input_path: Path) -> dict[Any, Any]:
         """Get values from _values.yaml file."""
         return parse_values_from_directory(input_path)
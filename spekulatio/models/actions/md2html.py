@@ -1,5 +1,9 @@
 
+import json
+import threading
 from typing import Any
+from typing import ClassVar
+from typing import Mapping
 from pathlib import Path
 from dataclasses import dataclass
 
@@ -7,11 +11,38 @@ import markdown
 from schema import Schema
 from schema import Optional
 
+from spekulatio.lib.profiling import span
+from spekulatio.lib.output_files import write_output
+from spekulatio.lib.environment import render_template
 from ..action import TextAction
 
+# converters are expensive to create, so they are reused between documents
+# (one per set of parameters and thread; each process has its own copy)
+_converters = threading.local()
+
+
+def get_markdown_converter(parameters: dict[str, Any]) -> markdown.Markdown:
+    """Return a Markdown converter ready to process a new document."""
+    try:
+        cache = _converters.cache
+    except AttributeError:
+        cache = _converters.cache = {}
+
+    key = json.dumps(parameters, sort_keys=True, default=repr)
+    try:
+        md = cache[key]
+    except KeyError:
+        md = cache[key] = markdown.Markdown(**parameters)
+    else:
+        md.reset()
+    return md
+
+
 @dataclass
 class Md2Html(TextAction):
-    patterns: tuple[str] = ("*.md", "*.mkd", "*.mkdn", "*.mdwn", "*.mdwon", "*.markdown")
+    lazy_keys: ClassVar[tuple[str, ...]] = ("_src", "_content", "_toc")
+
+    patterns: tuple[str, ...] = ("*.md", "*.mkd", "*.mkdn", "*.mdwn", "*.mdwon", "*.markdown")
     output_name: str = "{{ _input_name.with_suffix('.html') }}"
     frontmatter: bool = True
     render_content: bool = True
@@ -28,22 +59,22 @@ class Md2Html(TextAction):
         )
         schema.validate(self.parameters)
 
-    def process_values(self, values: dict[Any, Any]) -> dict[Any, Any]:
-        """Create and modify values before executing the action."""
+    def process_content(self, values: Mapping[Any, Any]) -> dict[Any, Any]:
+        """Convert the (rendered) Markdown content to HTML."""
         # get content
-        values = super().process_values(values)
-        md_content = values["_content"]
+        text_values = super().process_content(values)
+        md_content = text_values["_content"]
 
         # convert markdown
-        md = markdown.Markdown(**self.parameters)
-        html_content = md.convert(md_content)
-
-        # update values
-        values["_content"] = html_content
-        if hasattr(md, 'toc_tokens'):
-            values["_toc"] = md.toc_tokens
+        md = get_markdown_converter(self.parameters)
+        with span("markdown", "markdown"):
+            html_content = md.convert(md_content)
 
-        return values
+        return {
+            "_src": text_values["_src"],
+            "_content": html_content,
+            "_toc": getattr(md, "toc_tokens", []),
+        }
 
     def execute(self, input_path: Path, output_path: Path, values: dict[Any, Any]) -> None:
         """Render current file and write it to the output path."""
@@ -54,7 +85,7 @@ class Md2Html(TextAction):
 
         # render template
         template = env.get_template(template_name)
-        full_html_content = template.render(values)
+        full_html_content = render_template(template, values)
 
-        # write content
-        output_path.write_text(full_html_content)
+        # write content (unless it's already up to date)
+        write_output(output_path, full_html_content)
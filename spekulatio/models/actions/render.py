@@ -3,6 +3,7 @@ from typing import Any
 from pathlib import Path
 from dataclasses import dataclass
 
+from spekulatio.lib.output_files import write_output
 from ..action import TextAction
 
 @dataclass
@@ -11,6 +12,6 @@ class Render(TextAction):
     render_content: bool = True
 
     def execute(self, input_path: Path, output_path: Path, values: dict[Any, Any]) -> None:
-        """Write file to the output path."""
+        """Write file to the output path (unless it's already up to date)."""
         content = values["_content"]
-        output_path.write_text(content)
+        write_output(output_path, content)
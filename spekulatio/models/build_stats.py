@@ -0,0 +1,80 @@
+import time
+from typing import TYPE_CHECKING
+from pathlib import Path
+from contextlib import contextmanager
+from dataclasses import field
+from dataclasses import dataclass
+
+if TYPE_CHECKING:
+    from .node import Node
+
+
+@dataclass
+class BuildStats:
+    """Summary of a build.
+
+    * `actions`: number of nodes of each action.
+    * `written` and `skipped`: number of files processed and of files
+      that were up to date (in incremental builds).
+    * `changed_paths`: output files that were actually written (files that
+      already had the same content are left untouched).
+    * `bytes_written`: total size of the changed files.
+    * `removed_paths`: stale output files and directories removed (when
+      synchronizing the output directory).
+    * `phases`: time spent in each phase (in seconds).
+    * `profile_report`: time per phase and slowest nodes of a profiled
+      build (see `spekulatio.lib.profiling`).
+    """
+
+    actions: dict[str, int] = field(default_factory=dict)
+    written: int = 0
+    skipped: int = 0
+    changed_paths: list[Path] = field(default_factory=list)
+    bytes_written: int = 0
+    removed_paths: list[Path] = field(default_factory=list)
+    phases: dict[str, float] = field(default_factory=dict)
+    profile_report: str = ""
+
+    def count_node(self, node: "Node") -> None:
+        name = type(node.action).__name__
+        self.actions[name] = self.actions.get(name, 0) + 1
+
+    def add_output(self, size: int, changed_paths: list[Path]) -> None:
+        self.written += 1
+        if changed_paths:
+            self.changed_paths.extend(changed_paths)
+            self.bytes_written += size
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measure the time spent in a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.phases.values())
+
+    @property
+    def nodes(self) -> int:
+        return sum(self.actions.values())
+
+    def format_summary(self) -> str:
+        lines = ["Nodes per action:"]
+        for name, count in sorted(self.actions.items()):
+            lines.append(f"  {count:10d}  {name}")
+        lines.append(
+            f"Files written: {self.written}, {len(self.changed_paths)} changed "
+            f"({self.bytes_written} bytes)"
+        )
+        if self.skipped:
+            lines.append(f"Files up to date: {self.skipped}")
+        if self.removed_paths:
+            lines.append(f"Stale files removed: {len(self.removed_paths)}")
+        lines.append("Time per phase:")
+        for name, duration in self.phases.items():
+            lines.append(f"  {duration:10.3f} s  {name}")
+        return "\n".join(lines)
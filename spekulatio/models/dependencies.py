@@ -0,0 +1,114 @@
+from typing import Any
+from typing import Iterable
+from typing import Optional
+from typing import TYPE_CHECKING
+from dataclasses import field
+from dataclasses import dataclass
+
+from spekulatio.lib.properties import cached_slot_property
+
+if TYPE_CHECKING:
+    from .node import Node
+
+# recorders of the nodes being written (innermost last)
+_recorders: list["Dependencies"] = []
+
+
+@dataclass
+class Dependencies:
+    """Inputs used to write a node, apart from its own files.
+
+    * `nodes`: paths of the other nodes whose values (or derived properties,
+      like their URL or their children) were read.
+    * `templates`: names of the Jinja templates loaded.
+
+    While used as a context manager, reads of node values are recorded into
+    the instance.
+    """
+
+    nodes: set[str] = field(default_factory=set)
+    templates: set[str] = field(default_factory=set)
+
+    def __enter__(self) -> "Dependencies":
+        _recorders.append(self)
+        return self
+
+    def __exit__(self, *args) -> None:
+        _recorders.pop()
+
+    def to_dict(self) -> dict[str, list[str]]:
+        return {"nodes": sorted(self.nodes), "templates": sorted(self.templates)}
+
+
+def is_recording() -> bool:
+    """Check if reads of node values are being recorded."""
+    return bool(_recorders)
+
+
+def record_read(*nodes: Optional["Node"]) -> None:
+    """Record that the values of some nodes have been read."""
+    if not _recorders:
+        return
+    recorded = _recorders[-1].nodes
+    for node in nodes:
+        if node is not None:
+            recorded.add(node.input_path)
+
+
+def record_paths(paths: Iterable[str]) -> None:
+    """Record that the values of the nodes with the given paths have been read."""
+    if _recorders:
+        _recorders[-1].nodes.update(paths)
+
+
+class paused_recording:
+    """Context manager to stop recording reads temporarily.
+
+    Values are computed once and cached, so the reads done while computing
+    them belong to the node they're computed for and not to the node that
+    is being written.
+    """
+
+    def __enter__(self):
+        self.recorders = _recorders[:]
+        _recorders.clear()
+
+    def __exit__(self, *args):
+        _recorders[:] = self.recorders
+
+
+class value_property(cached_slot_property):
+    """Cached property that depends on the values of its node.
+
+    Unlike `cached_slot_property`, every access (and not only the first one)
+    is recorded as a read of the node.
+    """
+
+    def get_related_nodes(self, instance: Any) -> tuple:
+        return (instance,)
+
+    def __get__(self, instance: Any, owner: Any = None) -> Any:
+        if instance is None:
+            return self
+        if _recorders:
+            record_read(*self.get_related_nodes(instance))
+        try:
+            return getattr(instance, self.slotname)
+        except AttributeError:
+            pass
+        if not _recorders:
+            return super().__get__(instance, owner)
+        with paused_recording():
+            return super().__get__(instance, owner)
+
+
+class order_property(value_property):
+    """Cached property that depends on the order of the siblings of its node.
+
+    Reads are recorded on the node, its parent and its grandparent (whose
+    values and children determine the position of the node and its parent).
+    """
+
+    def get_related_nodes(self, instance: Any) -> tuple:
+        parent = instance.parent
+        return (instance, parent, parent.parent if parent else None)
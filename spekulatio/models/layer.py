@@ -1,19 +1,29 @@
+import os
 from dataclasses import field
 from dataclasses import dataclass
 from typing import Any
+from typing import Optional as OptionalType
+from typing import TYPE_CHECKING
 from pathlib import Path
+from functools import cached_property
 
 from schema import And
 from schema import Schema
 from schema import Optional
 
 from spekulatio.lib.paths import to_relative_path
+from spekulatio.lib.parse_values import get_values_file_name
+from spekulatio.lib.parse_values import register_values_file
 from spekulatio.exceptions import SpekulatioValidationError
 from .node import Node
 from .action import Action
+from .action_matcher import ActionMatcher
 from .actions import noop_action
 from .actions import create_dir_action
 
+if TYPE_CHECKING:
+    from .tree_snapshot import TreeSnapshot
+
 
 @dataclass
 class Layer:
@@ -22,6 +32,7 @@ class Layer:
     values_file: str = "_values.yaml"
     actions: list[Action] = field(default_factory=list)
     values: dict[Any, Any] = field(default_factory=dict)
+    excluded_paths: set[str] = field(default_factory=set)
 
     @classmethod
     def from_dict(
@@ -81,38 +92,126 @@ class Layer:
 
         return cls(spekulatio_file_path=spekulatio_file_path, **init_data)
 
-    def get_action(self, path: Path) -> Action:
-        """Return action for a given path or None if none matches."""
-        if path.is_dir():
+    @cached_property
+    def spekulatio_file_relative_path(self) -> OptionalType[str]:
+        """Return the path of the spekulatio file relative to the layer path.
+
+        None is returned if the spekulatio file is not inside the layer.
+        """
+        try:
+            relative_path = self.spekulatio_file_path.resolve().relative_to(
+                self.path.resolve()
+            )
+        except ValueError:
+            return None
+        return relative_path.as_posix()
+
+    def exclude(self, path: Path) -> None:
+        """Don't create nodes for a directory, if it's inside the layer.
+
+        Used for the output directory, so that the output of a build isn't
+        read as input by the next one.
+        """
+        try:
+            relative_path = path.resolve().relative_to(self.path.resolve())
+        except ValueError:
+            return
+        if not relative_path.parts:
+            raise SpekulatioValidationError(
+                f"The directory '{path}' can't be both a layer and the output directory."
+            )
+        self.excluded_paths.add(relative_path.as_posix())
+
+    @cached_property
+    def matcher(self) -> ActionMatcher:
+        """Return the structure used to find the action of each file."""
+        return ActionMatcher(self.actions)
+
+    def get_action(self, relative_path: str, name: str, is_dir: bool) -> OptionalType[Action]:
+        """Return action for a given path or None if none matches.
+
+        :param relative_path: path relative to the layer (using '/' as separator).
+        :param name: last component of the path.
+        :param is_dir: if the path is a directory.
+        """
+        if self.excluded_paths and relative_path in self.excluded_paths:
+            return None
+        if is_dir:
             return create_dir_action
-        elif path.name == self.values_file:
+        elif name == self.values_file:
             return None
-        elif path.resolve() == self.spekulatio_file_path:
+        elif relative_path == self.spekulatio_file_relative_path:
             return None
-        for action in self.actions:
-            if action.match(path.relative_to(self.path)):
-                return action
-        return None
+        return self.matcher.match(relative_path)
+
+    def apply_to(self, root: Node, snapshot: OptionalType["TreeSnapshot"] = None):
+        """Apply a layer to an existent tree.
 
-    def apply_to(self, root: Node):
-        """Apply a layer to an existent tree."""
+        :param snapshot: directory listings of a previous run to reuse.
+        """
 
         # add layer to root
-        root._layers.append(self)
-        root._actions.append(create_dir_action)
+        root.push(self, create_dir_action)
 
         # insert or update files and directories from layer
-        self.apply_to_rec(node=root, path=self.path)
+        self.apply_to_rec(node=root, path=str(self.path), snapshot=snapshot)
+
+    def list_directory(
+        self, path: str, relative_path: str
+    ) -> tuple[list[tuple[str, bool, Action]], OptionalType[str]]:
+        """Return the entries of a directory that produce nodes and its values file.
 
-    def apply_to_rec(self, node: Node, path: Path):
-        """Apply layer per directory, recursively."""
-        for child_path in path.iterdir():
-            action = self.get_action(child_path)
+        Directories are read with `os.scandir`, so the type of each entry is
+        usually known without any extra system call.
+
+        :param path: filesystem path of the directory.
+        :param relative_path: path of the directory relative to the layer
+            (empty for the layer directory itself, '/'-terminated otherwise).
+        :return: name, type (True for directories) and action of each entry,
+            and the name of the values file (or None).
+        """
+        with os.scandir(path) as iterator:
+            entries = list(iterator)
+
+        listing = []
+        for entry in entries:
+            is_dir = entry.is_dir()
+            action = self.get_action(relative_path + entry.name, entry.name, is_dir)
             if action:
-                child_node = node.upsert_child(
-                    name=child_path.name,
-                    action=action,
-                    layer=self,
+                listing.append((entry.name, is_dir, action))
+        values_file = get_values_file_name(entry.name for entry in entries)
+        return listing, values_file
+
+    def apply_to_rec(
+        self,
+        node: Node,
+        path: str,
+        relative_path: str = "",
+        snapshot: OptionalType["TreeSnapshot"] = None,
+    ):
+        """Apply layer per directory, recursively.
+
+        :param path: filesystem path of the directory.
+        :param relative_path: path of the directory relative to the layer
+            (empty for the layer directory itself, '/'-terminated otherwise).
+        :param snapshot: directory listings of a previous run to reuse.
+        """
+        if snapshot is None:
+            listing, values_file = self.list_directory(path, relative_path)
+        else:
+            listing, values_file = snapshot.list_directory(self, path, relative_path)
+        register_values_file(path, values_file)
+
+        for name, is_dir, action in listing:
+            child_node = node.upsert_child(
+                name=name,
+                action=action,
+                layer=self,
+            )
+            if is_dir:
+                self.apply_to_rec(
+                    node=child_node,
+                    path=os.path.join(path, name),
+                    relative_path=relative_path + name + "/",
+                    snapshot=snapshot,
                 )
-                if child_path.is_dir():
-                    self.apply_to_rec(node=child_node, path=child_path)
@@ -0,0 +1,229 @@
+import json
+import hashlib
+from typing import Any
+from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
+from pathlib import Path
+from dataclasses import field
+from dataclasses import dataclass
+
+from jinja2 import Environment
+from jinja2 import TemplateNotFound
+
+from spekulatio.logs import log
+from spekulatio.lib.digests import get_file_digest
+from spekulatio.lib.digests import get_text_digest
+from .node import Node
+from .dependencies import Dependencies
+
+if TYPE_CHECKING:
+    from .layer import Layer
+
+MANIFEST_VERSION = 2
+
+
+def get_manifest_path(output_path: Path) -> Path:
+    """Return the location of the manifest of an output directory.
+
+    The manifest is stored next to the output directory (and not inside it)
+    so that it isn't deployed along with the rest of the output files.
+
+    Eg. /path/to/output -> /path/to/.output.spekulatio.json
+    """
+    output_path = output_path.resolve()
+    return output_path.parent / f".{output_path.name}.spekulatio.json"
+
+
+@dataclass
+class Manifest:
+    """Record of the inputs used to generate each node of an output directory.
+
+    * `config`: digest of the configuration files (spekulatio.yaml) involved.
+    * `files`: size, mtime and content digest of each input file.
+    * `templates`: content digest of each template used.
+    * `nodes`: dependency graph of the build. For each node path:
+        * `digest`: digest of the inputs of its values (its own input files
+          plus the ones inherited from its ancestors).
+        * `children`: digest of the names of its children.
+        * `layers` and `files`: layers and input files (eg. `_values.yaml`)
+          of the node itself. The inherited ones are in the entries of its
+          ancestors.
+        * `templates`: templates loaded to render it.
+        * `nodes`: other nodes whose values were read to render it.
+        * `output`: path of its output.
+    """
+
+    config: str = ""
+    files: dict[str, list[Any]] = field(default_factory=dict)
+    templates: dict[str, Optional[str]] = field(default_factory=dict)
+    nodes: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest":
+        """Read manifest from disk.
+
+        An empty manifest is returned if the file doesn't exist or can't be used.
+        """
+        if not path.exists():
+            return cls()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.pop("version") != MANIFEST_VERSION:
+                raise ValueError("unsupported manifest version")
+            return cls(**data)
+        except Exception as err:
+            log.warning(f"Ignoring build manifest {path}: {err}")
+            return cls()
+
+    def save(self, path: Path) -> None:
+        """Write manifest to disk."""
+        data = {
+            "version": MANIFEST_VERSION,
+            "config": self.config,
+            "files": self.files,
+            "templates": self.templates,
+            "nodes": self.nodes,
+        }
+        path.write_text(json.dumps(data), encoding="utf-8")
+
+    def get_file_digest(self, path: Path, previous: "Manifest") -> str:
+        """Return the content digest of an input file.
+
+        The digest stored in the previous manifest is reused if the size and
+        mtime of the file haven't changed.
+        """
+        key = str(path)
+        try:
+            return self.files[key][2]
+        except KeyError:
+            pass
+
+        stat = path.stat()
+        try:
+            size, mtime_ns, digest = previous.files[key]
+            if size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+                raise ValueError
+        except (KeyError, ValueError):
+            digest = get_file_digest(path)
+
+        self.files[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def get_template_digest(self, env: Environment, name: str) -> Optional[str]:
+        """Return the content digest of a template (or None if it doesn't exist)."""
+        try:
+            return self.templates[name]
+        except KeyError:
+            pass
+
+        try:
+            if env.loader is None:
+                raise TemplateNotFound(name)
+            source, _, _ = env.loader.get_source(env, name)
+            digest: Optional[str] = get_text_digest(source)
+        except TemplateNotFound:
+            digest = None
+
+        self.templates[name] = digest
+        return digest
+
+    def compute_config_digest(self, layers: Sequence["Layer"]) -> None:
+        """Compute the digest of the configuration files of the layers."""
+        digest = hashlib.sha256()
+        for layer in layers:
+            digest.update(str(layer.spekulatio_file_path).encode("utf-8"))
+            digest.update(layer.spekulatio_file_path.read_bytes())
+        self.config = digest.hexdigest()
+
+    def add_node(self, node: Node, parent_digest: str, previous: "Manifest") -> str:
+        """Record the inputs of the values of a node.
+
+        Values are inherited, so the digest of the parent is part of the digest
+        of the node.
+
+        :return: the digest of the inputs.
+        """
+        digest = hashlib.sha256()
+        digest.update(parent_digest.encode("utf-8"))
+        files = []
+        for layer, action in zip(node._layers, node._actions):
+            input_path = layer.path / node.input_file_path
+            digest.update(f"{layer.path}:{action}".encode("utf-8"))
+            for input_file in action.get_input_files(input_path):
+                file_digest = self.get_file_digest(input_file, previous)
+                digest.update(f"{input_file}:{file_digest}".encode("utf-8"))
+                files.append(str(input_file))
+
+        children_digest = hashlib.sha256()
+        for name in node._children:
+            children_digest.update(name.encode("utf-8"))
+            children_digest.update(b"\0")
+
+        self.nodes[node.input_path] = {
+            "digest": digest.hexdigest(),
+            "children": children_digest.hexdigest(),
+            "layers": [str(layer.path) for layer in node._layers],
+            "files": files,
+            "templates": [],
+            "nodes": [],
+            "output": None,
+        }
+        return self.nodes[node.input_path]["digest"]
+
+    def set_dependencies(self, node: Node, dependencies: Dependencies) -> None:
+        """Record the templates and nodes used to render a node."""
+        entry = self.nodes[node.input_path]
+        entry.update(dependencies.to_dict())
+        entry["output"] = str(node.output_file_path)
+
+    def reuse_dependencies(self, node: Node, previous: "Manifest") -> None:
+        """Keep the dependencies recorded in a previous build for a node."""
+        entry = self.nodes[node.input_path]
+        previous_entry = previous.nodes[node.input_path]
+        entry["templates"] = previous_entry["templates"]
+        entry["nodes"] = previous_entry["nodes"]
+        entry["output"] = previous_entry["output"]
+
+    def is_compatible_with(self, other: "Manifest") -> bool:
+        """Return if node entries can be compared between both manifests."""
+        return self.config == other.config
+
+    def is_up_to_date(
+        self,
+        node: Node,
+        previous: "Manifest",
+        env: Environment,
+        output_path: Path,
+    ) -> bool:
+        """Check if the output of a node generated in a previous build can be reused.
+
+        Entries of all nodes must have been added to the manifest before.
+        """
+        try:
+            entry = self.nodes[node.input_path]
+            previous_entry = previous.nodes[node.input_path]
+        except KeyError:
+            return False
+
+        if entry["digest"] != previous_entry["digest"]:
+            return False
+
+        if not (output_path / previous_entry["output"]).exists():
+            return False
+
+        for name in previous_entry["templates"]:
+            if self.get_template_digest(env, name) != previous.templates.get(name):
+                return False
+
+        for path in previous_entry["nodes"]:
+            current = self.nodes.get(path)
+            former = previous.nodes.get(path)
+            if current is None or former is None:
+                return False
+            if current["digest"] != former["digest"]:
+                return False
+            if current["children"] != former["children"]:
+                return False
+
+        return True
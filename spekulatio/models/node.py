@@ -1,29 +1,102 @@
 
+import sys
 from pathlib import Path
 from typing import Any
 from typing import Optional
+from typing import MutableMapping
+from typing import Sequence
+from typing import TYPE_CHECKING
 from dataclasses import field
 from dataclasses import dataclass
-from functools import cached_property
 
 from cels import patch_dictionary
-from jinja2 import Environment
-from jinja2 import FileSystemLoader
 
 from spekulatio.logs import log
 from spekulatio.exceptions import SpekulatioInputError
 from spekulatio.exceptions import SpekulatioValidationError
+from spekulatio.lib.profiling import span
+from spekulatio.lib.environment import get_environment
+from spekulatio.lib.properties import add_slots
+from spekulatio.lib.properties import get_cache_slot
+from spekulatio.lib.properties import cached_slot_property
 from .action import Action
+from .values import NodeValues
+from .values import ValuesOverlay
+from .values import patch_values
+from .tree_order import TreeOrder
+from .path_index import PathIndex
+from .dependencies import record_read
+from .dependencies import is_recording
+from .dependencies import order_property
+from .dependencies import value_property
 from .actions import CreateDir
 
+if TYPE_CHECKING:
+    from .layer import Layer
 
+# maximum number of different stacks of layers or actions shared between nodes
+STACK_CACHE_SIZE = 4096
+
+# stacks shared between nodes (indexed by the ids of their items)
+_stacks: dict[tuple[int, ...], tuple] = {}
+
+# cached properties that depend on the values of a node
+INVALIDATED_PROPERTIES = (
+    "raw_values",
+    "layer_values",
+    "inherited_values",
+    "values",
+    "user_values",
+    "output_name",
+    "output_path",
+    "url",
+    "output_file_path",
+)
+
+# cached properties that depend on the order of the children of the parent
+ORDER_PROPERTIES = ("prev_sibling", "next_sibling")
+
+# cached properties that only depend on the structure of the tree
+STRUCTURE_PROPERTIES = ("env", "input_path", "input_file_path", "absolute_input_file_path")
+
+
+def intern_stack(stack: tuple) -> tuple:
+    """Return a shared tuple equal to the given one.
+
+    The shared tuples keep their items alive, so their ids can't be reused.
+    """
+    key = tuple(map(id, stack))
+    try:
+        return _stacks[key]
+    except KeyError:
+        pass
+    if len(_stacks) >= STACK_CACHE_SIZE:
+        _stacks.clear()
+    _stacks[key] = stack
+    return stack
+
+
+class NodeCache:
+    """Slots where the cached properties of a node are stored.
+
+    Nodes don't have a `__dict__`, so their size doesn't grow with the
+    number of properties computed for them.
+    """
+
+    __slots__ = tuple(
+        get_cache_slot(name)
+        for name in (*INVALIDATED_PROPERTIES, *ORDER_PROPERTIES, *STRUCTURE_PROPERTIES)
+    )
+
+
+@add_slots
 @dataclass
-class Node:
+class Node(NodeCache):
 
     name: str
-    _layers: list["Layer"] = field(default_factory=list)
-    _values: list[dict[Any, Any]] = field(default_factory=list)
-    _actions: list[Action] = field(default_factory=list)
+    _layers: tuple["Layer", ...] = ()
+    _values: Sequence[dict[Any, Any]] = ()
+    _actions: tuple[Action, ...] = ()
     _children: dict[str, "Node"] = field(default_factory=dict)
 
     # links
@@ -32,8 +105,15 @@ class Node:
     _next_sibling: Optional["Node"] = None
     _sorted: bool = False
 
-    @cached_property
-    def raw_values(self) -> list[dict[Any, Any]]:
+    # position in the pre-order of the tree
+    _order: Optional[TreeOrder] = field(default=None, compare=False)
+    _index: int = 0
+
+    # indexes of the paths of the tree
+    _path_index: Optional[PathIndex] = field(default=None, compare=False)
+
+    @cached_slot_property
+    def raw_values(self) -> Sequence[dict[Any, Any]]:
         """Collect raw values from layers.
 
         Raw values will be cached in `_raw_values`.
@@ -41,12 +121,13 @@ class Node:
         if self._values:
             return self._values
 
-        for layer, action in zip(self._layers, self._actions):
-            values = action.get_values(layer.path / self.input_file_path)
-            self._values.append(values)
+        self._values = [
+            action.get_values(layer.path / self.input_file_path)
+            for layer, action in zip(self._layers, self._actions)
+        ]
         return self._values
 
-    @cached_property
+    @cached_slot_property
     def layer_values(self) -> list[dict[Any, Any]]:
         """Collect values layer definitions."""
         values = {}
@@ -54,14 +135,18 @@ class Node:
             values = patch_dictionary(values, layer.values)
         return values
 
-    @cached_property
+    @cached_slot_property
     def inherited_values(self):
         """Return the values that come from ancestors."""
         return self.layer_values if self.is_root else self.parent.values
 
-    @cached_property
+    @value_property
     def values(self):
         """Compute the effective values for this node."""
+        with span("values", "node", self.input_path):
+            return self._compute_values()
+
+    def _compute_values(self) -> NodeValues:
         # general defaults
         pre_inherited_defaults = {
             "_template": "spekulatio/default.html",
@@ -73,14 +158,21 @@ class Node:
             "_sort": ["*"],
         }
 
-        effective_values = {}
-        effective_values.update(pre_inherited_defaults)
-        effective_values.update(self.inherited_values)
+        # the values of the parent are shared (see ValuesOverlay) unless some
+        # general default has been removed from them (it goes first again)
+        inherited_values = self.inherited_values
+        effective_values: MutableMapping[Any, Any]
+        if self.is_root or not all(key in inherited_values for key in pre_inherited_defaults):
+            effective_values = {}
+            effective_values.update(pre_inherited_defaults)
+            effective_values.update(inherited_values)
+        else:
+            effective_values = ValuesOverlay(inherited_values)
         effective_values.update(post_inherited_defaults)
 
         # apply patches in order: first layers first
         for layer_raw_values in self.raw_values:
-            effective_values = patch_dictionary(effective_values, layer_raw_values)
+            effective_values = patch_values(effective_values, layer_raw_values)
 
         # add output special values
         effective_values["_root"] = self.root
@@ -92,28 +184,32 @@ class Node:
         # add action values
         effective_values = self.action.process_values(effective_values)
 
-        return effective_values
+        # values that depend on the content are only computed if accessed
+        return NodeValues(effective_values, self.action)
 
-    @cached_property
+    @value_property
     def user_values(self):
         """Return only user values (ie. values without leading underscore)."""
-        return {key: value for key, value in self.values.items() if not key.startswith("_")}
+        return {key: self.values[key] for key in self.values if not key.startswith("_")}
 
-    @cached_property
+    @property
     def input_name(self):
         return self.name
 
-    @cached_property
+    @value_property
     def output_name(self):
         return self.action.get_output_name(self.values)
 
-    @cached_property
+    @cached_slot_property
     def env(self):
-        template_dirs = [str(layer.path) for layer in self._layers]
-        env = Environment(loader=FileSystemLoader(template_dirs))
-        return env
+        """Return the Jinja environment of the node.
+
+        Nodes with the same stack of layers share the same environment.
+        """
+        template_dirs = tuple(str(layer.path) for layer in self._layers)
+        return get_environment(template_dirs)
 
-    @cached_property
+    @cached_slot_property
     def input_path(self):
         """Return tree path of the node (using the input names).
 
@@ -123,7 +219,7 @@ class Node:
             return ""
         return f"{self.parent.input_path}/{self.input_name}"
 
-    @cached_property
+    @value_property
     def output_path(self):
         """Return tree path of the node (using the output names).
 
@@ -133,31 +229,31 @@ class Node:
             return ""
         return f"{self.parent.output_path}/{self.output_name}"
 
-    @cached_property
+    @property
     def path(self):
         return self.input_path
 
-    @cached_property
+    @value_property
     def url(self):
         """Return the URL of this node."""
         url_prefix = self.values.get("_url_prefix", "")
         return f"{url_prefix}{self.output_path}"
 
-    @cached_property
+    @cached_slot_property
     def input_file_path(self):
         """Return the relative path of the input file in the filesystem."""
         if self.is_root:
             return Path(".")
         return self.parent.input_file_path / self.input_name
 
-    @cached_property
+    @value_property
     def output_file_path(self):
         """Return the relative path of the output file in the filesystem."""
         if self.is_root:
             return Path(".")
         return self.parent.output_file_path / self.output_name
 
-    @cached_property
+    @cached_slot_property
     def absolute_input_file_path(self):
         """Return the absolute path of the input file."""
         return (self.layer.path / self.input_file_path).absolute()
@@ -166,68 +262,94 @@ class Node:
         """Return the absolute path of the output file."""
         return (base_path / self.output_file_path).absolute()
 
-    @cached_property
+    @property
     def level(self):
         """Return the number of nodes between this node and the root."""
+        order = self._order
+        if order is not None and order.valid:
+            return order.levels[self._index]
         if self.is_root:
             return 0
         return self.parent.level + 1
 
-    @cached_property
+    @property
+    def index(self) -> int:
+        """Return the position of the node in the pre-order traversal of the tree."""
+        self.get_order()
+        return self._index
+
+    @property
+    def subtree_range(self) -> range:
+        """Return the positions of the node and its descendants in the tree order.
+
+        Eg. the nodes of the subtree are `order.nodes[subtree_range.start:subtree_range.stop]`.
+        """
+        order = self.get_order()
+        return range(self._index, order.ends[self._index])
+
+    @property
     def action(self):
         return self._actions[-1]
 
-    @cached_property
+    @property
     def layer(self):
         return self._layers[-1]
 
-    @cached_property
+    @order_property
     def prev_sibling(self):
         if self.is_root:
             return None
         self.parent.sort()
         return self._prev_sibling
 
-    @cached_property
+    @order_property
     def next_sibling(self):
         if self.is_root:
             return None
         self.parent.sort()
         return self._next_sibling
 
-    @cached_property
+    @property
     def prev(self):
+        """Return the previous sibling of the node (or its parent if it's the first child).
+
+        Unlike `next`, this is not the previous node in the pre-order: the
+        node before a directory's sibling is the directory itself and not its
+        last descendant.
+        """
         if self.is_root:
             return None
-        return self.prev_sibling if self.prev_sibling else self.parent
+        self.get_order()
+        prev = self._prev_sibling or self.parent
+        self._record_order_read(prev)
+        return prev
 
-    @cached_property
+    @property
     def next(self):
-        self.sort()
-        if self.children:
-            return self.children[0]
-        if self.next_sibling:
-            return self.next_sibling
-        if self.parent:
-            return self.parent.next_sibling
-        return None
-
-    @cached_property
+        """Return the next node in the pre-order traversal of the tree."""
+        order = self.get_order()
+        index = self._index + 1
+        next = order.nodes[index] if index < len(order.nodes) else None
+        self._record_order_read(next)
+        return next
+
+    @property
     def is_root(self):
         return self.parent is None
 
-    @cached_property
+    @property
     def root(self):
         if self.is_root:
             return self
         return self.parent.root
 
-    @cached_property
+    @property
     def is_dir(self):
         return isinstance(self.action, CreateDir)
 
     @property
     def children(self):
+        record_read(self)
         self.sort()
         return list(self._children.values())
 
@@ -239,7 +361,7 @@ class Node:
         else:
             raise TypeError(f"Node {self.input_path} doesn't have a child {other}")
 
-    def get(self, *path_segments: list[str]) -> "Node":
+    def get(self, *path_segments: str) -> "Node":
         """Return the node associated to the provided path.
 
         If the path is relative (eg. foo/bar.md), the node is searched from
@@ -251,6 +373,15 @@ class Node:
         if not path_segments or path_segments == ('',):
             return self
 
+        # look the path up in the index of the tree
+        key = self._get_index_key(path_segments)
+        if key is not None:
+            try:
+                return self.get_path_index().input_paths[key]
+            except KeyError:
+                pass
+
+        # walk the path (to resolve unusual paths or report the missing segment)
         first_segment, tail_segments = path_segments[0], path_segments[1:]
         is_absolute_path = first_segment.startswith('/')
         if is_absolute_path:
@@ -265,11 +396,58 @@ class Node:
 
         return child.get(*tail_parts, *tail_segments)
 
+    def _get_index_key(self, path_segments: tuple[str, ...]) -> Optional[str]:
+        """Return the input path that a call to `get` refers to.
+
+        None is returned for paths that need to be walked to be resolved
+        (eg. with empty or absolute segments in the middle).
+        """
+        path = "/".join(path_segments)
+        if not path.startswith("/"):
+            path = f"{self.input_path}/{path}"
+        if path.endswith("/"):
+            path = path[:-1]
+        if "//" in path:
+            return None
+        return path
+
+    def get_path_index(self) -> PathIndex:
+        """Return the index of the paths of the tree of the node."""
+        index = self._path_index
+        if index is None or not index.valid:
+            index = PathIndex.from_root(self.root)
+        return index
+
+    def get_by_output_path(self, output_path: str) -> "Node":
+        """Return the node with the given (absolute) output path.
+
+        Eg. /foo/bar.html
+        """
+        try:
+            return self.get_path_index().get_output_paths()[output_path.rstrip("/")]
+        except KeyError:
+            raise SpekulatioInputError(f"Can't find node with output path '{output_path}'.")
+
+    def _forget_paths(self) -> None:
+        if self._path_index is not None:
+            self._path_index.valid = False
+
+    def push(self, layer: "Layer", action: Action) -> None:
+        """Add a layer (and the action that applies to the node in it) to the node.
+
+        Nodes with the same stacks of layers and actions share the same tuples.
+        """
+        self._layers = intern_stack(self._layers + (layer,))
+        self._actions = intern_stack(self._actions + (action,))
+
     def _insert_child(self, name: str) -> "Node":
         """Add new child to node."""
-        child = Node(name=name)
+        child = Node(name=sys.intern(name))
         self._children[name] = child
         child.parent = self
+        self._sorted = False
+        self._forget_order()
+        self._forget_paths()
         return child
 
     def upsert_child(self, name: str, action: Action, layer: "Layer") -> "Node":
@@ -281,23 +459,130 @@ class Node:
             # child doesn't exist yet
             child = self._insert_child(name=name)
         finally:
-            child._layers.append(layer)
-            child._actions.append(action)
+            child.push(layer, action)
         return child
 
+    def invalidate(self, recursive: bool = False) -> None:
+        """Forget the values computed for this node.
+
+        Raw values are read again from the input files, and values derived
+        from them (output names, paths, the order of the children...) are
+        computed again when accessed.
+
+        :param recursive: invalidate also all the descendants of the node.
+        """
+        self._values = ()
+        for name in INVALIDATED_PROPERTIES:
+            delattr(self, name)
+
+        # children may be sorted differently
+        self._sorted = False
+        if self._children:
+            self._forget_order()
+        if self._path_index is not None:
+            self._path_index.output_paths = None
+        for child in self._children.values():
+            for name in ORDER_PROPERTIES:
+                delattr(child, name)
+            if recursive:
+                child.invalidate(recursive=True)
+
+    def get_order(self) -> TreeOrder:
+        """Return the pre-order of the tree of the node.
+
+        The order is computed (and all the directories of the tree sorted)
+        the first time it's needed and every time the tree changes.
+        """
+        order = self._order
+        if order is None or not order.valid:
+            order = TreeOrder.from_root(self.root)
+        return order
+
+    def _forget_order(self) -> None:
+        if self._order is not None:
+            self._order.valid = False
+
+    def _record_order_read(self, neighbour: Optional["Node"]) -> None:
+        """Record a read of the nodes whose order determines a neighbour of this one.
+
+        Apart from the node and its ancestors, the neighbour itself is recorded
+        and, if it's the last node of the subtree of the previous sibling, the
+        whole subtree (adding or removing nodes in it changes the neighbour).
+        """
+        if not is_recording():
+            return
+        node: Optional[Node] = self
+        while node is not None:
+            record_read(node)
+            node = node.parent
+        if neighbour is None:
+            return
+        record_read(neighbour)
+        sibling = neighbour
+        while sibling.parent is not None and sibling.parent is not self.parent:
+            sibling = sibling.parent
+        if sibling is not neighbour and sibling.parent is self.parent:
+            record_read(*self.get_order().nodes[sibling._index:self._index])
+
+    def _get_descendants(self) -> list["Node"]:
+        order = self.get_order()
+        descendants = order.nodes[self._index + 1:order.ends[self._index]]
+        if is_recording():
+            record_read(self, *descendants)
+        return descendants
+
     def traverse(self):
-        """Retrieve all descendants of this node."""
-        for child in self.children:
-            yield child
-            yield from child.traverse()
+        """Retrieve all descendants of this node (in pre-order)."""
+        return iter(self._get_descendants())
+
+    def traverse_post_order(self):
+        """Retrieve all descendants of this node (children before their parents)."""
+        ends = self.get_order().ends
+        open_nodes: list["Node"] = []
+        for node in self._get_descendants():
+            while open_nodes and ends[open_nodes[-1]._index] <= node._index:
+                yield open_nodes.pop()
+            open_nodes.append(node)
+        while open_nodes:
+            yield open_nodes.pop()
+
+    def traverse_breadth_first(self):
+        """Retrieve all descendants of this node (level by level)."""
+        levels = self.get_order().levels
+        base_level = levels[self._index]
+        nodes_by_level: list[list["Node"]] = []
+        for node in self._get_descendants():
+            depth = levels[node._index] - base_level - 1
+            if depth == len(nodes_by_level):
+                nodes_by_level.append([])
+            nodes_by_level[depth].append(node)
+        for nodes in nodes_by_level:
+            yield from nodes
 
     def prune(self):
-        """Remove branches that don't end in a file."""
-        for child in list(self.children):
+        """Remove branches that don't end in a file.
+
+        Pruning only depends on the structure of the tree, so it doesn't
+        need to sort children or compute any values.
+        """
+        for child in list(self._children.values()):
             child.prune()
             if not child._children and child.is_dir:
                 del self._children[child.name]
                 child.parent = None
+                self._forget_order()
+                self._forget_paths()
+
+    def sort_tree(self):
+        """Sort the children of all the directories of this subtree.
+
+        Only the values of directory nodes are required to sort them. The
+        values of file nodes (and therefore their content) are not computed.
+        """
+        self.sort()
+        for child in self._children.values():
+            if child._children:
+                child.sort_tree()
 
     def sort(self):
         """Sort children.
@@ -315,6 +600,11 @@ class Node:
         if self._sorted:
             return
 
+        # nodes without children don't need to read their values to be sorted
+        if not self._children:
+            self._sorted = True
+            return
+
         # get sorting list
         try:
             sorted_names = self.values["_sort"]
@@ -377,13 +667,28 @@ class Node:
         # mark as sorted
         self._sorted = True
 
+    def release_content(self) -> None:
+        """Discard the content computed for this node (if any).
+
+        It will be computed again the next time it's accessed.
+        """
+        values = getattr(self, get_cache_slot("values"), None)
+        if values is not None:
+            values.release_content()
+
     def write(self, base_path: Path) -> None:
-        """Write node to disk."""
-        self.action.execute(
-            input_path=self.absolute_input_file_path,
-            output_path=self.get_absolute_output_path(base_path),
-            values=self.values
-        )
+        """Write node to disk.
+
+        Once written, the content of the node is released (it will be computed
+        again if another node needs it).
+        """
+        with span("write_node", "node", self.input_path):
+            self.action.execute(
+                input_path=self.absolute_input_file_path,
+                output_path=self.get_absolute_output_path(base_path),
+                values=self.values
+            )
+            self.values.release_content()
 
     def __repr__(self):
         return str(self)
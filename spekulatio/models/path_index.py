@@ -0,0 +1,57 @@
+from typing import Optional
+from typing import TYPE_CHECKING
+from dataclasses import field
+from dataclasses import dataclass
+
+from .dependencies import paused_recording
+
+if TYPE_CHECKING:
+    from .node import Node
+
+
+@dataclass
+class PathIndex:
+    """Nodes of a tree indexed by their input and output paths.
+
+    The input paths are indexed in a single (iterative) pass over the tree
+    that doesn't need to sort it or compute any values. The output paths
+    depend on the values of every node, so they're only indexed the first
+    time a node is searched by its output path.
+
+    Each node keeps a reference to the index. Adding or removing nodes
+    marks the index as not valid, and invalidating the values of a node
+    drops the output paths. Both are computed again when needed.
+    """
+
+    input_paths: dict[str, "Node"] = field(default_factory=dict)
+    output_paths: Optional[dict[str, "Node"]] = None
+    valid: bool = True
+
+    @classmethod
+    def from_root(cls, root: "Node") -> "PathIndex":
+        index = cls()
+        input_paths = index.input_paths
+        pending = [(root, root.input_path)]
+        while pending:
+            node, path = pending.pop()
+            node._path_index = index
+            input_paths[path] = node
+            pending.extend(
+                (child, f"{path}/{name}") for name, child in node._children.items()
+            )
+        return index
+
+    def get_output_paths(self) -> dict[str, "Node"]:
+        """Return the nodes indexed by output path.
+
+        If several nodes have the same output path, the first one (in input
+        path order) is kept.
+        """
+        if self.output_paths is None:
+            output_paths: dict[str, "Node"] = {}
+            with paused_recording():
+                for path in sorted(self.input_paths):
+                    node = self.input_paths[path]
+                    output_paths.setdefault(node.output_path, node)
+            self.output_paths = output_paths
+        return self.output_paths
@@ -0,0 +1,60 @@
+from typing import TYPE_CHECKING
+from dataclasses import field
+from dataclasses import dataclass
+
+if TYPE_CHECKING:
+    from .node import Node
+
+
+@dataclass
+class TreeOrder:
+    """Pre-order of the nodes of a tree.
+
+    The order is computed in a single (iterative) pass once the children of
+    all directories are sorted. For each position, it keeps:
+
+    * `nodes`: the node at that position.
+    * `ends`: the position after the last descendant of the node (so the
+      subtree of the node at `i` is `nodes[i:ends[i]]`).
+    * `levels`: the number of nodes between the node and the root.
+
+    Each node keeps a reference to the order and its position in it. Any
+    change in the structure or the sorting of the tree marks the order as
+    not valid and it is computed again when needed.
+    """
+
+    nodes: list["Node"] = field(default_factory=list)
+    ends: list[int] = field(default_factory=list)
+    levels: list[int] = field(default_factory=list)
+    valid: bool = True
+
+    @classmethod
+    def from_root(cls, root: "Node") -> "TreeOrder":
+        """Sort the tree of a root node and compute its order."""
+        order = cls()
+        nodes = order.nodes
+        ends = order.ends
+        levels = order.levels
+
+        # positions of the nodes whose subtree hasn't been closed yet
+        open_indexes: list[int] = []
+        pending = [(root, 0)]
+        while pending:
+            node, level = pending.pop()
+            index = len(nodes)
+            while open_indexes and levels[open_indexes[-1]] >= level:
+                ends[open_indexes.pop()] = index
+
+            node._order = order
+            node._index = index
+            nodes.append(node)
+            ends.append(index + 1)
+            levels.append(level)
+            open_indexes.append(index)
+
+            node.sort()
+            pending.extend((child, level + 1) for child in reversed(node._children.values()))
+
+        for index in open_indexes:
+            ends[index] = len(nodes)
+        return order
@@ -0,0 +1,175 @@
+import os
+import time
+import pickle
+import hashlib
+from typing import Any
+from typing import Optional
+from typing import TYPE_CHECKING
+from pathlib import Path
+from dataclasses import field
+from dataclasses import dataclass
+
+from spekulatio.logs import log
+from spekulatio.lib.cache import get_cache_dir
+from .action import Action
+from .actions import create_dir_action
+
+if TYPE_CHECKING:
+    from .layer import Layer
+
+SNAPSHOT_VERSION = 2
+
+# directories modified this close to the moment the snapshot was taken are
+# listed again (their mtime may not reflect a later change in the same tick)
+RACY_INTERVAL_NS = 2_000_000_000
+
+# index stored for the action of directories
+DIRECTORY_ACTION = -1
+
+# mtime, (name, is_dir, action index) of each entry and values file name
+StoredListing = tuple[int, list[tuple[str, bool, int]], Optional[str]]
+
+
+@dataclass
+class TreeSnapshot:
+    """Directory listings used to build a tree, stored between runs.
+
+    For each layer and directory, the snapshot keeps the mtime of the
+    directory, the name, type and action index of the entries that produce
+    nodes, and the name of its values file. Adding, removing or renaming
+    entries changes the mtime of a directory, so a directory whose mtime
+    hasn't changed can be rebuilt from the snapshot without being listed
+    again. Only one `stat` per
+    directory is needed to validate it.
+
+    Snapshots are stored in the cache directory, under a key derived from
+    the configuration of the layers (any change in the layers or their
+    actions invalidates the snapshot).
+    """
+
+    key: str
+    layers: list["Layer"]
+    created_ns: int = 0
+    listings: dict[tuple[int, str], "StoredListing"] = field(default_factory=dict)
+
+    # listings of the current run
+    new_listings: dict[tuple[int, str], "StoredListing"] = field(default_factory=dict)
+    listed: int = 0
+    reused: int = 0
+
+    def __post_init__(self):
+        self._layer_indexes = {id(layer): index for index, layer in enumerate(self.layers)}
+        self._action_indexes = [
+            {id(action): index for index, action in enumerate(layer.actions)}
+            for layer in self.layers
+        ]
+
+    @staticmethod
+    def get_key(layers: list["Layer"]) -> str:
+        """Return the key of the snapshot of a list of layers."""
+        digest = hashlib.sha256()
+        digest.update(f"{SNAPSHOT_VERSION}".encode("utf-8"))
+        for layer in layers:
+            spekulatio_file_path = layer.spekulatio_file_path.resolve()
+            digest.update(f"{layer.path.resolve()}\0{spekulatio_file_path}\0".encode("utf-8"))
+            digest.update(f"{layer.values_file}\0".encode("utf-8"))
+            digest.update(f"{sorted(layer.excluded_paths)}\0".encode("utf-8"))
+            try:
+                digest.update(spekulatio_file_path.read_bytes())
+            except OSError:
+                pass
+        return digest.hexdigest()
+
+    @staticmethod
+    def get_path(key: str) -> Optional[Path]:
+        cache_dir = get_cache_dir("trees")
+        return cache_dir / f"{key}.pickle" if cache_dir else None
+
+    @classmethod
+    def load(cls, layers: list["Layer"]) -> "TreeSnapshot":
+        """Read the snapshot of a list of layers.
+
+        An empty snapshot is returned if there's none or it can't be used.
+        """
+        key = cls.get_key(layers)
+        path = cls.get_path(key)
+        if path is None or not path.exists():
+            return cls(key=key, layers=layers)
+        try:
+            with path.open("rb") as f:
+                version, created_ns, listings = pickle.load(f)
+            if version != SNAPSHOT_VERSION:
+                raise ValueError("unsupported snapshot version")
+        except Exception as err:
+            log.warning(f"Ignoring tree snapshot {path}: {err}")
+            return cls(key=key, layers=layers)
+        return cls(key=key, layers=layers, created_ns=created_ns, listings=listings)
+
+    def save(self) -> None:
+        """Write the listings of the current run to disk.
+
+        Nothing is written if all directories have been reused.
+        """
+        if not self.listed and len(self.new_listings) == len(self.listings):
+            return
+        path = self.get_path(self.key)
+        if path is None:
+            return
+
+        data = (SNAPSHOT_VERSION, time.time_ns(), self.new_listings)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with tmp_path.open("wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as err:
+            log.warning(f"Can't write tree snapshot {path}: {err}")
+            tmp_path.unlink(missing_ok=True)
+
+    def encode_action(self, layer_index: int, action: Action) -> int:
+        if action is create_dir_action:
+            return DIRECTORY_ACTION
+        return self._action_indexes[layer_index][id(action)]
+
+    def decode_action(self, layer: "Layer", index: int) -> Action:
+        if index == DIRECTORY_ACTION:
+            return create_dir_action
+        return layer.actions[index]
+
+    def list_directory(
+        self, layer: "Layer", path: str, relative_path: str
+    ) -> tuple[list[tuple[str, bool, Action]], Optional[str]]:
+        """Return the entries of a directory that produce nodes and its values file.
+
+        The listing stored in the snapshot is used if the directory hasn't
+        been modified since. Otherwise, the directory is listed again.
+        """
+        layer_index = self._layer_indexes[id(layer)]
+        key = (layer_index, relative_path)
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        stored = self.listings.get(key)
+        if (
+            stored is not None
+            and stored[0] == mtime_ns
+            and mtime_ns < self.created_ns - RACY_INTERVAL_NS
+        ):
+            self.reused += 1
+            self.new_listings[key] = stored
+            listing = [
+                (name, is_dir, self.decode_action(layer, action_index))
+                for name, is_dir, action_index in stored[1]
+            ]
+            return listing, stored[2]
+
+        self.listed += 1
+        listing, values_file = layer.list_directory(path, relative_path)
+        self.new_listings[key] = (
+            mtime_ns,
+            [
+                (name, is_dir, self.encode_action(layer_index, action))
+                for name, is_dir, action in listing
+            ],
+            values_file,
+        )
+        return listing, values_file
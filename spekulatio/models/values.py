@@ -0,0 +1,222 @@
+from typing import Any
+from typing import Optional
+from typing import Iterator
+from typing import Mapping
+from typing import MutableMapping
+from typing import TYPE_CHECKING
+
+from cels import patch_dictionary
+
+from spekulatio.lib.profiling import span
+from .dependencies import Dependencies
+from .dependencies import record_paths
+
+if TYPE_CHECKING:
+    from .action import Action
+
+# maximum number of overlays that are looked up before reaching a dictionary
+MAX_OVERLAY_DEPTH = 8
+
+# characters that cels uses to annotate the keys of a patch
+ANNOTATION_MARKERS = ("{", "}")
+
+
+class NodeValues(Mapping):
+    """Effective values of a node.
+
+    The keys that an action produces from the content of its file (eg.
+    `_content` or `_toc`) are computed by `action.process_content` the first
+    time any of them is accessed. Frontmatter and inherited values can be read
+    without rendering anything. The computed keys take precedence over the
+    values with the same name (eg. a `_content` set in the frontmatter),
+    which are only visible while the content is computed.
+
+    The nodes read while computing the content belong to the node that owns
+    it, no matter which node triggered the computation: they are recorded
+    (see `Dependencies`) every time a lazy key is read, so both the owner and
+    the nodes that include its content depend on them.
+    """
+
+    def __init__(self, values: MutableMapping[Any, Any], action: "Action"):
+        self._values = values
+        self._action = action
+        self._lazy_keys = action.lazy_keys
+        self._computed: Optional[dict[Any, Any]] = None
+        self._computing = False
+        self._content_reads: frozenset[str] = frozenset()
+
+    def _compute(self) -> None:
+        """Compute all the lazy keys at once."""
+        self._computing = True
+        try:
+            with Dependencies() as dependencies:
+                content_values = self._action.process_content(self)
+        finally:
+            self._computing = False
+        self._computed = content_values
+        self._content_reads = frozenset(dependencies.nodes)
+
+    def _is_lazy(self, key: Any) -> bool:
+        # while the content is computed, lazy keys are not defined yet
+        return bool(self._lazy_keys) and not self._computing and key in self._lazy_keys
+
+    def __getitem__(self, key: Any) -> Any:
+        if self._is_lazy(key):
+            if self._computed is None:
+                self._compute()
+            assert self._computed is not None
+            if self._content_reads:
+                record_paths(self._content_reads)
+            if key in self._computed:
+                return self._computed[key]
+        return self._values[key]
+
+    def __contains__(self, key: Any) -> bool:
+        return self._is_lazy(key) or key in self._values
+
+    def __iter__(self) -> Iterator[Any]:
+        yield from list(self._values)
+        if not self._computing:
+            for key in self._lazy_keys:
+                if key not in self._values:
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def copy(self) -> dict[Any, Any]:
+        """Return a dictionary with the values computed so far.
+
+        Lazy keys that haven't been computed yet are left out, so copying the
+        values (eg. Jinja does it to report errors) never renders content.
+        """
+        values = dict(self._values)
+        if self._computed is not None:
+            values.update(self._computed)
+        return values
+
+    def release_content(self) -> None:
+        """Discard the computed lazy values.
+
+        They are computed again if accessed later.
+        """
+        self._computed = None
+
+    def __repr__(self):
+        pending = self._lazy_keys if self._computed is None else ()
+        return f"{self.__class__.__name__}({self._values!r}, pending={pending!r})"
+
+
+
+class ValuesOverlay(MutableMapping):
+    """Values of a node stored as the changes to the values of its parent.
+
+    Reads fall back to the values of the parent, so a node only stores the
+    keys it sets (and the nested dictionaries it patches). The keys keep the
+    same order as if the values of the parent had been copied: inherited
+    keys first, then the new ones.
+
+    The values of the parent must not change once the overlay has been
+    created. Deleting an inherited key turns the overlay into a plain copy
+    of the values.
+
+    Lookups of inherited keys go through every ancestor overlay, so chains
+    longer than `MAX_OVERLAY_DEPTH` are flattened.
+    """
+
+    def __init__(self, parent: Mapping[Any, Any]):
+        parent_overlay = parent._values if isinstance(parent, NodeValues) else parent
+        if isinstance(parent_overlay, ValuesOverlay):
+            if parent_overlay.depth >= MAX_OVERLAY_DEPTH:
+                parent_overlay.flatten()
+            self.depth: int = parent_overlay.depth + 1
+        else:
+            self.depth = 1
+        self._parent = parent
+        self._values: dict[Any, Any] = {}
+
+    def flatten(self) -> None:
+        """Copy the inherited values into the overlay."""
+        self._values = dict(self.items())
+        self._parent = {}
+        self.depth = 0
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            return self._parent[key]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._values[key] = value
+
+    def __delitem__(self, key: Any) -> None:
+        if key in self._parent:
+            self.flatten()
+        del self._values[key]
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._values or key in self._parent
+
+    def __iter__(self) -> Iterator[Any]:
+        yield from self._parent
+        for key in list(self._values):
+            if key not in self._parent:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self.items())!r})"
+
+
+def is_plain_patch(patch: Any) -> bool:
+    """Check if a patch has no cels annotations (eg. `foo {delete}`) at any level."""
+    if isinstance(patch, dict):
+        for key, value in patch.items():
+            if isinstance(key, str) and any(marker in key for marker in ANNOTATION_MARKERS):
+                return False
+            if not is_plain_patch(value):
+                return False
+    elif isinstance(patch, list):
+        return all(is_plain_patch(item) for item in patch)
+    return True
+
+
+def merge_plain_patch(values: Mapping[Any, Any], patch: dict[Any, Any]) -> dict[Any, Any]:
+    """Return a copy of a dictionary merged with a patch without annotations.
+
+    The result is the same as with `cels.patch_dictionary`: dictionaries
+    present in both are merged and any other value is replaced. Nested
+    dictionaries that aren't patched are shared with the input.
+    """
+    output = dict(values)
+    for key, value in patch.items():
+        if isinstance(value, dict):
+            current = output.get(key)
+            value = merge_plain_patch(current if isinstance(current, dict) else {}, value)
+        output[key] = value
+    return output
+
+
+def patch_values(
+    values: MutableMapping[Any, Any], patch: dict[Any, Any]
+) -> MutableMapping[Any, Any]:
+    """Apply a patch to the values of a node.
+
+    Patches without annotations are applied in place, only copying the
+    nested dictionaries they change. Otherwise, the values are copied and
+    patched with cels.
+    """
+    if not patch:
+        return values
+    if not is_plain_patch(patch):
+        with span("patch_dictionary", "values"):
+            return patch_dictionary(dict(values.items()), patch)
+    for key, value in patch.items():
+        if isinstance(value, dict):
+            current = values.get(key)
+            value = merge_plain_patch(current if isinstance(current, dict) else {}, value)
+        values[key] = value
+    return values
@@ -3,3 +3,4 @@ from .get_layers import get_layers
 from .create_tree import create_tree
 from .write_tree import write_tree
 from .build import build
+from .watch import watch
@@ -1,12 +1,59 @@
 
+from typing import Optional
 from pathlib import Path
 
+from spekulatio.logs import log
+from spekulatio.models import BuildStats
+from spekulatio.lib.profiling import span
+from spekulatio.lib.profiling import start_profiling
+from spekulatio.lib.profiling import stop_profiling
 from .get_layers import get_layers
 from .create_tree import create_tree
 from .write_tree import write_tree
 
-def build(spekulatio_file_path: Path, output_path: Path) -> None:
-    """Build project from a spekulation configuration file."""
-    layers = get_layers(spekulatio_file_path)
-    root = create_tree(layers)
-    write_tree(output_path, root)
+def build(
+    spekulatio_file_path: Path,
+    output_path: Path,
+    incremental: bool = False,
+    jobs: int = 1,
+    profile_path: Optional[Path] = None,
+    sync: bool = False,
+    fsync: bool = False,
+) -> BuildStats:
+    """Build project from a spekulation configuration file.
+
+    :param profile_path: write a trace of the build (in the Chrome trace
+        format) to this file and report the slowest phases and nodes.
+    :param sync: remove the output files that no node produced.
+    :param fsync: flush the written files to disk before returning.
+    :return: a summary of the build.
+    """
+    stats = BuildStats()
+    if profile_path is not None:
+        start_profiling()
+    try:
+        with stats.phase("get_layers"), span("get_layers", "phase"):
+            layers = get_layers(spekulatio_file_path)
+            for layer in layers:
+                layer.exclude(output_path)
+        with stats.phase("create_tree"):
+            root = create_tree(layers)
+        with stats.phase("write_tree"):
+            write_tree(
+                output_path,
+                root,
+                incremental=incremental,
+                jobs=jobs,
+                stats=stats,
+                sync=sync,
+                fsync=fsync,
+            )
+    finally:
+        # profiling started by the caller is left running
+        if profile_path is not None:
+            profiler = stop_profiling()
+            if profiler is not None:
+                profiler.save_trace(profile_path)
+                stats.profile_report = profiler.format_report()
+                log.info(f"Profile written to {profile_path}.\n{stats.profile_report}")
+    return stats
@@ -1,19 +1,45 @@
 from pathlib import Path
 
+from spekulatio.logs import log
+from spekulatio.lib.profiling import span
+from spekulatio.lib.environment import forget_templates
 from spekulatio.models import Node
 from spekulatio.models import Layer
+from spekulatio.models import TreeSnapshot
 from spekulatio.models.actions import noop_action
 
-def create_tree(layers: list[Layer]) -> Node:
-    """Create output tree in memory from layer definitions."""
+def create_tree(layers: list[Layer], use_snapshot: bool = True) -> Node:
+    """Create output tree in memory from layer definitions.
+
+    :param use_snapshot: reuse the listings of the directories that haven't
+        changed since the previous run (see `TreeSnapshot`).
+    """
+    # the Jinja environments are shared with previous trees: templates may
+    # have been added or removed since then
+    forget_templates()
+
     # create root
     root = Node(name=".")
 
     # apply layers
-    for layer in layers:
-        layer.apply_to(root)
+    with span("apply_layers", "phase"):
+        snapshot = TreeSnapshot.load(layers) if use_snapshot else None
+        for layer in layers:
+            layer.apply_to(root, snapshot=snapshot)
+        if snapshot is not None:
+            log.debug(
+                f"Tree snapshot: {snapshot.reused} directories reused, "
+                f"{snapshot.listed} listed."
+            )
+            snapshot.save()
 
     # don't include empty directories
-    root.prune()
+    with span("prune", "phase"):
+        root.prune()
+
+    # sort directories (only directory values are computed at this point,
+    # the values of files are computed lazily when they're written)
+    with span("sort", "phase"):
+        root.sort_tree()
 
     return root
@@ -1,4 +1,3 @@
-import yaml
 import typing
 from pathlib import Path
 
@@ -9,6 +8,7 @@ from schema import Optional
 from spekulatio.logs import log
 from spekulatio.models import Layer
 from spekulatio.lib.paths import to_relative_path
+from spekulatio.lib.decoders import load_yaml
 from spekulatio.exceptions import SpekulatioValidationError
 
 SPEKULATIO_FILE = "spekulatio.yaml"
@@ -39,7 +39,7 @@ def get_layers(
     # read file
     try:
         text = spekulatio_file_path.read_text(encoding="utf-8")
-        data = yaml.safe_load(text) or {}
+        data = load_yaml(text) or {}
     except Exception as err:
         raise SpekulatioValidationError(
             f"Can't read file: {err}"
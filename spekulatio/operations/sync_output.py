@@ -0,0 +1,73 @@
+
+import os
+from pathlib import Path
+
+from spekulatio.logs import log
+from spekulatio.models import Node
+from spekulatio.exceptions import SpekulatioValidationError
+
+
+def check_sync_output(output_path: Path, root: Node) -> None:
+    """Check that stale files can be removed from an output directory.
+
+    The output directory can't contain any of the input directories,
+    otherwise the input files would be removed.
+    """
+    output_path = output_path.absolute()
+    for layer in root._layers:
+        layer_path = layer.path.absolute()
+        if layer_path == output_path or output_path in layer_path.parents:
+            raise SpekulatioValidationError(
+                f"Can't remove stale files from '{output_path}': "
+                f"it contains the input directory '{layer_path}'."
+            )
+
+
+def remove_stale_outputs(output_path: Path, root: Node) -> list[Path]:
+    """Remove the files of an output directory that no node produced.
+
+    The output directory is compared with the output paths of the nodes of
+    the tree: files and links that don't belong to any node are removed, and
+    then the directories that became empty (and don't belong to any node
+    either) are removed bottom-up. Symbolic links are removed or kept but
+    never followed.
+
+    :return: the paths that have been removed.
+    """
+    output_path = output_path.absolute()
+    check_sync_output(output_path, root)
+
+    expected = {node.output_file_path for node in root.traverse()}
+    removed: list[Path] = []
+    _remove_stale_entries(output_path, Path("."), expected, removed)
+    if removed:
+        log.info(f"Removed {len(removed)} stale output files and directories.")
+    return removed
+
+
+def _remove_stale_entries(
+    output_path: Path, relative_path: Path, expected: set[Path], removed: list[Path]
+) -> bool:
+    """Remove the stale entries of a directory.
+
+    :return: whether the directory is empty after the removal.
+    """
+    empty = True
+    with os.scandir(output_path / relative_path) as entries:
+        for entry in entries:
+            entry_relative_path = relative_path / entry.name
+            if entry.is_dir(follow_symlinks=False):
+                subdir_empty = _remove_stale_entries(
+                    output_path, entry_relative_path, expected, removed
+                )
+                if subdir_empty and entry_relative_path not in expected:
+                    os.rmdir(entry.path)
+                    removed.append(Path(entry.path))
+                else:
+                    empty = False
+            elif entry_relative_path not in expected:
+                os.unlink(entry.path)
+                removed.append(Path(entry.path))
+            else:
+                empty = False
+    return empty
@@ -0,0 +1,281 @@
+from pathlib import Path
+from typing import Iterator
+from typing import Optional
+
+from spekulatio.logs import log
+from spekulatio.models import Node
+from spekulatio.models import Layer
+from spekulatio.models import Dependencies
+from spekulatio.lib.watchers import Change
+from spekulatio.lib.watchers import get_watcher
+from spekulatio.lib.environment import forget_templates
+from spekulatio.lib.inline_templates import compile_inline_template
+from spekulatio.lib.parse_values import forget_values_file
+from spekulatio.lib.parse_values import get_values_file_variants
+from spekulatio.exceptions import SpekulatioInputError
+from .get_layers import get_layers
+from .get_layers import SPEKULATIO_FILE
+from .create_tree import create_tree
+from .write_tree import write_nodes
+
+VALUES_FILE_NAMES = {name for name, _ in get_values_file_variants()}
+
+
+class LiveBuild:
+    """Build that is kept in memory to be updated after each change.
+
+    The tree, the Jinja environment and the compiled templates survive
+    between updates, and every update only writes the nodes affected by the
+    changes:
+
+    * a modified input file rebuilds its node,
+    * a modified values file rebuilds the subtree of its directory,
+    * a modified template rebuilds the nodes that were rendered with it (when
+      files are added or removed, the compiled templates are discarded since
+      names may resolve to other files),
+    * the nodes that read the values of a rebuilt node (according to the
+      dependencies recorded when they were written) are rebuilt too,
+    * added or removed files and changes in the configuration recreate the
+      tree.
+    """
+
+    def __init__(self, spekulatio_file_path: Path, output_path: Path):
+        spekulatio_file_path = spekulatio_file_path.resolve()
+        if spekulatio_file_path.is_dir():
+            spekulatio_file_path = spekulatio_file_path / SPEKULATIO_FILE
+        self.spekulatio_file_path = spekulatio_file_path
+        self.output_path = output_path
+        self.layers: list[Layer] = []
+        self.root: Optional[Node] = None
+
+        # information about the last write of each node
+        self.dependencies: dict[str, Dependencies] = {}
+        self.outputs: dict[str, Path] = {}
+
+    @property
+    def config_paths(self) -> set[Path]:
+        """Return the configuration files used by the build."""
+        paths = {self.spekulatio_file_path}
+        paths.update(layer.spekulatio_file_path.resolve() for layer in self.layers)
+        return paths
+
+    @property
+    def watched_paths(self) -> list[Path]:
+        """Return the directories that need to be watched.
+
+        Directories contained in other watched directories are not included.
+        """
+        paths = {layer.path.resolve() for layer in self.layers}
+        paths.update(path.parent for path in self.config_paths)
+        return sorted(
+            path
+            for path in paths
+            if not any(other != path and other in path.parents for other in paths)
+        )
+
+    def build(self) -> list[Node]:
+        """Read the configuration, create the tree and write all its nodes."""
+        self.layers = get_layers(self.spekulatio_file_path)
+        for layer in self.layers:
+            layer.exclude(self.output_path)
+        self.root = create_tree(self.layers)
+        self.dependencies = {}
+        self.outputs = {}
+        return self.write(list(self.root.traverse()))
+
+    def write(self, nodes: list[Node]) -> list[Node]:
+        """Write nodes and record their dependencies."""
+        for node in nodes:
+            previous_output = self.outputs.get(node.input_path)
+            if (
+                previous_output is not None
+                and previous_output != node.output_file_path
+                and not node.is_dir
+            ):
+                (self.output_path / previous_output).unlink(missing_ok=True)
+
+        self.dependencies.update(write_nodes(self.output_path, nodes))
+        for node in nodes:
+            self.outputs[node.input_path] = node.output_file_path
+        return nodes
+
+    def is_relevant(self, change: Change) -> bool:
+        """Check if a change can affect the output.
+
+        Changes in the output directory are ignored.
+        """
+        output_path = self.output_path.resolve()
+        return change.path != output_path and output_path not in change.path.parents
+
+    def locate(self, path: Path) -> list[tuple[Layer, str]]:
+        """Return the layers that contain a path and its path relative to each."""
+        locations = []
+        for layer in self.layers:
+            try:
+                relative_path = path.relative_to(layer.path.resolve())
+            except ValueError:
+                continue
+            if relative_path.parts:
+                locations.append((layer, relative_path.as_posix()))
+        return locations
+
+    def find_node(self, relative_path: str) -> Optional[Node]:
+        """Return the node of a path relative to the layers (or None)."""
+        if self.root is None:
+            return None
+        try:
+            return self.root.get(f"/{relative_path}")
+        except SpekulatioInputError:
+            return None
+
+    def coalesce(self, changes: list[Change]) -> list[Change]:
+        """Simplify the changes of a batch.
+
+        Editors often save files atomically: they write a temporary file and
+        rename it over the original one. Files created and deleted within the
+        batch are dropped, and files created where the tree already has a node
+        from the same layer are considered modified.
+        """
+        first_kinds: dict[Path, str] = {}
+        last_kinds: dict[Path, str] = {}
+        for change in changes:
+            first_kinds.setdefault(change.path, change.kind)
+            last_kinds[change.path] = change.kind
+
+        coalesced = []
+        for change in changes:
+            if first_kinds[change.path] == "created" and last_kinds[change.path] == "deleted":
+                continue
+            if change.kind == "created" and self.has_node(change.path):
+                change = Change(change.path, "modified")
+            if change not in coalesced:
+                coalesced.append(change)
+        return coalesced
+
+    def has_node(self, path: Path) -> bool:
+        """Check if a file is already an input of a node of the tree."""
+        for layer, relative_path in self.locate(path):
+            node = self.find_node(relative_path)
+            if node is not None and layer in node._layers and not node.is_dir:
+                return True
+        return False
+
+    def is_structural(self, change: Change) -> bool:
+        """Check if a change modifies the structure of the tree.
+
+        Changes reported on a watched directory itself (eg. when the watcher
+        lost events) can affect any file, so they are structural too.
+        """
+        if change.path in self.config_paths:
+            return True
+        if change.path in self.watched_paths or any(
+            change.path == layer.path.resolve() for layer in self.layers
+        ):
+            return True
+        if change.kind == "modified":
+            return False
+
+        for layer, relative_path in self.locate(change.path):
+            name = change.path.name
+            if name in VALUES_FILE_NAMES or name == layer.values_file:
+                return True
+            if change.kind == "deleted":
+                if self.find_node(relative_path) is not None:
+                    return True
+            elif change.path.is_dir() or layer.get_action(relative_path, name, False):
+                return True
+        return False
+
+    def update(self, changes: list[Change]) -> list[Node]:
+        """Write the nodes affected by a set of changes.
+
+        :return: the nodes that have been written.
+        """
+        changes = self.coalesce([change for change in changes if self.is_relevant(change)])
+        if not changes:
+            return []
+
+        if self.root is None or any(self.is_structural(change) for change in changes):
+            return self.build()
+
+        changed_nodes: dict[str, Node] = {}
+        changed_templates: set[str] = set()
+        for change in changes:
+            if change.kind != "modified":
+                # a new or removed template may change how names are resolved
+                forget_templates()
+                compile_inline_template.cache_clear()
+
+            for layer, relative_path in self.locate(change.path):
+                name = change.path.name
+                node = self.find_node(relative_path)
+
+                # values file: invalidate the subtree of its directory
+                if name in VALUES_FILE_NAMES or name == layer.values_file:
+                    parent_path = relative_path.rpartition("/")[0]
+                    forget_values_file(str(layer.path / parent_path))
+                    directory = self.find_node(parent_path)
+                    if directory is not None:
+                        directory.invalidate(recursive=True)
+                        changed_nodes[directory.input_path] = directory
+                        for descendant in directory.traverse():
+                            changed_nodes[descendant.input_path] = descendant
+                    continue
+
+                # input file: invalidate its node
+                if node is not None and layer in node._layers and not node.is_dir:
+                    node.invalidate()
+                    changed_nodes[node.input_path] = node
+
+                # template (a file can be both a template and a node)
+                changed_templates.add(relative_path)
+
+        # rebuild the changed nodes and the ones that depend on them
+        dirty = dict(changed_nodes)
+        for path, dependencies in self.dependencies.items():
+            if path in dirty:
+                continue
+            if not dependencies.nodes.isdisjoint(changed_nodes) or not (
+                dependencies.templates.isdisjoint(changed_templates)
+            ):
+                dirty[path] = self.root.get(path)
+
+        # the content of a node may have been computed (and kept) while
+        # writing another node that includes it, so it can be outdated
+        for node in self.root.traverse():
+            node.release_content()
+
+        # keep the traversal order so that directories are created first
+        nodes = sorted(dirty.values(), key=lambda node: node.index)
+        return self.write(nodes)
+
+
+def watch(
+    spekulatio_file_path: Path,
+    output_path: Path,
+    polling: bool = False,
+    interval: float = 1.0,
+) -> Iterator[tuple[list[Change], list[Node]]]:
+    """Build a project and rebuild it every time its files change.
+
+    This is a generator that yields the changes detected and the nodes
+    written for each of them (the first build is yielded with an empty list
+    of changes). Errors during rebuilds are logged and don't stop watching.
+    """
+    live_build = LiveBuild(spekulatio_file_path, output_path)
+    yield [], live_build.build()
+
+    while True:
+        watched_paths = live_build.watched_paths
+        with get_watcher(watched_paths, polling=polling, interval=interval) as watcher:
+            while live_build.watched_paths == watched_paths:
+                changes = watcher.wait()
+                if not changes:
+                    continue
+                try:
+                    nodes = live_build.update(changes)
+                except Exception as err:
+                    log.error(f"Error rebuilding project. {err}")
+                    continue
+                if nodes:
+                    yield changes, nodes
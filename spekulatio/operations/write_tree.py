@@ -1,9 +1,278 @@
 
+import multiprocessing
+from typing import Optional
 from pathlib import Path
 
+from spekulatio.logs import log
+from spekulatio.lib.profiling import span
+from spekulatio.lib.profiling import get_profiler
+from spekulatio.lib.profiling import reset_profiler
+from spekulatio.lib.output_files import OutputChanges
+from spekulatio.lib.output_files import collect_changes
+from spekulatio.lib.output_files import pipelined_writes
 from spekulatio.models import Node
+from spekulatio.models import Manifest
+from spekulatio.models import BuildStats
+from spekulatio.models import Dependencies
+from spekulatio.models.manifest import get_manifest_path
+from spekulatio.exceptions import SpekulatioBuildError
+from spekulatio.exceptions import SpekulatioInternalError
+from .create_tree import create_tree
+from .sync_output import check_sync_output
+from .sync_output import remove_stale_outputs
 
-def write_tree(output_path: Path, root: Node) -> None:
-    """Generate the output file structure from an in-memory tree."""
-    for node in root.traverse():
+# tree used by the worker processes of a parallel build
+_worker_root: Optional[Node] = None
+
+
+def write_tree(
+    output_path: Path,
+    root: Node,
+    incremental: bool = False,
+    jobs: int = 1,
+    stats: Optional[BuildStats] = None,
+    sync: bool = False,
+    fsync: bool = False,
+) -> None:
+    """Generate the output file structure from an in-memory tree.
+
+    In incremental mode, a manifest stored next to the output directory is
+    used to skip the nodes whose input files, inherited values, templates and
+    the nodes they read (see `Dependencies`) haven't changed since the
+    previous build.
+
+    Nodes are rendered while a background thread writes the output files of
+    the previous ones (see `pipelined_writes`). If `jobs` is greater than
+    one, files are rendered and written by that number of worker processes.
+    Directories are always created beforehand by the main process. If
+    `fsync` is True, written files are flushed to disk.
+
+    Output files that already have the right content are not written again
+    (see `write_output`). If `stats` is provided, the number of nodes of
+    each action, the files processed and the paths of the files that
+    changed are recorded in it.
+
+    If `sync` is True, the files of the output directory that don't belong
+    to any node (eg. outputs of removed or renamed input files) are removed
+    after writing (see `remove_stale_outputs`). The output directory is
+    checked before writing anything (see `check_sync_output`).
+    """
+    if stats is None:
+        stats = BuildStats()
+    if sync:
+        check_sync_output(output_path, root)
+
+    # get manifest of the previous build
+    manifest_path = get_manifest_path(output_path)
+    previous = Manifest.load(manifest_path) if incremental else Manifest()
+
+    # compute the digests of the inputs of all nodes
+    manifest = Manifest()
+    if incremental:
+        with span("digests", "phase"):
+            manifest.compute_config_digest(root._layers)
+            if not manifest.is_compatible_with(previous):
+                log.info("Configuration changed: rebuilding all nodes.")
+                previous = Manifest()
+            digests = {root.input_path: manifest.add_node(root, "", previous)}
+            for node in root.traverse():
+                digests[node.input_path] = manifest.add_node(
+                    node, digests[node.parent.input_path], previous
+                )
+
+    # create directories and select the files to write
+    env = root.env
+    pending_nodes = []
+    skipped = 0
+    with span("directories", "phase"):
+        for node in root.traverse():
+            stats.count_node(node)
+            if node.is_dir:
+                node.write(base_path=output_path)
+                if incremental:
+                    manifest.set_dependencies(node, Dependencies())
+            elif incremental and manifest.is_up_to_date(node, previous, env, output_path):
+                manifest.reuse_dependencies(node, previous)
+                skipped += 1
+            else:
+                pending_nodes.append(node)
+
+    # write files
+    with span("write_files", "phase"):
+        if jobs > 1 and len(pending_nodes) > 1:
+            dependencies = write_nodes_in_parallel(
+                output_path, root, pending_nodes, jobs, stats=stats, fsync=fsync
+            )
+        else:
+            dependencies = {}
+            for node, node_dependencies, changed_paths in write_nodes_pipelined(
+                output_path, pending_nodes, fsync
+            ):
+                if changed_paths.error is not None:
+                    raise changed_paths.error
+                dependencies[node.input_path] = node_dependencies
+                stats.add_output(get_output_size(output_path, node), changed_paths)
+    stats.skipped += skipped
+
+    # remove outputs of previous builds that no node produced
+    if sync:
+        with span("sync", "phase"):
+            stats.removed_paths.extend(remove_stale_outputs(output_path, root))
+
+    if not incremental:
+        return
+
+    # record the inputs of the new outputs
+    with span("manifest", "phase"):
+        for node in pending_nodes:
+            node_dependencies = dependencies[node.input_path]
+            for name in node_dependencies.templates:
+                manifest.get_template_digest(env, name)
+            manifest.set_dependencies(node, node_dependencies)
+
+        log.info(f"Incremental build: {skipped} nodes up to date.")
+        manifest.save(manifest_path)
+
+
+def write_node(output_path: Path, node: Node) -> Dependencies:
+    """Write a node recording the other nodes and the templates it uses."""
+    env = node.root.env
+    env.loaded_templates.clear()
+    with Dependencies() as dependencies:
         node.write(base_path=output_path)
+    dependencies.templates.update(env.loaded_templates)
+    dependencies.nodes.discard(node.input_path)
+    return dependencies
+
+
+def get_output_size(output_path: Path, node: Node) -> int:
+    """Return the size of the file written for a node.
+
+    Zero is returned for nodes whose action doesn't write anything (eg. `NoOp`).
+    """
+    try:
+        return node.get_absolute_output_path(output_path).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def write_nodes(output_path: Path, nodes: list[Node]) -> dict[str, Dependencies]:
+    """Write nodes one by one.
+
+    :return: the dependencies of each node.
+    """
+    return {node.input_path: write_node(output_path, node) for node in nodes}
+
+
+def write_nodes_pipelined(output_path: Path, nodes: list[Node], fsync: bool = False):
+    """Render nodes while their output files are written in the background.
+
+    :return: the dependencies and the changed output files of each node. The
+        changed files include the error of their write (if any).
+    """
+    results = []
+    with pipelined_writes(fsync=fsync):
+        for node in nodes:
+            with collect_changes() as changed_paths:
+                node_dependencies = write_node(output_path, node)
+            results.append((node, node_dependencies, changed_paths))
+    return results
+
+
+def write_nodes_in_parallel(
+    output_path: Path,
+    root: Node,
+    nodes: list[Node],
+    jobs: int,
+    stats: Optional[BuildStats] = None,
+    fsync: bool = False,
+) -> dict[str, Dependencies]:
+    """Write nodes using a pool of worker processes.
+
+    When processes can be forked, the workers inherit the tree of the main
+    process. Otherwise, each worker creates its own tree from the layers.
+
+    Errors are collected from all workers and reported together, in
+    traversal order. If profiling is enabled, the spans recorded by forked
+    workers are added to the profile of the main process.
+
+    :return: the dependencies of each node.
+    """
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if fork else "spawn")
+    initargs = (root._layers, root if fork else None)
+
+    paths = [node.input_path for node in nodes]
+    chunk_size = max(1, min(64, len(paths) // (jobs * 4)))
+    chunks = [paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+    dependencies = {}
+    errors = []
+    profiler = get_profiler()
+    tasks = [(output_path, chunk, fsync) for chunk in chunks]
+    with context.Pool(jobs, initializer=_init_worker, initargs=initargs) as pool:
+        for results, events in pool.imap(_write_chunk, tasks):
+            if profiler is not None:
+                profiler.events.extend(events)
+            for path, node_dependencies, size, changed_paths, error in results:
+                if error:
+                    errors.append((path, error))
+                else:
+                    if stats is not None:
+                        stats.add_output(size, changed_paths)
+                    dependencies[path] = Dependencies(
+                        nodes=set(node_dependencies["nodes"]),
+                        templates=set(node_dependencies["templates"]),
+                    )
+
+    if errors:
+        raise SpekulatioBuildError(errors)
+    return dependencies
+
+
+def _init_worker(layers, root: Optional[Node]) -> None:
+    """Set up the tree of a worker process."""
+    global _worker_root
+    reset_profiler()
+    _worker_root = root if root is not None else create_tree(layers)
+
+
+def _write_chunk(args) -> tuple[list[tuple], list]:
+    """Write a group of nodes in a worker process.
+
+    :return: (path, dependencies, output size, changed output files, error)
+        for each node and the profiling events recorded while writing them.
+    """
+    if _worker_root is None:
+        raise SpekulatioInternalError("The worker process has no tree.")
+    output_path, paths, fsync = args
+    results: list[tuple] = []
+    written: list[tuple[int, str, Node, Dependencies, OutputChanges]] = []
+    with pipelined_writes(fsync=fsync):
+        for path in paths:
+            try:
+                node = _worker_root.get(path)
+                with collect_changes() as changed_paths:
+                    dependencies = write_node(output_path, node)
+            except Exception as err:
+                results.append((path, {}, 0, [], _format_error(err)))
+            else:
+                # the result is completed once the writer has finished
+                written.append((len(results), path, node, dependencies, changed_paths))
+                results.append(())
+
+    for index, path, node, dependencies, changed_paths in written:
+        try:
+            if changed_paths.error is not None:
+                raise changed_paths.error
+            size = get_output_size(output_path, node)
+        except Exception as err:
+            results[index] = (path, {}, 0, [], _format_error(err))
+        else:
+            results[index] = (path, dependencies.to_dict(), size, list(changed_paths), None)
+    profiler = get_profiler()
+    return results, profiler.take_events() if profiler is not None else []
+
+
+def _format_error(err: BaseException) -> str:
+    return f"{err.__class__.__name__}: {err}"
@@ -1,3 +1,4 @@
+import shutil
 import logging
 from pathlib import Path
 
@@ -10,6 +11,13 @@ def set_log_level(caplog):
     caplog.set_level(logging.ERROR, logger="cels")
     caplog.set_level(logging.DEBUG, logger="spekulatio")
 
+# keep persistent caches out of the user's directories
+@pytest.fixture(autouse=True, scope="session")
+def set_cache_dir(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("SPEKULATIO_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+        yield
+
 @pytest.fixture(scope="session")
 def fixtures_path():
     return Path(__file__).parent / "_fixtures"
@@ -18,3 +26,9 @@ def fixtures_path():
 def output_path(tmp_path_factory):
     output_path = tmp_path_factory.mktemp("output")
     return output_path
+
+@pytest.fixture(scope="function")
+def project_path(fixtures_path, tmp_path):
+    project_path = tmp_path / "project"
+    shutil.copytree(fixtures_path / "incremental", project_path)
+    return project_path
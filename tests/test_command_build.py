@@ -0,0 +1,80 @@
+import json
+import shutil
+
+from click.testing import CliRunner
+
+from spekulatio.commands import spekulatio
+
+
+def test_build_command(fixtures_path, output_path, tmp_path):
+    profile_path = tmp_path / "profile.json"
+    result = CliRunner().invoke(
+        spekulatio,
+        [
+            "build",
+            "-c", str(fixtures_path / "incremental" / "spekulatio.yaml"),
+            "-o", str(output_path),
+            "--jobs", "2",
+            "--incremental",
+            "--stats",
+            "--profile", str(profile_path),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert (output_path / "a.html").exists()
+    assert (output_path / "dir1" / "b.html").exists()
+    assert (output_path / "dir1" / "c.txt").exists()
+
+    assert "Built 4 nodes (3 files written, 3 changed)" in result.output
+    assert "Md2Html" in result.output
+    assert "write_tree" in result.output
+    assert "Slowest nodes" in result.output
+    assert json.loads(profile_path.read_text())["traceEvents"]
+
+
+def test_build_command_errors(fixtures_path, output_path, tmp_path, caplog):
+    config_path = tmp_path / "spekulatio.yaml"
+    config_path.write_text("layers:\n  - path: missing/\n")
+    result = CliRunner().invoke(
+        spekulatio, ["build", "-c", str(config_path), "-o", str(output_path)]
+    )
+    assert result.exit_code == 1
+    assert any(
+        record.levelname == "ERROR" and record.message.startswith("Error building project.")
+        for record in caplog.records
+    )
+
+
+def test_build_command_changed_list(fixtures_path, output_path, tmp_path):
+    changed_list_path = tmp_path / "changed.txt"
+    args = [
+        "build",
+        "-c", str(fixtures_path / "incremental" / "spekulatio.yaml"),
+        "-o", str(output_path),
+        "--changed-list", str(changed_list_path),
+    ]
+    result = CliRunner().invoke(spekulatio, args)
+    assert result.exit_code == 0, result.output
+    assert changed_list_path.read_text().splitlines() == ["a.html", "dir1/b.html", "dir1/c.txt"]
+
+    # nothing changes in a second build
+    result = CliRunner().invoke(spekulatio, args)
+    assert result.exit_code == 0, result.output
+    assert "3 files written, 0 changed" in result.output
+    assert changed_list_path.read_text() == ""
+
+
+def test_build_command_default_output_inside_layer(fixtures_path, tmp_path, monkeypatch):
+    project_path = tmp_path / "project"
+    shutil.copytree(fixtures_path / "incremental", project_path)
+    monkeypatch.chdir(project_path)
+
+    for _ in range(3):
+        result = CliRunner().invoke(spekulatio, ["build"])
+        assert result.exit_code == 0, result.output
+    assert (project_path / "build" / "dir1" / "c.txt").exists()
+    assert not (project_path / "build" / "build").exists()
+
+    # the output directory can't be the layer itself
+    result = CliRunner().invoke(spekulatio, ["build", "-o", "."])
+    assert result.exit_code == 1
@@ -0,0 +1,64 @@
+import pytest
+import yaml
+
+from spekulatio.lib.decoders import load_yaml
+from spekulatio.lib.decoders import parse_plain_mapping
+from spekulatio.lib.decoders import parse_json_mapping
+
+DOCUMENTS = [
+    "title: My page\n",
+    "title: My page\ncount: 12\n\n# comment\n_template: base.html\n",
+    "title: My page  \nzero: 0\n",
+    "a: yes\n",
+    "a: Off\n",
+    "a: null\n",
+    "a: ~\n",
+    "a: 012\n",
+    "a: 1_000\n",
+    "a: 1.5\n",
+    "a: 2020-01-01\n",
+    "a: .inf\n",
+    "a: x: y\n",
+    "a: x #comment\n",
+    "a:\n",
+    "a: 'quoted'\n",
+    "on: value\n",
+    "a: [1, 2]\n",
+    "a:\n  b: 1\n",
+    "a: y\nb: n\n",
+    "a: café\n",
+    "",
+    "# only a comment\n",
+    '{"a": 1, "b": "text", "c": [true, null, {"d": "e"}]}',
+    '{"a": 1e3}',
+    '{"a": 1.5}',
+    '{"<<": {"a": 1}}',
+    '{"a": 1',
+    '{"a": "\\ud83d\\ude00"}',
+    '{"a": "\\u00e9"}',
+    '{\n\t"a": 1\n}',
+    "[1, 2]",
+]
+
+def parse(function, text):
+    try:
+        return function(text)
+    except yaml.YAMLError:
+        return "error"
+
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_load_yaml_is_equivalent_to_safe_load(text):
+    assert parse(load_yaml, text) == parse(yaml.safe_load, text)
+
+def test_plain_mapping_fast_path():
+    text = "title: My page\ncount: 12\n"
+    assert parse_plain_mapping(text) == {"title": "My page", "count": 12}
+    assert parse_plain_mapping("a: true\n") is None
+    assert parse_plain_mapping("a:\n  b: 1\n") is None
+
+def test_json_fast_path():
+    assert parse_json_mapping('{"a": [1, "b"]}') == {"a": [1, "b"]}
+    assert parse_json_mapping('{"a": 1e3}') is None
+    assert parse_json_mapping("a: 1") is None
+    assert parse_json_mapping('{"a": "\\u00e9"}') is None
+    assert parse_json_mapping('{\n\t"a": 1\n}') is None
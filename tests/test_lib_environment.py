@@ -0,0 +1,86 @@
+
+import shutil
+
+import pytest
+from jinja2 import UndefinedError
+from jinja2 import TemplateNotFound
+
+from spekulatio.operations import build
+from spekulatio.operations import get_layers
+from spekulatio.operations import create_tree
+from spekulatio.lib.environment import LayerLoader
+from spekulatio.lib.environment import get_environment
+
+def test_environment_shared_by_layer_stack(fixtures_path):
+    layers = get_layers(fixtures_path / "incremental")
+    root = create_tree(layers)
+
+    assert root.env is (root / "dir1").env
+    assert root.env is (root / "dir1" / "b.md").env
+    assert root.env is get_environment(tuple(str(layer.path) for layer in layers))
+
+def test_layer_loader_resolution(tmp_path):
+    (tmp_path / "layer1" / "sub").mkdir(parents=True)
+    (tmp_path / "layer2").mkdir()
+    (tmp_path / "layer1" / "sub" / "a.html").write_text("1a")
+    (tmp_path / "layer2" / "b.html").write_text("2b")
+    (tmp_path / "layer1" / "b.html").write_text("1b")
+
+    env = get_environment((str(tmp_path / "layer1"), str(tmp_path / "layer2")))
+    assert env.get_template("sub/a.html").render() == "1a"
+    assert env.get_template("b.html").render() == "1b"
+    with pytest.raises(TemplateNotFound):
+        env.get_template("c.html")
+
+    # templates created after a failed lookup are found
+    (tmp_path / "layer2" / "c.html").write_text("2c")
+    assert env.get_template("c.html").render() == "2c"
+
+def test_layer_loader_index(tmp_path):
+    (tmp_path / "a.html").write_text("a")
+    loader = LayerLoader([str(tmp_path)])
+    assert loader.resolve("a.html") == str(tmp_path / "a.html")
+
+    # resolution doesn't touch the filesystem again
+    (tmp_path / "a.html").unlink()
+    assert loader.resolve("a.html") == str(tmp_path / "a.html")
+
+def test_bytecode_cache(fixtures_path, output_path, tmp_path, monkeypatch):
+    cache_path = tmp_path / "cache"
+    monkeypatch.setenv("SPEKULATIO_CACHE_DIR", str(cache_path))
+    get_environment.cache_clear()
+
+    build(fixtures_path / "incremental", output_path)
+    assert list((cache_path / "jinja").iterdir())
+    get_environment.cache_clear()
+
+def test_render_errors_are_reported(fixtures_path, tmp_path, output_path):
+    project_path = tmp_path / "project"
+    shutil.copytree(fixtures_path / "incremental", project_path)
+    (project_path / "layout.html").write_text("{{ title.nope() }}\n")
+
+    with pytest.raises(UndefinedError, match="nope"):
+        build(project_path, output_path)
+
+    # errors in the content of a page
+    (project_path / "layout.html").write_text("{{ _content }}\n")
+    (project_path / "a.md").write_text("{{ missing.attr }}\n")
+    with pytest.raises(UndefinedError, match="'missing' is undefined"):
+        build(project_path, output_path)
+
+def test_new_template_shadows_later_layer_in_next_build(tmp_path, output_path):
+    (tmp_path / "theme").mkdir()
+    (tmp_path / "content").mkdir()
+    (tmp_path / "spekulatio.yaml").write_text(
+        "layers:\n  - path: theme/spekulatio.yaml\npath: content/\nactions:\n  - name: Md2Html\n"
+    )
+    (tmp_path / "theme" / "spekulatio.yaml").write_text("path: .\n")
+    (tmp_path / "content" / "_values.yaml").write_text("_template: layout.html\n")
+    (tmp_path / "content" / "layout.html").write_text("CONTENT")
+    (tmp_path / "content" / "a.md").write_text("a")
+    build(tmp_path, output_path)
+    assert (output_path / "a.html").read_text() == "CONTENT"
+
+    (tmp_path / "theme" / "layout.html").write_text("THEME")
+    build(tmp_path, output_path)
+    assert (output_path / "a.html").read_text() == "THEME"
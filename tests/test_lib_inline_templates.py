@@ -0,0 +1,46 @@
+
+from pathlib import Path
+
+import pytest
+from jinja2 import Template
+
+from spekulatio.lib.environment import get_environment
+from spekulatio.lib.inline_templates import MAX_CACHED_SOURCE_LENGTH
+from spekulatio.lib.inline_templates import compile_inline_template
+from spekulatio.lib.inline_templates import render_inline_template
+
+@pytest.mark.parametrize("src", [
+    "",
+    "plain text",
+    "plain text\n",
+    "plain text\n\n",
+    "{{ _input_name }}",
+    "{{_i}}",
+    "{{ _input_name.with_suffix('.html') }}",
+    '{{ _i.with_suffix( ".tar.gz" ) }}',
+    "{{ _input_name.with_suffix('.html') | upper }}",
+    "{{ _input_name.stem }}-{{ foo }}",
+])
+def test_inline_templates_match_jinja(src):
+    values = {"_input_name": Path("bar.md"), "_i": Path("bar.md"), "foo": 1}
+    assert render_inline_template(src, values) == Template(src).render(values)
+
+def test_inline_templates_non_path_values():
+    assert render_inline_template("{{ _input_name }}", {"_input_name": "bar.md"}) == "bar.md"
+    assert render_inline_template("{{ _input_name }}", {}) == ""
+
+def test_inline_templates_are_cached():
+    src = "{{ _input_name.stem }}.txt"
+    assert compile_inline_template(src) is compile_inline_template(src)
+
+def test_inline_templates_use_node_environment(tmp_path):
+    (tmp_path / "part.html").write_text("part")
+    env = get_environment((str(tmp_path),))
+    src = "{% include 'part.html' %} {{ url_for }}"
+    assert render_inline_template(src, {"_env": env}).startswith("part <function url_for")
+
+def test_long_inline_templates_are_not_cached():
+    compile_inline_template.cache_clear()
+    src = "{{ foo }}" + " text" * MAX_CACHED_SOURCE_LENGTH
+    assert render_inline_template(src, {"foo": 1}).startswith("1 text")
+    assert compile_inline_template.cache_info().currsize == 0
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+from spekulatio.lib.output_files import write_output
+from spekulatio.lib.output_files import copy_output
+from spekulatio.lib.output_files import collect_changes
+from spekulatio.lib.output_files import pipelined_writes
+
+
+def test_write_output(tmp_path):
+    path = tmp_path / "index.html"
+    with collect_changes() as changed_paths:
+        write_output(path, "<p>foo</p>")
+    assert path.read_text() == "<p>foo</p>"
+    assert changed_paths == [path]
+
+    # identical content: the file is left untouched
+    os.utime(path, ns=(0, 0))
+    with collect_changes() as changed_paths:
+        write_output(path, "<p>foo</p>")
+    assert path.stat().st_mtime_ns == 0
+    assert changed_paths == []
+
+    # same size, different content
+    with collect_changes() as changed_paths:
+        write_output(path, "<p>bar</p>")
+    assert path.read_text() == "<p>bar</p>"
+    assert changed_paths == [path]
+
+    # no temporary files are left behind
+    assert [p.name for p in tmp_path.iterdir()] == ["index.html"]
+
+
+def test_write_output_replaces_links(tmp_path):
+    target_path = tmp_path / "target.html"
+    target_path.write_text("foo")
+    path = tmp_path / "index.html"
+    path.symlink_to(target_path)
+
+    with collect_changes() as changed_paths:
+        write_output(path, "foo")
+    assert changed_paths == [path]
+    assert not path.is_symlink()
+    assert target_path.read_text() == "foo"
+
+
+def copied(src_path, dst_path, strategy):
+    """Copy a file and return whether it has been written."""
+    with collect_changes() as changed_paths:
+        copy_output(src_path, dst_path, strategy)
+    return changed_paths == [dst_path]
+
+
+def test_copy_output(tmp_path):
+    src_path = tmp_path / "src.txt"
+    src_path.write_text("foo")
+    dst_path = tmp_path / "dst.txt"
+
+    assert copied(src_path, dst_path, "copy")
+    assert dst_path.read_text() == "foo"
+    assert not copied(src_path, dst_path, "copy")
+
+    # a different strategy replaces the previous copy
+    assert copied(src_path, dst_path, "symlink")
+    assert dst_path.is_symlink()
+    assert not copied(src_path, dst_path, "symlink")
+    assert copied(src_path, dst_path, "copy")
+    assert not dst_path.is_symlink()
+
+    src_path.write_text("bar")
+    assert copied(src_path, dst_path, "copy")
+    assert dst_path.read_text() == "bar"
+
+
+def test_copy_output_copies_permission_changes(tmp_path):
+    src_path = tmp_path / "src.sh"
+    src_path.write_text("foo")
+    src_path.chmod(0o644)
+    dst_path = tmp_path / "dst.sh"
+    assert copied(src_path, dst_path, "copy")
+
+    src_path.chmod(0o755)
+    assert copied(src_path, dst_path, "copy")
+    assert dst_path.stat().st_mode & 0o777 == 0o755
+    assert not copied(src_path, dst_path, "copy")
+
+
+def test_pipelined_writes(tmp_path):
+    with pipelined_writes():
+        with collect_changes() as changed_paths:
+            for i in range(200):
+                write_output(tmp_path / f"{i}.txt", str(i))
+        with collect_changes() as failed_paths:
+            write_output(tmp_path / "missing" / "a.txt", "a")
+
+    assert changed_paths == [tmp_path / f"{i}.txt" for i in range(200)]
+    assert all((tmp_path / f"{i}.txt").read_text() == str(i) for i in range(200))
+    assert failed_paths == []
+    assert isinstance(failed_paths.error, FileNotFoundError)
+
+
+def test_pipelined_writes_raise_uncollected_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        with pipelined_writes(fsync=True):
+            write_output(tmp_path / "a.txt", "a")
+            write_output(tmp_path / "missing" / "b.txt", "b")
+    assert (tmp_path / "a.txt").read_text() == "a"
+
+
+def test_pipelined_writes_keep_errors_of_the_block(tmp_path):
+    with pytest.raises(ValueError):
+        with pipelined_writes():
+            write_output(tmp_path / "missing" / "a.txt", "a")
+            raise ValueError("render error")
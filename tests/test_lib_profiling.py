@@ -0,0 +1,58 @@
+import os
+import json
+
+import pytest
+
+from spekulatio.lib import profiling
+from spekulatio.operations import build
+
+
+def test_spans_are_not_recorded_by_default():
+    assert profiling.get_profiler() is None
+    assert profiling.span("write_node", "node", "/a.md") is profiling.NO_SPAN
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_profile(fixtures_path, output_path, tmp_path, jobs):
+    profile_path = tmp_path / "profile.json"
+    build(fixtures_path / "incremental", output_path, jobs=jobs, profile_path=profile_path)
+    assert profiling.get_profiler() is None
+
+    events = json.loads(profile_path.read_text())["traceEvents"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+
+    phases = {event["name"] for event in events if event["cat"] == "phase"}
+    assert {"get_layers", "apply_layers", "prune", "sort", "write_files"} <= phases
+
+    written = {event["args"]["node"] for event in events if event["name"] == "write_node"}
+    assert {"/a.md", "/dir1/b.md", "/dir1/c.txt"} <= written
+    assert "markdown" in {event["name"] for event in events}
+
+    # files are written (and profiled) by the workers
+    pids = {
+        event["pid"] for event in events
+        if event["name"] == "write_node" and event["args"]["node"].endswith(".md")
+    }
+    assert (os.getpid() in pids) == (jobs == 1)
+
+
+def test_profile_report():
+    profiler = profiling.Profiler()
+    profiler.add("write_node", "node", profiler.start_ns, profiler.start_ns + 5_000_000, "/slow.md")
+    profiler.add("write_node", "node", profiler.start_ns, profiler.start_ns + 1_000_000, "/fast.md")
+    profiler.add("sort", "phase", profiler.start_ns, profiler.start_ns + 2_000_000)
+
+    assert profiler.get_slowest_nodes(1) == [("/slow.md", 5.0)]
+    assert profiler.get_phase_times() == {"sort": 2.0}
+    report = profiler.format_report(2)
+    assert report.index("/slow.md") < report.index("/fast.md")
+
+
+def test_profiling_started_by_the_caller(fixtures_path, output_path):
+    profiler = profiling.start_profiling()
+    try:
+        build(fixtures_path / "incremental", output_path)
+        assert profiling.get_profiler() is profiler
+        assert "write_node" in {event["name"] for event in profiler.events}
+    finally:
+        profiling.stop_profiling()
@@ -0,0 +1,136 @@
+import os
+
+import pytest
+
+from spekulatio.lib import values_cache
+from spekulatio.lib.values_cache import ValuesCache
+from spekulatio.lib.values_cache import get_values_cache
+from spekulatio.lib import parse_values
+from spekulatio.lib.parse_values import get_frontmatter_values
+from spekulatio.lib.parse_values import parse_values_from_frontmatter
+from spekulatio.lib.parse_values import parse_values_from_directory
+
+@pytest.fixture(scope="function")
+def cache(tmp_path):
+    cache = ValuesCache(tmp_path / "values.sqlite3")
+    yield cache
+    cache.close()
+
+def test_values_are_stored(cache, tmp_path):
+    path = tmp_path / "a.md"
+    text = "---\ntitle: A\n---\nText.\n"
+    path.write_text(text)
+
+    assert cache.get("frontmatter", path, os.stat(path)) is None
+    assert cache.find("frontmatter", path, text, os.stat(path)) is None
+    cache.set("frontmatter", path, text, os.stat(path), 16, {"title": "A"})
+    assert cache.find("frontmatter", path, text, os.stat(path)) == (16, {"title": "A"})
+
+def test_touched_files_are_found_by_content(cache, tmp_path):
+    path = tmp_path / "a.md"
+    text = "---\ntitle: A\n---\nText.\n"
+    path.write_text(text)
+    cache.set("frontmatter", path, text, os.stat(path), 16, {"title": "A"})
+
+    os.utime(path, ns=(0, 0))
+    assert cache.get("frontmatter", path, os.stat(path)) is None
+    assert cache.find("frontmatter", path, text, os.stat(path)) == (16, {"title": "A"})
+
+    # once found by content, the entry is found by stat again
+    assert cache.get("frontmatter", path, os.stat(path)) == (16, {"title": "A"})
+
+    # files with the same content share entries
+    other_path = tmp_path / "b.md"
+    other_path.write_text(text)
+    assert cache.find("frontmatter", other_path, text, os.stat(other_path)) == (16, {"title": "A"})
+
+def test_modified_files_are_not_found(cache, tmp_path):
+    path = tmp_path / "a.md"
+    text = "---\ntitle: A\n---\nText.\n"
+    path.write_text(text)
+    cache.set("frontmatter", path, text, os.stat(path), 16, {"title": "A"})
+
+    text = "---\ntitle: B\n---\nText.\n"
+    path.write_text(text)
+    assert cache.get("frontmatter", path, os.stat(path)) is None
+    assert cache.find("frontmatter", path, text, os.stat(path)) is None
+
+def test_recently_modified_files_are_only_found_by_content(cache, tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("---\ntitle: A\n---\nText.\n")
+    stat = os.stat(path)
+    cache.set("frontmatter", path, path.read_text(), stat, 16, {"title": "A"})
+
+    # same size, mtime and inode, but a different content
+    text = "---\ntitle: B\n---\nText.\n"
+    path.write_text(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.get("frontmatter", path, os.stat(path)) is None
+    assert cache.find("frontmatter", path, text, os.stat(path)) is None
+
+def test_old_files_are_found_by_stat(cache, tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("---\ntitle: A\n---\nText.\n")
+    os.utime(path, ns=(0, 0))
+    cache.set("frontmatter", path, path.read_text(), os.stat(path), 16, {"title": "A"})
+
+    assert cache.get("frontmatter", path, os.stat(path)) == (16, {"title": "A"})
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ValuesCache(tmp_path / "values.sqlite3", max_size=100)
+    for index in range(5):
+        path = tmp_path / f"{index}.yaml"
+        text = f"value: {index}\n"
+        path.write_text(text)
+        cache.set("yaml", path, text, os.stat(path), 0, {"value": index, "padding": "x" * 20})
+    cache.close()
+
+    cache = ValuesCache(tmp_path / "values.sqlite3")
+    assert cache.find("yaml", tmp_path / "0.yaml", "value: 0\n", os.stat(tmp_path / "0.yaml")) is None
+    assert cache.find("yaml", tmp_path / "4.yaml", "value: 4\n", os.stat(tmp_path / "4.yaml")) is not None
+    cache.close()
+
+def test_read_only_cache(tmp_path):
+    path = tmp_path / "a.yaml"
+    path.write_text("a: 1\n")
+    cache = ValuesCache(tmp_path / "values.sqlite3", read_only=True)
+    cache.set("yaml", path, "a: 1\n", os.stat(path), 0, {"a": 1})
+    assert cache.find("yaml", path, "a: 1\n", os.stat(path)) is None
+    cache.close()
+
+def test_parsers_use_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("SPEKULATIO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(values_cache, "_cache", None)
+    path = tmp_path / "a.md"
+    path.write_text("---\ntitle: A\n---\nText.\n")
+    (tmp_path / "_values.yaml").write_text("b: 2\n")
+
+    for _ in range(2):
+        assert parse_values_from_frontmatter(path) == ("Text.\n", {"title": "A"})
+        assert parse_values_from_directory(tmp_path) == {"b": 2}
+    cache = get_values_cache()
+    assert cache.find("frontmatter", path, path.read_text(), os.stat(path)) is not None
+    cache.close()
+
+def test_cached_values_are_read_without_reading_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("SPEKULATIO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(values_cache, "_cache", None)
+    path = tmp_path / "a.md"
+    path.write_text("---\ntitle: A\n---\nText.\n")
+    (tmp_path / "_values.yaml").write_text("b: 2\n")
+    os.utime(path, ns=(0, 0))
+    os.utime(tmp_path / "_values.yaml", ns=(0, 0))
+    assert get_frontmatter_values(path) == {"title": "A"}
+    assert parse_values_from_directory(tmp_path) == {"b": 2}
+
+    def fail(*args):
+        raise AssertionError("file read")
+
+    monkeypatch.setattr(parse_values, "read_text", fail)
+    assert get_frontmatter_values(path) == {"title": "A"}
+    assert parse_values_from_directory(tmp_path) == {"b": 2}
+    get_values_cache().close()
+
+def test_cache_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("SPEKULATIO_NO_CACHE", "1")
+    assert get_values_cache() is None
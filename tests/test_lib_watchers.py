@@ -0,0 +1,52 @@
+import sys
+
+import pytest
+
+from spekulatio.lib.watchers import Change
+from spekulatio.lib.watchers import PollingWatcher
+from spekulatio.lib.watchers import InotifyWatcher
+
+def test_polling_watcher(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    with PollingWatcher([tmp_path], interval=0.01) as watcher:
+        assert watcher.wait(timeout=0) == []
+
+        (tmp_path / "a.txt").write_text("modified")
+        (tmp_path / "b.txt").unlink()
+        (tmp_path / "dir").mkdir()
+        (tmp_path / "dir" / "c.txt").write_text("c")
+        changes = set(watcher.wait(timeout=1))
+
+    path = tmp_path.resolve()
+    assert changes == {
+        Change(path / "a.txt", "modified"),
+        Change(path / "b.txt", "deleted"),
+        Change(path / "dir", "created"),
+        Change(path / "dir" / "c.txt", "created"),
+    }
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+def test_inotify_watcher(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    with InotifyWatcher([tmp_path]) as watcher:
+        assert watcher.wait(timeout=0) == []
+
+        (tmp_path / "a.txt").write_text("modified")
+        (tmp_path / "b.txt").unlink()
+        (tmp_path / "dir").mkdir()
+        changes = set(watcher.wait(timeout=1))
+
+        # new directories are watched too
+        (tmp_path / "dir" / "c.txt").write_text("c")
+        changes.update(watcher.wait(timeout=1))
+
+    path = tmp_path.resolve()
+    assert changes == {
+        Change(path / "a.txt", "modified"),
+        Change(path / "b.txt", "deleted"),
+        Change(path / "dir", "created"),
+        Change(path / "dir" / "c.txt", "created"),
+        Change(path / "dir" / "c.txt", "modified"),
+    }
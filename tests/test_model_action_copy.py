@@ -1,5 +1,10 @@
 
+import pytest
+
 from spekulatio.operations import build
+from spekulatio.models import Action
+from spekulatio.models.actions import Copy
+from spekulatio.exceptions import SpekulatioValidationError
 
 def test_action_copy(fixtures_path, output_path):
 
@@ -14,3 +19,46 @@ def test_action_copy(fixtures_path, output_path):
 
     file_path = output_path / "foo" / "BAR.TXT"
     assert file_path.read_text() == "foobar\n"
+
+@pytest.fixture(scope="function")
+def input_file(tmp_path):
+    input_file = tmp_path / "input.txt"
+    input_file.write_text("foobar\n")
+    input_file.chmod(0o640)
+    return input_file
+
+@pytest.mark.parametrize("strategy", ["auto", "copy", "reflink", "kernel"])
+def test_action_copy_strategies(strategy, input_file, output_path):
+    output_file = output_path / "output.txt"
+    output_file.write_text("previous content")
+
+    Copy(parameters={"strategy": strategy}).execute(input_file, output_file, {})
+
+    assert output_file.read_text() == "foobar\n"
+    assert not output_file.is_symlink()
+    assert not output_file.samefile(input_file)
+    assert output_file.stat().st_mode == input_file.stat().st_mode
+
+def test_action_copy_hardlink(input_file, output_path):
+    output_file = output_path / "output.txt"
+    Copy(parameters={"strategy": "hardlink"}).execute(input_file, output_file, {})
+    assert output_file.samefile(input_file)
+
+    # switching strategy doesn't write through the link
+    Copy(parameters={"strategy": "copy"}).execute(input_file, output_file, {})
+    assert not output_file.samefile(input_file)
+    assert input_file.read_text() == "foobar\n"
+
+def test_action_copy_symlink(input_file, output_path):
+    output_file = output_path / "output.txt"
+    Copy(parameters={"strategy": "symlink"}).execute(input_file, output_file, {})
+    assert output_file.is_symlink()
+    assert output_file.read_text() == "foobar\n"
+
+def test_action_copy_wrong_strategy():
+    with pytest.raises(SpekulatioValidationError):
+        _ = Action.from_dict({
+            "name": "Copy",
+            "patterns": ["*.png"],
+            "parameters": {"strategy": "teleport"},
+        })
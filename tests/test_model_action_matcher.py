@@ -0,0 +1,48 @@
+
+import itertools
+
+import pytest
+
+from spekulatio.models import Action
+from spekulatio.models.action_matcher import ActionMatcher
+
+PATTERN_LISTS = [
+    ["*.md", "*.markdown"],
+    ["README", "*.txt"],
+    ["docs/*.txt"],
+    ["*.tar.gz"],
+    ["*.m?", "!*.mk"],
+    ["/root.md"],
+    ["**/static/**"],
+    ["build/"],
+    ["*"],
+]
+
+PATHS = [
+    "a.md", "dir/a.md", "a.md/b.txt", ".md", "a.MD", "a.markdown",
+    "README", "dir/README", "README.md", "notes.txt", "docs/notes.txt",
+    "docs/sub/notes.txt", "a.tar.gz", "x/a.tar.gz", "a.gz", "a.mk", "a.mx",
+    "root.md", "dir/root.md", "static/img.png", "a/static/b/c.css",
+    "build/out.js", "build", "plain",
+]
+
+def sequential_match(actions, path):
+    for action in actions:
+        if action.match(path):
+            return action
+    return None
+
+@pytest.mark.parametrize("pattern_lists", list(itertools.combinations(PATTERN_LISTS, 3)))
+def test_matcher_equivalent_to_sequential_matching(pattern_lists):
+    for ordered_pattern_lists in [pattern_lists, pattern_lists[::-1]]:
+        actions = [Action(patterns=patterns) for patterns in ordered_pattern_lists]
+        matcher = ActionMatcher(actions)
+        for path in PATHS:
+            assert matcher.match(path) is sequential_match(actions, path), path
+
+def test_matcher_first_match_wins():
+    actions = [Action(patterns=["docs/*.md"]), Action(patterns=["*.md"]), Action(patterns=["*.md"])]
+    matcher = ActionMatcher(actions)
+    assert matcher.match("docs/a.md") is actions[0]
+    assert matcher.match("a.md") is actions[1]
+    assert matcher.match("a.txt") is None
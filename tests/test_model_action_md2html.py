@@ -0,0 +1,26 @@
+
+from pathlib import Path
+
+from spekulatio.models.actions import Md2Html
+from spekulatio.models.actions.md2html import get_markdown_converter
+
+def convert(action, text):
+    values = {"_src": text, "_input_name": Path("foo.md")}
+    return action.process_content(values)
+
+def test_md2html_converter_reused():
+    parameters = {"extensions": ["toc"]}
+    assert get_markdown_converter(parameters) is get_markdown_converter(dict(parameters))
+    assert get_markdown_converter(parameters) is not get_markdown_converter({})
+
+def test_md2html_per_document_state():
+    action = Md2Html(parameters={"extensions": ["toc", "footnotes"]})
+
+    values1 = convert(action, "# One\n\nText[^1].\n\n[^1]: Note one.\n")
+    values2 = convert(action, "# Two\n\n## Three\n")
+
+    assert [token["name"] for token in values1["_toc"]] == ["One"]
+    assert [token["name"] for token in values2["_toc"]] == ["Two"]
+    assert [token["name"] for token in values2["_toc"][0]["children"]] == ["Three"]
+    assert "Note one." in values1["_content"]
+    assert "Note one." not in values2["_content"]
@@ -0,0 +1,46 @@
+from spekulatio.models import Dependencies
+from spekulatio.operations import get_layers
+from spekulatio.operations import create_tree
+
+def test_reads_are_recorded(fixtures_path):
+    layers = get_layers(fixtures_path / "incremental")
+    root = create_tree(layers)
+    b = root.get("/dir1/b.md")
+
+    with Dependencies() as dependencies:
+        b.values["title"]
+    assert dependencies.nodes == {"/dir1/b.md"}
+
+    # cached properties are recorded on every access
+    b.url
+    with Dependencies() as dependencies:
+        b.url
+    assert dependencies.nodes == {"/dir1/b.md"}
+
+def test_reads_to_compute_values_are_not_recorded(fixtures_path):
+    layers = get_layers(fixtures_path / "incremental")
+    root = create_tree(layers)
+    b = root.get("/dir1/b.md")
+
+    # computing the values of b reads the values of its ancestors
+    with Dependencies() as dependencies:
+        b.user_values
+    assert dependencies.nodes == {"/dir1/b.md"}
+
+def test_order_reads_are_recorded_on_parents(fixtures_path):
+    layers = get_layers(fixtures_path / "incremental")
+    root = create_tree(layers)
+    b = root.get("/dir1/b.md")
+
+    with Dependencies() as dependencies:
+        b.next_sibling
+    assert dependencies.nodes == {"/dir1/b.md", "/dir1", ""}
+
+def test_reads_outside_recorders_are_ignored(fixtures_path):
+    layers = get_layers(fixtures_path / "incremental")
+    root = create_tree(layers)
+
+    with Dependencies() as dependencies:
+        pass
+    root.get("/a.md").values
+    assert dependencies.nodes == set()
@@ -1,7 +1,14 @@
 
+from pathlib import Path
+
 import pytest
 
+from spekulatio.models import Node
+from spekulatio.models.actions import Md2Html
+from spekulatio.models.actions import Render
+from spekulatio.models.actions import create_dir_action
 from spekulatio.operations import get_layers
+from spekulatio.operations import create_tree
 from spekulatio.exceptions import SpekulatioValidationError
 
 def test_create_empty_layer(fixtures_path):
@@ -18,3 +25,38 @@ def test_create_layer(fixtures_path):
 def test_fail_create_layer(fixtures_path):
     with pytest.raises(SpekulatioValidationError):
         _ = get_layers(fixtures_path / "layer-wrong")
+
+def test_layer_scan(tmp_path):
+    (tmp_path / "spekulatio.yaml").write_text("actions:\n  - name: Copy\n    patterns: ['*']\n")
+    (tmp_path / "_values.yaml").write_text("foo: 1\n")
+    (tmp_path / "dir1" / "dir2").mkdir(parents=True)
+    (tmp_path / "dir1" / "spekulatio.yaml").write_text("")
+    (tmp_path / "dir1" / "dir2" / "a.txt").write_text("")
+
+    layer = get_layers(tmp_path)[0]
+    root = Node(name=".")
+    layer.apply_to(root)
+
+    # the configuration and values files of the layer are not part of the tree
+    assert set(root._children) == set(["dir1"])
+    assert set(root.get("dir1")._children) == set(["dir2", "spekulatio.yaml"])
+    assert root.get("dir1/dir2").is_dir
+    assert not root.get("dir1/dir2/a.txt").is_dir
+
+def test_layer_get_action(fixtures_path):
+    layer = get_layers(fixtures_path / "simple")[0]
+    assert isinstance(layer.get_action("foo.md", "foo.md", False), Md2Html)
+    assert isinstance(layer.get_action("dir1/baz.txt", "baz.txt", False), Render)
+    assert layer.get_action("dir1", "dir1", True) is create_dir_action
+    assert layer.get_action("spekulatio.yaml", "spekulatio.yaml", False) is None
+    assert layer.get_action("dir1/_values.yaml", "_values.yaml", False) is None
+
+def test_values_files_are_found_while_scanning(fixtures_path, monkeypatch):
+    layers = get_layers(fixtures_path / "values-directory")
+
+    # values files are located without checking the filesystem again
+    def fail(*args, **kwargs):
+        raise AssertionError("unexpected filesystem access")
+    monkeypatch.setattr(Path, "exists", fail)
+    root = create_tree(layers, use_snapshot=False)
+    assert root.get("foo").values["foo"] == 1
@@ -0,0 +1,70 @@
+
+from spekulatio.operations import get_layers
+from spekulatio.operations import create_tree
+
+
+def paths(nodes):
+    return [node.input_path for node in nodes]
+
+
+def test_traversal_orders(fixtures_path):
+    layers = get_layers(fixtures_path / "sorting-sink")
+    root = create_tree(layers)
+
+    pre_order = paths(root.traverse())
+    assert pre_order == [
+        "/dir1", "/dir1/b.md", "/dir1/c.md", "/dir1/d.md", "/dir1/e.md", "/dir1/a.md", "/f.md",
+    ]
+    assert paths(root.traverse_post_order()) == [
+        "/dir1/b.md", "/dir1/c.md", "/dir1/d.md", "/dir1/e.md", "/dir1/a.md", "/dir1", "/f.md",
+    ]
+    assert paths(root.traverse_breadth_first()) == [
+        "/dir1", "/f.md", "/dir1/b.md", "/dir1/c.md", "/dir1/d.md", "/dir1/e.md", "/dir1/a.md",
+    ]
+    assert paths((root / "dir1").traverse()) == pre_order[1:6]
+    assert list((root / "f.md").traverse()) == []
+
+
+def test_index_and_subtree_range(fixtures_path):
+    layers = get_layers(fixtures_path / "traversing")
+    root = create_tree(layers)
+    order = root.get_order()
+
+    dir2 = root.get("dir1/dir2")
+    assert order.nodes[dir2.index] is dir2
+    assert dir2.subtree_range == range(2, 5)
+    assert paths(order.nodes[2:5]) == ["/dir1/dir2", "/dir1/dir2/dir3", "/dir1/dir2/dir3/file.md"]
+    assert [node.level for node in order.nodes] == [0, 1, 2, 3, 4]
+
+
+def test_next_and_prev(fixtures_path):
+    layers = get_layers(fixtures_path / "sorting-default")
+    root = create_tree(layers)
+
+    nodes = [root, *root.traverse()]
+    for prev_node, next_node in zip(nodes, nodes[1:]):
+        assert prev_node.next is next_node
+    assert nodes[-1].next is None
+
+    # prev is the previous sibling or, for first children, the parent
+    dir1 = root / "dir1"
+    assert root.prev is None
+    assert dir1.prev is root
+    assert (dir1 / "a.md").prev is dir1
+    assert (dir1 / "b.md").prev is dir1 / "a.md"
+
+    # the previous node of a node after a directory is the directory
+    assert (root / "f.md").prev is dir1
+
+
+def test_order_is_updated_when_tree_changes(fixtures_path):
+    layers = get_layers(fixtures_path / "sorting-default")
+    root = create_tree(layers)
+    f = root / "f.md"
+    assert f.next is None
+
+    dir1 = root / "dir1"
+    new = dir1.upsert_child("z.md", f.action, f.layer)
+    assert new.prev is dir1 / "e.md"
+    assert new.next is f
+    assert f.level == 1
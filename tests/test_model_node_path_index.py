@@ -0,0 +1,81 @@
+import pytest
+
+from spekulatio.lib.environment import render_template
+from spekulatio.operations import build
+from spekulatio.operations import get_layers
+from spekulatio.operations import create_tree
+from spekulatio.exceptions import SpekulatioInputError
+
+
+def test_get_uses_path_index(fixtures_path):
+    layers = get_layers(fixtures_path / "traversing")
+    root = create_tree(layers)
+
+    index = root.get_path_index()
+    assert sorted(index.input_paths) == [
+        "", "/dir1", "/dir1/dir2", "/dir1/dir2/dir3", "/dir1/dir2/dir3/file.md",
+    ]
+    dir2 = root.get("dir1/dir2")
+    assert dir2 is index.input_paths["/dir1/dir2"]
+    assert dir2.get("dir3/file.md") is index.input_paths["/dir1/dir2/dir3/file.md"]
+    assert dir2.get("/dir1/") is root / "dir1"
+
+    with pytest.raises(SpekulatioInputError):
+        root.get("dir1/missing.md")
+
+
+def test_path_index_follows_tree_changes(fixtures_path):
+    layers = get_layers(fixtures_path / "traversing")
+    root = create_tree(layers)
+    file_node = root.get("dir1/dir2/dir3/file.md")
+    assert root.get_by_output_path("/dir1/dir2/dir3/file.html") is file_node
+
+    # new nodes
+    dir3 = root.get("dir1/dir2/dir3")
+    new = dir3.upsert_child("new.md", file_node.action, file_node.layer)
+    assert root.get("/dir1/dir2/dir3/new.md") is new
+    assert root.get_path_index().output_paths is None
+
+    # pruned nodes
+    empty = root.upsert_child("empty", dir3.action, dir3.layer)
+    assert root.get("empty") is empty
+    root.prune()
+    with pytest.raises(SpekulatioInputError):
+        root.get("empty")
+
+
+def test_template_helpers(fixtures_path):
+    layers = get_layers(fixtures_path / "traversing")
+    root = create_tree(layers)
+    dir2 = root.get("dir1/dir2")
+
+    template = dir2.env.from_string(
+        "{{ url_for('dir3/file.md') }} "
+        "{{ lookup('/dir1').url }} "
+        "{{ lookup('/dir1/dir2/dir3/file.html', output=True).input_path }}"
+    )
+    assert render_template(template, dir2.values) == (
+        "/dir1/dir2/dir3/file.html /dir1 /dir1/dir2/dir3/file.md"
+    )
+
+    # relative paths are resolved from the directory of a file
+    file_node = dir2.get("dir3/file.md")
+    template = file_node.env.from_string("{{ url_for('file.md') }}")
+    assert render_template(template, file_node.values) == "/dir1/dir2/dir3/file.html"
+
+
+def test_template_helpers_in_pages(fixtures_path, tmp_path, output_path):
+    project_path = tmp_path / "project"
+    (project_path / "blog").mkdir(parents=True)
+    (project_path / "spekulatio.yaml").write_text("actions:\n  - name: Md2Html\n")
+    (project_path / "_values.yaml").write_text("_template: layout.html\n")
+    (project_path / "layout.html").write_text("{{ url_for('b.md') }} {{ _content }}\n")
+    (project_path / "blog" / "a.md").write_text(
+        "{{ url_for('b.md') }} {{ lookup('/blog/b.md').url }}\n"
+    )
+    (project_path / "blog" / "b.md").write_text("b\n")
+    build(project_path, output_path)
+
+    assert (output_path / "blog" / "a.html").read_text() == (
+        "/blog/b.html <p>/blog/b.html /blog/b.html</p>"
+    )
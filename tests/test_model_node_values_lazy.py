@@ -0,0 +1,74 @@
+
+import pytest
+
+from spekulatio.models.actions import Md2Html
+from spekulatio.operations import build
+from spekulatio.operations import get_layers
+from spekulatio.operations import create_tree
+
+@pytest.fixture(scope="function")
+def conversions(monkeypatch):
+    """Keep track of the nodes whose content is converted."""
+    converted = []
+    process_content = Md2Html.process_content
+
+    def counting_process_content(self, values):
+        converted.append(values["_input_name"].name)
+        return process_content(self, values)
+
+    monkeypatch.setattr(Md2Html, "process_content", counting_process_content)
+    return converted
+
+def test_lazy_values(fixtures_path, conversions):
+    layers = get_layers(fixtures_path / "values-lazy")
+    root = create_tree(layers)
+    node = root / "a.md"
+
+    # reading metadata doesn't render the content
+    assert node.values["title"] == "Page A"
+    assert node.user_values == {"title": "Page A"}
+    assert "_content" in node.values
+    assert "_toc" in node.values
+    assert conversions == []
+
+    # lazy values are computed together on first access
+    assert node.values["_content"] == "<h1>Heading a</h1>"
+    assert node.values["_src"] == "\n# Heading a\n"
+    assert node.values["_toc"] == []
+    assert conversions == ["a.md"]
+
+    # and can be released and computed again
+    node.values.release_content()
+    assert node.values["_content"] == "<h1>Heading a</h1>"
+    assert conversions == ["a.md", "a.md"]
+
+def test_lazy_values_navigation(fixtures_path, output_path, conversions):
+    build(fixtures_path / "values-lazy", output_path)
+
+    # each page is converted only once even if all pages read the titles of their siblings
+    assert sorted(conversions) == ["a.md", "b.md", "c.md"]
+    assert (output_path / "b.html").read_text() == "Page A Page B Page C | <h1>Heading b</h1>"
+
+def test_content_doesnt_see_itself(fixtures_path, tmp_path, output_path):
+    (tmp_path / "spekulatio.yaml").write_text("actions:\n  - name: Render\n    patterns: ['*.txt']\n")
+    (tmp_path / "foo.txt").write_text("[{{ _content }}] {{ _input_name }}")
+
+    build(tmp_path, output_path)
+    assert (output_path / "foo.txt").read_text() == "[] foo.txt"
+
+def test_lazy_values_override_user_values(tmp_path, output_path):
+    (tmp_path / "spekulatio.yaml").write_text("actions:\n  - name: Md2Html\n")
+    (tmp_path / "layout.html").write_text("{{ _content }} {{ _toc }}")
+    (tmp_path / "_values.yaml").write_text("_template: layout.html\n_toc: inherited\n")
+    (tmp_path / "a.md").write_text("---\n_content: frontmatter\n---\n\n# Heading a\n")
+
+    layers = get_layers(tmp_path)
+    root = create_tree(layers)
+    node = root / "a.md"
+    assert node.values["_content"] == "<h1>Heading a</h1>"
+    assert node.values["_toc"] == []
+    assert node.values.copy()["_content"] == "<h1>Heading a</h1>"
+    assert list(node.values).count("_content") == 1
+
+    build(tmp_path, output_path)
+    assert (output_path / "a.html").read_text() == "<h1>Heading a</h1> []"
@@ -0,0 +1,66 @@
+import shutil
+
+import pytest
+
+from spekulatio.models import Node
+from spekulatio.models import TreeSnapshot
+from spekulatio.models import tree_snapshot
+from spekulatio.operations import get_layers
+from spekulatio.operations import create_tree
+
+@pytest.fixture(scope="function")
+def project_path(fixtures_path, tmp_path, monkeypatch):
+    # trust listings regardless of how recently directories were modified
+    monkeypatch.setattr(tree_snapshot, "RACY_INTERVAL_NS", -10**18)
+    project_path = tmp_path / "project"
+    shutil.copytree(fixtures_path / "website-project", project_path)
+    return project_path
+
+def get_paths(root):
+    return [(node.input_path, type(node.action)) for node in root.traverse()]
+
+def test_snapshot_is_reused(project_path):
+    layers = get_layers(project_path)
+    cold_root = create_tree(layers)
+
+    snapshot = TreeSnapshot.load(layers)
+    assert snapshot.listings
+    warm_root = create_tree(layers)
+    assert get_paths(warm_root) == get_paths(cold_root)
+
+    snapshot = TreeSnapshot.load(layers)
+    for layer in layers:
+        layer.apply_to(Node(name="."), snapshot=snapshot)
+    assert snapshot.listed == 0
+    assert snapshot.reused > 0
+
+def test_modified_directories_are_listed_again(project_path):
+    layers = get_layers(project_path)
+    create_tree(layers)
+
+    (project_path / "content" / "new.md").write_text("New page.\n")
+    root = create_tree(get_layers(project_path))
+    assert "/new.md" in [node.input_path for node in root.traverse()]
+
+    (project_path / "content" / "new.md").unlink()
+    root = create_tree(get_layers(project_path))
+    assert "/new.md" not in [node.input_path for node in root.traverse()]
+
+def test_recently_modified_directories_are_not_trusted(project_path, monkeypatch):
+    monkeypatch.setattr(tree_snapshot, "RACY_INTERVAL_NS", 10**18)
+    layers = get_layers(project_path)
+    create_tree(layers)
+
+    snapshot = TreeSnapshot.load(layers)
+    for layer in layers:
+        layer.apply_to(Node(name="."), snapshot=snapshot)
+    assert snapshot.reused == 0
+
+def test_configuration_changes_invalidate_snapshot(project_path):
+    layers = get_layers(project_path)
+    create_tree(layers)
+    key = TreeSnapshot.get_key(layers)
+
+    config_path = project_path / "spekulatio.yaml"
+    config_path.write_text(config_path.read_text() + "\n# changed\n")
+    assert TreeSnapshot.get_key(get_layers(project_path)) != key
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+from cels import patch_dictionary
+
+from spekulatio.models.values import NodeValues
+from spekulatio.models.values import ValuesOverlay
+from spekulatio.models.values import MAX_OVERLAY_DEPTH
+from spekulatio.models.values import patch_values
+from spekulatio.models.values import is_plain_patch
+from spekulatio.models.actions import create_dir_action
+from spekulatio.operations import get_layers
+from spekulatio.operations import create_tree
+
+
+def random_value(rng, depth=0):
+    kind = rng.random()
+    if kind < 0.3 and depth < 3:
+        return {rng.choice("abcdef"): random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))}
+    if kind < 0.4:
+        return [rng.randint(0, 9) for _ in range(rng.randint(0, 3))]
+    return rng.choice([1, "x", None, True])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_plain_patches_match_cels(seed):
+    rng = random.Random(seed)
+    values = {key: random_value(rng) for key in "abcdef" if rng.random() < 0.7}
+    patch = {key: random_value(rng) for key in "cdefgh" if rng.random() < 0.5}
+
+    expected = patch_dictionary(values, patch)
+    overlay = ValuesOverlay(NodeValues(values, create_dir_action))
+    result = patch_values(overlay, patch)
+    assert list(result.items()) == list(expected.items())
+
+
+def test_annotated_patches_use_cels():
+    values = {"a": 1, "b": {"c": [1, 2]}}
+    patch = {"a {delete}": None, "b": {"c {insert@0}": 0}}
+    assert not is_plain_patch(patch)
+    result = patch_values(ValuesOverlay(values), patch)
+    assert result == {"b": {"c": [0, 1, 2]}}
+
+
+def test_overlay_shares_parent_values():
+    parent = {"menu": {"items": list(range(1000))}, "title": "Site"}
+    overlay = ValuesOverlay(parent)
+    overlay["title"] = "Page"
+    overlay["extra"] = 1
+
+    assert overlay._values == {"title": "Page", "extra": 1}
+    assert overlay["menu"] is parent["menu"]
+    assert list(overlay) == ["menu", "title", "extra"]
+    assert len(overlay) == 3
+    assert parent["title"] == "Site"
+
+    # deleting an inherited key doesn't change the parent
+    del overlay["menu"]
+    assert "menu" not in overlay
+    assert "menu" in parent
+
+
+def test_long_overlay_chains_are_flattened():
+    values = {"a": 1}
+    overlays = []
+    for index in range(3 * MAX_OVERLAY_DEPTH):
+        values = ValuesOverlay(values)
+        values[f"key{index}"] = index
+        overlays.append(values)
+    assert max(overlay.depth for overlay in overlays) <= MAX_OVERLAY_DEPTH
+    assert values["a"] == 1
+    assert len(values) == 3 * MAX_OVERLAY_DEPTH + 1
+
+
+def test_node_values_are_overlays(fixtures_path):
+    layers = get_layers(fixtures_path / "values-inheritance")
+    root = create_tree(layers)
+
+    node = root.get("dir1/dir2/foo.md")
+    assert isinstance(node.values._values, ValuesOverlay)
+    assert node.values["_root"] is root
+    assert node.values["_this"] is node
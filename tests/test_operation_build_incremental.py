@@ -0,0 +1,128 @@
+from spekulatio.operations import build
+from spekulatio.models import Manifest
+from spekulatio.models.manifest import get_manifest_path
+
+def tamper(*paths):
+    """Overwrite output files to detect if a build regenerates them."""
+    for path in paths:
+        path.write_text("tampered")
+
+def test_incremental_build_creates_manifest(project_path, output_path):
+    build(project_path, output_path, incremental=True)
+
+    assert get_manifest_path(output_path).exists()
+    assert (output_path / "a.html").read_text() == "<title>A</title>\n<p>Some text.</p>"
+    assert (output_path / "dir1" / "c.txt").read_text() == "plain text\n"
+
+def test_incremental_build_skips_unchanged_nodes(project_path, output_path):
+    build(project_path, output_path, incremental=True)
+    tamper(output_path / "a.html", output_path / "dir1" / "b.html")
+
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").read_text() == "tampered"
+    assert (output_path / "dir1" / "b.html").read_text() == "tampered"
+
+def test_incremental_build_rebuilds_changed_input(project_path, output_path):
+    build(project_path, output_path, incremental=True)
+    tamper(output_path / "a.html", output_path / "dir1" / "b.html")
+
+    (project_path / "a.md").write_text("---\ntitle: A2\n---\n\nSome text.\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").read_text() == "<title>A2</title>\n<p>Some text.</p>"
+    assert (output_path / "dir1" / "b.html").read_text() == "tampered"
+
+def test_incremental_build_rebuilds_subtree_of_values_file(project_path, output_path):
+    build(project_path, output_path, incremental=True)
+    tamper(output_path / "a.html", output_path / "dir1" / "b.html")
+
+    (project_path / "dir1" / "_values.yaml").write_text("title: From values\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").read_text() == "tampered"
+    assert (output_path / "dir1" / "b.html").read_text() == "<title>B</title>\n<p>More text.</p>"
+
+def test_incremental_build_rebuilds_on_template_change(project_path, output_path):
+    build(project_path, output_path, incremental=True)
+    tamper(output_path / "a.html", output_path / "dir1" / "c.txt")
+
+    (project_path / "layout.html").write_text("<h1>{{ title }}</h1>\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").read_text() == "<h1>A</h1>"
+    assert (output_path / "dir1" / "c.txt").read_text() == "tampered"
+
+def test_incremental_build_rebuilds_missing_output(project_path, output_path):
+    build(project_path, output_path, incremental=True)
+    (output_path / "a.html").unlink()
+
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").exists()
+
+def test_incremental_build_rebuilds_on_root_values_change(project_path, output_path):
+    build(project_path, output_path, incremental=True)
+    tamper(output_path / "a.html", output_path / "dir1" / "b.html")
+
+    (project_path / "_values.yaml").write_text("_template: layout.html\nextra: 1\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").read_text() == "<title>A</title>\n<p>Some text.</p>"
+    assert (output_path / "dir1" / "b.html").read_text() == "<title>B</title>\n<p>More text.</p>"
+
+def test_incremental_build_rebuilds_nodes_that_read_changed_node(project_path, output_path):
+    (project_path / "nav.html").write_text("{{ _root.get('dir1/b.md').values.title }}\n")
+    (project_path / "a.md").write_text("---\n_template: nav.html\n---\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").read_text() == "B"
+    tamper(output_path / "dir1" / "c.txt")
+
+    (project_path / "dir1" / "b.md").write_text("---\ntitle: B2\n---\n\nMore text.\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").read_text() == "B2"
+    assert (output_path / "dir1" / "c.txt").read_text() == "tampered"
+
+def test_incremental_build_records_dependency_graph(project_path, output_path):
+    (project_path / "nav.html").write_text("{% for node in _root.children %}{{ node.url }}{% endfor %}\n")
+    (project_path / "a.md").write_text("---\n_template: nav.html\n---\n")
+    build(project_path, output_path, incremental=True)
+
+    manifest = Manifest.load(get_manifest_path(output_path))
+    entry = manifest.nodes["/a.md"]
+    assert entry["templates"] == ["nav.html"]
+    assert entry["nodes"] == ["", "/dir1"]
+    assert entry["files"] == [str(project_path.resolve() / "a.md")]
+    assert manifest.nodes["/dir1"]["files"] == []
+
+def test_incremental_build_rebuilds_readers_of_children(project_path, output_path):
+    (project_path / "nav.html").write_text("{% for node in _root.get('dir1').children %}{{ node.name }} {% endfor %}\n")
+    (project_path / "a.md").write_text("---\n_template: nav.html\n---\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").read_text() == "b.md c.txt "
+
+    (project_path / "dir1" / "d.txt").write_text("new\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "a.html").read_text() == "b.md c.txt d.txt "
+
+def test_incremental_build_rebuilds_nodes_whose_content_reads_changed_node(project_path, output_path):
+    (project_path / "a.md").write_text('---\ntitle: A\n---\n\n{{ _root.get("/c.md").values._content }}\n')
+    (project_path / "c.md").write_text('---\ntitle: C\n---\n\n{{ _root.get("/d.md").values.title }}\n')
+    (project_path / "d.md").write_text("---\ntitle: D\n---\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "c.html").read_text() == "<title>C</title>\n<p>D</p>"
+
+    manifest = Manifest.load(get_manifest_path(output_path))
+    assert manifest.nodes["/c.md"]["nodes"] == ["/d.md"]
+    assert manifest.nodes["/a.md"]["nodes"] == ["/c.md", "/d.md"]
+
+    (project_path / "d.md").write_text("---\ntitle: D2\n---\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "c.html").read_text() == "<title>C</title>\n<p>D2</p>"
+    assert (output_path / "a.html").read_text() == "<title>A</title>\n<p>D2</p>"
+
+def test_incremental_build_rebuilds_readers_of_prev_on_new_previous_sibling(project_path, output_path):
+    (project_path / "prev.html").write_text("{{ _this.prev.name }}\n")
+    (project_path / "aa").mkdir()
+    (project_path / "aa" / "x.md").write_text("---\ntitle: X\n---\n")
+    (project_path / "ac.md").write_text("---\n_template: prev.html\n---\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "ac.html").read_text() == "aa"
+
+    (project_path / "ab.md").write_text("---\ntitle: AB\n---\n")
+    build(project_path, output_path, incremental=True)
+    assert (output_path / "ac.html").read_text() == "ab.md"
@@ -0,0 +1,56 @@
+
+import shutil
+
+import pytest
+
+from spekulatio.operations import build
+from spekulatio.exceptions import SpekulatioBuildError
+
+def read_tree(path):
+    return {
+        str(file_path.relative_to(path)): file_path.read_text()
+        for file_path in sorted(path.rglob("*"))
+        if file_path.is_file()
+    }
+
+def test_parallel_build(fixtures_path, tmp_path_factory):
+    sequential_path = tmp_path_factory.mktemp("sequential")
+    parallel_path = tmp_path_factory.mktemp("parallel")
+
+    build(fixtures_path / "incremental", sequential_path)
+    build(fixtures_path / "incremental", parallel_path, jobs=2)
+
+    assert read_tree(parallel_path) == read_tree(sequential_path)
+    assert set(read_tree(parallel_path)) == set(["a.html", "dir1/b.html", "dir1/c.txt"])
+
+def test_parallel_build_errors(fixtures_path, tmp_path, output_path):
+    project_path = tmp_path / "project"
+    shutil.copytree(fixtures_path / "incremental", project_path)
+    (project_path / "a.md").write_text("---\n_template: missing-a.html\n---\n")
+    (project_path / "dir1" / "b.md").write_text("---\n_template: missing-b.html\n---\n")
+
+    with pytest.raises(SpekulatioBuildError) as exc_info:
+        build(project_path, output_path, jobs=2)
+
+    errors = exc_info.value.errors
+    assert [path for path, _ in errors] == ["/a.md", "/dir1/b.md"]
+    assert "missing-a.html" in errors[0][1]
+    assert "missing-b.html" in errors[1][1]
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_with_actions_that_write_nothing(fixtures_path, tmp_path, output_path, jobs):
+    project_path = tmp_path / "project"
+    shutil.copytree(fixtures_path / "incremental", project_path)
+    (project_path / "spekulatio.yaml").write_text(
+        "actions:\n"
+        "  - name: Md2Html\n"
+        "  - name: NoOp\n"
+        "    package: spekulatio.models.actions\n"
+        "    patterns:\n"
+        "      - '*.txt'\n"
+    )
+    (project_path / "dir1" / "d.txt").write_text("ignored\n")
+
+    stats = build(project_path, output_path, jobs=jobs)
+    assert stats.written == 4
+    assert set(read_tree(output_path)) == {"a.html", "dir1/b.html"}
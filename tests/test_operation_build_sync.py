@@ -0,0 +1,54 @@
+import shutil
+
+import pytest
+
+from spekulatio.operations import build
+from spekulatio.exceptions import SpekulatioValidationError
+
+def test_sync_removes_stale_outputs(project_path, output_path):
+    build(project_path, output_path)
+    (project_path / "a.md").rename(project_path / "renamed.md")
+    shutil.rmtree(project_path / "dir1")
+    (output_path / "extra" / "nested").mkdir(parents=True)
+    (output_path / "extra" / "nested" / "old.html").write_text("old")
+
+    stats = build(project_path, output_path, sync=True)
+    assert sorted(p.relative_to(output_path).as_posix() for p in output_path.rglob("*")) == [
+        "renamed.html",
+    ]
+    assert sorted(p.relative_to(output_path).as_posix() for p in stats.removed_paths) == [
+        "a.html",
+        "dir1",
+        "dir1/b.html",
+        "dir1/c.txt",
+        "extra",
+        "extra/nested",
+        "extra/nested/old.html",
+    ]
+
+def test_sync_keeps_outputs(project_path, output_path):
+    build(project_path, output_path)
+    mtime = (output_path / "a.html").stat().st_mtime_ns
+
+    stats = build(project_path, output_path, sync=True)
+    assert stats.removed_paths == []
+    assert (output_path / "dir1" / "c.txt").exists()
+    assert (output_path / "a.html").stat().st_mtime_ns == mtime
+
+def test_sync_removes_links_without_following_them(project_path, output_path, tmp_path):
+    target_path = tmp_path / "outside"
+    target_path.mkdir()
+    (target_path / "keep.txt").write_text("keep")
+    (output_path / "link").symlink_to(target_path)
+
+    stats = build(project_path, output_path, sync=True)
+    assert stats.removed_paths == [output_path.absolute() / "link"]
+    assert (target_path / "keep.txt").exists()
+
+def test_sync_refuses_output_containing_input(project_path):
+    output_path = project_path.parent
+    previous_paths = sorted(output_path.rglob("*"))
+    with pytest.raises(SpekulatioValidationError):
+        build(project_path, output_path, sync=True)
+    assert (project_path / "a.md").exists()
+    assert sorted(output_path.rglob("*")) == previous_paths
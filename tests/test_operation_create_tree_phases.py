@@ -0,0 +1,38 @@
+
+import pytest
+
+from spekulatio.models import Node
+from spekulatio.models.action import TextAction
+from spekulatio.operations import get_layers
+from spekulatio.operations import create_tree
+from spekulatio.exceptions import SpekulatioValidationError
+
+@pytest.fixture(scope="function")
+def no_file_reads(monkeypatch):
+    """Make any attempt to read the values of a file node fail."""
+    def get_values(self, input_path):
+        raise AssertionError(f"{input_path} was read")
+    monkeypatch.setattr(TextAction, "get_values", get_values)
+
+def test_create_tree_doesnt_read_files(fixtures_path, no_file_reads):
+    layers = get_layers(fixtures_path / "sorting-sink")
+    root = create_tree(layers)
+
+    # structure and order are available without computing file values
+    assert [child.name for child in root.get("dir1").children] == ["b.md", "c.md", "d.md", "e.md", "a.md"]
+    assert [node.input_path for node in root.traverse()][-1] == "/f.md"
+    assert root.get("dir1/e.md").next is root / "dir1" / "a.md"
+    assert root.get("dir1/b.md").prev is root / "dir1"
+
+def test_prune_doesnt_sort(fixtures_path, no_file_reads):
+    layers = get_layers(fixtures_path / "sorting-duplicate")
+    root = Node(name=".")
+    for layer in layers:
+        layer.apply_to(root)
+
+    # pruning a tree with a wrong _sort value doesn't fail...
+    root.prune()
+
+    # ...but sorting it does
+    with pytest.raises(SpekulatioValidationError):
+        root.sort_tree()
@@ -0,0 +1,165 @@
+import pytest
+
+from spekulatio.lib.watchers import Change
+from spekulatio.operations.watch import LiveBuild
+
+@pytest.fixture(scope="function")
+def live_build(project_path, output_path):
+    live_build = LiveBuild(project_path, output_path)
+    live_build.build()
+    return live_build
+
+def written(nodes):
+    return [node.input_path for node in nodes]
+
+def test_live_build_writes_all_nodes(live_build, output_path):
+    assert (output_path / "a.html").read_text() == "<title>A</title>\n<p>Some text.</p>"
+    assert (output_path / "dir1" / "c.txt").read_text() == "plain text\n"
+
+def test_content_change_rebuilds_only_its_node(live_build, project_path, output_path):
+    path = project_path / "dir1" / "b.md"
+    path.write_text(path.read_text().replace("More text.", "Other text."))
+
+    nodes = live_build.update([Change(path.resolve(), "modified")])
+    assert written(nodes) == ["/dir1/b.md"]
+    assert (output_path / "dir1" / "b.html").read_text() == "<title>B</title>\n<p>Other text.</p>"
+
+def test_values_change_rebuilds_dependent_nodes(project_path, output_path):
+    (project_path / "nav.html").write_text("{{ _root.get('dir1/b.md').values.title }}\n")
+    (project_path / "a.md").write_text("---\n_template: nav.html\n---\n")
+    live_build = LiveBuild(project_path, output_path)
+    live_build.build()
+    assert (output_path / "a.html").read_text() == "B"
+
+    path = project_path / "dir1" / "b.md"
+    path.write_text(path.read_text().replace("title: B", "title: B2"))
+
+    nodes = live_build.update([Change(path.resolve(), "modified")])
+    assert set(written(nodes)) == {"/a.md", "/dir1/b.md"}
+    assert (output_path / "a.html").read_text() == "B2"
+
+def test_values_file_rebuilds_its_subtree(live_build, project_path, output_path):
+    path = project_path / "dir1" / "_values.yaml"
+    path.write_text("_template: other.html\n")
+    (project_path / "other.html").write_text("<h2>{{ title }}</h2>\n")
+
+    nodes = live_build.update([Change(path.resolve(), "modified")])
+    assert set(written(nodes)) >= {"/dir1", "/dir1/b.md", "/dir1/c.txt"}
+    assert (output_path / "dir1" / "b.html").read_text() == "<h2>B</h2>"
+    assert (output_path / "a.html").read_text() == "<title>A</title>\n<p>Some text.</p>"
+
+def test_template_change_rebuilds_nodes_that_use_it(live_build, project_path, output_path):
+    path = project_path / "layout.html"
+    path.write_text("<h1>{{ title }}</h1>\n")
+
+    nodes = live_build.update([Change(path.resolve(), "modified")])
+    assert set(written(nodes)) == {"/a.md", "/dir1/b.md"}
+    assert (output_path / "a.html").read_text() == "<h1>A</h1>"
+
+def test_template_that_is_also_a_node_rebuilds_nodes_that_use_it(project_path, output_path):
+    (project_path / "spekulatio.yaml").write_text(
+        "actions:\n  - name: Md2Html\n  - name: Copy\n    patterns:\n      - \"*.txt\"\n      - \"layout.html\"\n"
+    )
+    live_build = LiveBuild(project_path, output_path)
+    live_build.build()
+
+    path = project_path / "layout.html"
+    path.write_text("<h1>{{ title }}</h1>\n")
+
+    nodes = live_build.update([Change(path.resolve(), "modified")])
+    assert set(written(nodes)) == {"/a.md", "/dir1/b.md", "/layout.html"}
+    assert (output_path / "a.html").read_text() == "<h1>A</h1>"
+    assert (output_path / "layout.html").read_text() == "<h1>{{ title }}</h1>\n"
+
+def test_atomic_save_rebuilds_only_its_node(live_build, project_path, output_path):
+    path = project_path / "dir1" / "b.md"
+    temporary_path = project_path / "dir1" / ".b.md.tmp"
+    temporary_path.write_text(path.read_text().replace("More text.", "Other text."))
+    temporary_path.rename(path)
+
+    nodes = live_build.update([
+        Change(temporary_path.resolve(), "created"),
+        Change(temporary_path.resolve(), "modified"),
+        Change(temporary_path.resolve(), "deleted"),
+        Change(path.resolve(), "created"),
+    ])
+    assert written(nodes) == ["/dir1/b.md"]
+    assert (output_path / "dir1" / "b.html").read_text() == "<title>B</title>\n<p>Other text.</p>"
+
+def test_new_file_recreates_tree(live_build, project_path, output_path):
+    path = project_path / "dir1" / "d.md"
+    path.write_text("---\ntitle: D\n---\n\nNew.\n")
+
+    live_build.update([Change(path.resolve(), "created")])
+    assert (output_path / "dir1" / "d.html").read_text() == "<title>D</title>\n<p>New.</p>"
+
+def test_unrelated_new_file_is_ignored(live_build, project_path):
+    path = project_path / "dir1" / "notes.swp"
+    path.write_text("")
+
+    assert live_build.update([Change(path.resolve(), "created")]) == []
+
+def test_output_changes_are_ignored(project_path):
+    output_path = project_path / "build"
+    output_path.mkdir()
+    live_build = LiveBuild(project_path, output_path)
+    live_build.build()
+
+    change = Change((output_path / "a.html").resolve(), "modified")
+    assert live_build.update([change]) == []
+
+def test_values_change_rebuilds_nodes_whose_content_reads_it(project_path, output_path):
+    # z.md is written after c.md, so it keeps the content of c.md computed
+    (project_path / "z.md").write_text('---\ntitle: Z\n---\n\n{{ _root.get("/c.md").values._content }}\n')
+    (project_path / "c.md").write_text('---\ntitle: C\n---\n\n{{ _root.get("/d.md").values.title }}\n')
+    (project_path / "d.md").write_text("---\ntitle: D\n---\n")
+    live_build = LiveBuild(project_path, output_path)
+    live_build.build()
+    assert live_build.dependencies["/c.md"].nodes == {"/d.md"}
+
+    path = project_path / "d.md"
+    path.write_text("---\ntitle: D2\n---\n")
+    nodes = live_build.update([Change(path.resolve(), "modified")])
+    assert set(written(nodes)) == {"/c.md", "/d.md", "/z.md"}
+    assert (output_path / "c.html").read_text() == "<title>C</title>\n<p>D2</p>"
+    assert (output_path / "z.html").read_text() == "<title>Z</title>\n<p>D2</p>"
+
+def test_output_inside_layer_is_not_read(project_path):
+    output_path = project_path / "build"
+    output_path.mkdir()
+    live_build = LiveBuild(project_path, output_path)
+    live_build.build()
+    nodes = live_build.build()
+    assert "/build" not in written(nodes)
+    assert not (output_path / "build").exists()
+
+def test_change_on_watched_root_rebuilds_everything(live_build, project_path, output_path):
+    # this is what the watcher reports when it loses events
+    path = project_path / "dir1" / "b.md"
+    path.write_text(path.read_text().replace("More text.", "Other text."))
+
+    root_path = project_path.resolve()
+    assert root_path in live_build.watched_paths
+    nodes = live_build.update([Change(root_path, "created")])
+    assert "/dir1/b.md" in written(nodes)
+    assert (output_path / "dir1" / "b.html").read_text() == "<title>B</title>\n<p>Other text.</p>"
+
+def test_new_template_shadows_existing_one(tmp_path, output_path):
+    (tmp_path / "theme").mkdir()
+    (tmp_path / "content").mkdir()
+    (tmp_path / "spekulatio.yaml").write_text(
+        "layers:\n  - path: theme/spekulatio.yaml\npath: content/\nactions:\n  - name: Md2Html\n"
+    )
+    (tmp_path / "theme" / "spekulatio.yaml").write_text("path: .\n")
+    (tmp_path / "content" / "_values.yaml").write_text("_template: layout.html\n")
+    (tmp_path / "content" / "layout.html").write_text("CONTENT")
+    (tmp_path / "content" / "a.md").write_text("a")
+    live_build = LiveBuild(tmp_path, output_path)
+    live_build.build()
+    assert (output_path / "a.html").read_text() == "CONTENT"
+
+    path = tmp_path / "theme" / "layout.html"
+    path.write_text("THEME")
+    nodes = live_build.update([Change(path.resolve(), "created")])
+    assert "/a.md" in written(nodes)
+    assert (output_path / "a.html").read_text() == "THEME"